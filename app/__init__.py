@@ -13,6 +13,9 @@ def create_app():
     app = Flask(__name__)
     CORS(app)
 
+    from app.delivery.json_provider import DeliveryJSONProvider
+    app.json = DeliveryJSONProvider(app)
+
     if not firebase_admin._apps:
         cred_path = os.getenv("FIREBASE_CREDENTIALS", "firebase-credentials.json")
         print("Using Firebase credentials:", cred_path)  # temporary
@@ -25,5 +28,16 @@ def create_app():
     return app
 
 
-app = create_app()
-db = firestore.client()
+def __getattr__(name):
+    """
+    `app` and `db` are built on first access (flask --app app, gunicorn
+    app:app), so importing a submodule (run.py's caches, the offline
+    build CLIs) does not initialize Firebase or register the blueprint.
+    """
+    if name not in ("app", "db"):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    if "app" not in globals():
+        globals()["app"] = create_app()
+    if name == "db":
+        globals()["db"] = firestore.client()
+    return globals()[name]
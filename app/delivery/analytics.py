@@ -0,0 +1,397 @@
+# app/delivery/analytics.py
+# Columnar Snapshot of Delivery History for Impact Reporting
+#
+# Refresh: flask --app app delivery snapshot        (cron; only reads donations changed since the last run)
+# Serve:   ANALYTICS_SNAPSHOT_DIR=/var/lib/surplus/delivery-snapshot
+
+import json
+import os
+import tempfile
+import threading
+import logging
+from dataclasses import replace
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .models import DeliveryMethod, DeliveryRecord, DeliveryStatus
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+
+SNAPSHOT_PAGE_SIZE = 500
+
+METHODS = [method.value for method in DeliveryMethod]
+STATUSES = [status.value for status in DeliveryStatus]
+
+# Statuses where money was (or will be) spent on the provider
+SPEND_STATUSES = (DeliveryStatus.BOOKED, DeliveryStatus.IN_PROGRESS, DeliveryStatus.DELIVERED)
+
+# Column name -> dtype. Timestamps are epoch seconds, NaN when unset.
+COLUMNS = {
+    "method": "u1",                  # index into METHODS
+    "status": "u1",                  # index into STATUSES
+    "estimated_price": "<f8",
+    "actual_price": "<f8",
+    "distance_km": "<f8",
+    "booked_at": "<f8",
+    "delivered_at": "<f8",
+    "updated_at": "<f8",
+}
+
+
+def _epoch(value) -> float:
+    """Firestore timestamp / datetime / ISO string -> epoch seconds (NaN if unset)"""
+    if value is None:
+        return np.nan
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return np.nan
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    return np.nan
+
+
+def _float(value, default: float = np.nan) -> float:
+    try:
+        return float(value) if value is not None else default
+    except (TypeError, ValueError):
+        return default
+
+
+# donations.deliveryStatus, as the assign / update-status endpoints and the
+# Flutter client write it -> DeliveryStatus
+_DELIVERY_STATUS_MAP = {
+    'pending': DeliveryStatus.PENDING,
+    'confirmed': DeliveryStatus.BOOKED,
+    'picked_up': DeliveryStatus.IN_PROGRESS,
+    'in_transit': DeliveryStatus.IN_PROGRESS,
+    'delivered': DeliveryStatus.DELIVERED,
+    'cancelled': DeliveryStatus.CANCELLED,
+}
+
+# When the delivery map and deliveryStatus disagree, the later stage wins
+_STATUS_ORDER = [
+    DeliveryStatus.PENDING, DeliveryStatus.BOOKED, DeliveryStatus.IN_PROGRESS,
+    DeliveryStatus.CANCELLED, DeliveryStatus.DELIVERED,
+]
+
+
+def delivery_record_from_doc(donation_id: str, data: Dict) -> Optional[DeliveryRecord]:
+    """
+    The DeliveryRecord for a donations/{id} document, or None if the
+    donation has no usable delivery.
+
+    Method and price come from the `delivery` map written by /book; status
+    from that map or the top-level deliveryStatus the status endpoints
+    maintain, whichever is further along. The delivered time is the map's
+    deliveredAt, else deliveryCompletedAt; refresh_snapshot falls back to
+    deliveries/{id}.delivered_at for donations that carry neither.
+    """
+    delivery = data.get('delivery')
+    if not isinstance(delivery, dict):
+        return None
+    try:
+        method = DeliveryMethod(delivery.get('method'))
+        status = DeliveryStatus(delivery.get('status', DeliveryStatus.PENDING.value))
+    except ValueError:
+        return None
+    tracked = _DELIVERY_STATUS_MAP.get(data.get('deliveryStatus'))
+    if tracked is not None and _STATUS_ORDER.index(tracked) > _STATUS_ORDER.index(status):
+        status = tracked
+    return DeliveryRecord(
+        donation_id=donation_id,
+        method=method,
+        status=status,
+        estimated_price=_float(delivery.get('estimatedPrice'), 0.0),
+        actual_price=_float(delivery.get('actualPrice'), None),
+        distance_km=_float(delivery.get('distanceKm'), 0.0),
+        booked_at=delivery.get('bookedAt'),
+        delivered_at=delivery.get('deliveredAt') or data.get('deliveryCompletedAt'),
+        external_booking_id=delivery.get('externalBookingId'),
+        notes=delivery.get('notes', ''),
+    )
+
+
+def _record_row(record: DeliveryRecord, updated_at: float) -> Tuple:
+    return (
+        METHODS.index(record.method.value),
+        STATUSES.index(record.status.value),
+        record.estimated_price,
+        record.actual_price if record.actual_price is not None else np.nan,
+        record.distance_km,
+        _epoch(record.booked_at),
+        _epoch(record.delivered_at),
+        updated_at,
+    )
+
+
+# ============================================================================
+# SNAPSHOT STORE
+# ============================================================================
+
+class DeliverySnapshot:
+    """
+    Read-only columnar view of every delivery record: one memory-mapped
+    .npy file per column plus a manifest naming the current generation.
+
+    Aggregates run as numpy reductions over whole columns, so they cost
+    milliseconds for hundreds of thousands of deliveries and never touch
+    Firestore.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("version") != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {self.manifest.get('version')}")
+        if self.manifest["methods"] != METHODS or self.manifest["statuses"] != STATUSES:
+            raise ValueError("Snapshot was written with different delivery methods/statuses; rebuild it")
+
+        generation = self.manifest["generation"]
+        self.donation_ids = self._load("donation_id", generation)
+        self.columns = {name: self._load(name, generation) for name in COLUMNS}
+
+    def _load(self, name: str, generation: int) -> np.ndarray:
+        return np.load(os.path.join(self.directory, f"{name}.{generation}.npy"), mmap_mode="r")
+
+    @classmethod
+    def open(cls, directory: str) -> Optional["DeliverySnapshot"]:
+        """None if no snapshot has been written to `directory` yet"""
+        if not os.path.exists(os.path.join(directory, MANIFEST_NAME)):
+            return None
+        return cls(directory)
+
+    def __len__(self) -> int:
+        return len(self.donation_ids)
+
+    @property
+    def watermark(self) -> Optional[str]:
+        """ISO timestamp of the newest donation update included"""
+        return self.manifest.get("watermark")
+
+    # ------------------------------------------------------------------------
+    # Aggregates
+    # ------------------------------------------------------------------------
+
+    def _mask(self, since: Optional[float] = None, until: Optional[float] = None) -> np.ndarray:
+        """Rows booked within [since, until); all rows when neither is given"""
+        mask = np.ones(len(self), dtype=bool)
+        booked_at = self.columns["booked_at"]
+        if since is not None:
+            mask &= booked_at >= since
+        if until is not None:
+            mask &= booked_at < until
+        return mask
+
+    def _status_mask(self, *statuses: DeliveryStatus) -> np.ndarray:
+        return np.isin(self.columns["status"], [STATUSES.index(s.value) for s in statuses])
+
+    def total_km_delivered(self, since: Optional[float] = None, until: Optional[float] = None) -> float:
+        mask = self._mask(since, until) & self._status_mask(DeliveryStatus.DELIVERED)
+        return float(self.columns["distance_km"][mask].sum())
+
+    def spend_by_provider(self, since: Optional[float] = None, until: Optional[float] = None) -> Dict[str, float]:
+        """Actual price where known, else the estimate, for booked-or-later deliveries"""
+        mask = self._mask(since, until) & self._status_mask(*SPEND_STATUSES)
+        actual = self.columns["actual_price"][mask]
+        spend = np.where(np.isnan(actual), self.columns["estimated_price"][mask], actual)
+        totals = np.bincount(self.columns["method"][mask], weights=spend, minlength=len(METHODS))
+        return {method: round(float(total), 2) for method, total in zip(METHODS, totals) if total}
+
+    def median_delivery_minutes(self, since: Optional[float] = None, until: Optional[float] = None) -> Optional[float]:
+        """Median time from booked to delivered; None if nothing was delivered"""
+        mask = self._mask(since, until)
+        minutes = (self.columns["delivered_at"][mask] - self.columns["booked_at"][mask]) / 60
+        minutes = minutes[~np.isnan(minutes)]
+        return round(float(np.median(minutes)), 1) if minutes.size else None
+
+    def status_counts(self, since: Optional[float] = None, until: Optional[float] = None) -> Dict[str, int]:
+        counts = np.bincount(self.columns["status"][self._mask(since, until)], minlength=len(STATUSES))
+        return {status: int(count) for status, count in zip(STATUSES, counts)}
+
+    def summary(self, since: Optional[float] = None, until: Optional[float] = None) -> Dict:
+        """All report aggregates in one response"""
+        return {
+            "deliveries": int(self._mask(since, until).sum()),
+            "statusCounts": self.status_counts(since, until),
+            "totalKmDelivered": round(self.total_km_delivered(since, until), 2),
+            "spendByProvider": self.spend_by_provider(since, until),
+            "medianDeliveryMinutes": self.median_delivery_minutes(since, until),
+            "snapshotWatermark": self.watermark,
+        }
+
+
+class SnapshotReader:
+    """
+    Serves the newest snapshot in ANALYTICS_SNAPSHOT_DIR, reopening it when
+    the refresh job publishes a new generation (one stat of the manifest
+    per call).
+    """
+
+    def __init__(self, directory: Optional[str]):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._snapshot: Optional[DeliverySnapshot] = None
+        self._manifest_id: Optional[Tuple[int, int]] = None
+
+    @classmethod
+    def from_env(cls) -> "SnapshotReader":
+        return cls(os.getenv("ANALYTICS_SNAPSHOT_DIR"))
+
+    def get(self) -> Optional[DeliverySnapshot]:
+        if not self.directory:
+            return None
+        try:
+            stat = os.stat(os.path.join(self.directory, MANIFEST_NAME))
+        except OSError:
+            return None
+        # The manifest is replaced (new inode) on every publish
+        manifest_id = (stat.st_ino, stat.st_mtime_ns)
+        with self._lock:
+            if manifest_id != self._manifest_id:
+                self._snapshot = DeliverySnapshot(self.directory)
+                self._manifest_id = manifest_id
+            return self._snapshot
+
+
+# ============================================================================
+# INCREMENTAL REFRESH
+# ============================================================================
+
+def _changed_donations(db, after: Optional[datetime], page_size: int = SNAPSHOT_PAGE_SIZE) -> Iterable:
+    """Donation documents with updatedAt > `after`, oldest change first, one page at a time"""
+    cursor = None
+    while True:
+        query = db.collection('donations')
+        if after is not None:
+            query = query.where('updatedAt', '>', after)
+        query = query.order_by('updatedAt').order_by('__name__').limit(page_size)
+        if cursor is not None:
+            query = query.start_after(cursor)
+
+        page_count = 0
+        for doc in query.stream():
+            page_count += 1
+            cursor = {'updatedAt': doc.get('updatedAt'), '__name__': doc.id}
+            yield doc
+        if page_count < page_size:
+            return
+
+
+def _publish(directory: str, donation_ids: np.ndarray, columns: Dict[str, np.ndarray],
+             generation: int, watermark: Optional[str], previous: Optional[int]) -> None:
+    """Write a new generation's columns, then swap the manifest to point at it"""
+    for name, values in [("donation_id", donation_ids)] + list(columns.items()):
+        np.save(os.path.join(directory, f"{name}.{generation}.npy"), values, allow_pickle=False)
+
+    manifest = {
+        "version": SNAPSHOT_FORMAT_VERSION,
+        "generation": generation,
+        "rows": int(len(donation_ids)),
+        "watermark": watermark,
+        "methods": METHODS,
+        "statuses": STATUSES,
+    }
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, os.path.join(directory, MANIFEST_NAME))
+
+    # Readers that still map the old generation keep their pages after unlink
+    if previous is not None:
+        for name in ["donation_id"] + list(COLUMNS):
+            try:
+                os.remove(os.path.join(directory, f"{name}.{previous}.npy"))
+            except OSError:
+                pass
+
+
+def _with_delivered_at(db, records: List[DeliveryRecord], chunk_size: int = SNAPSHOT_PAGE_SIZE) -> List[DeliveryRecord]:
+    """
+    Delivered records whose donation carries no delivered time take it
+    from deliveries/{id}.delivered_at, fetched in batched get_all reads
+    """
+    ids = list(dict.fromkeys(
+        r.donation_id for r in records if r.status == DeliveryStatus.DELIVERED and r.delivered_at is None))
+    delivered_at = {}
+    for start in range(0, len(ids), chunk_size):
+        refs = [db.collection('deliveries').document(i) for i in ids[start:start + chunk_size]]
+        for snapshot in db.get_all(refs):
+            if snapshot.exists:
+                delivered_at[snapshot.id] = snapshot.get('delivered_at')
+    return [
+        replace(r, delivered_at=delivered_at[r.donation_id])
+        if r.delivered_at is None and r.donation_id in delivered_at else r
+        for r in records
+    ]
+
+
+def refresh_snapshot(db, directory: str, page_size: int = SNAPSHOT_PAGE_SIZE) -> Dict:
+    """
+    Bring the snapshot in `directory` up to date: read only donations
+    updated since the last run's watermark, replace their rows (or append
+    new ones) and publish a new generation.
+
+    Returns:
+        {"changed": n, "rows": total, "watermark": iso}
+    """
+    os.makedirs(directory, exist_ok=True)
+    current = DeliverySnapshot.open(directory)
+    after = datetime.fromisoformat(current.watermark) if current and current.watermark else None
+
+    changed: List[Tuple[DeliveryRecord, float]] = []
+    removed_ids: List[str] = []
+    newest = after
+    for doc in _changed_donations(db, after, page_size):
+        data = doc.to_dict() or {}
+        updated_at = data.get('updatedAt')
+        if isinstance(updated_at, datetime) and (newest is None or updated_at > newest):
+            newest = updated_at
+        record = delivery_record_from_doc(doc.id, data)
+        if record is None:
+            removed_ids.append(doc.id)
+            continue
+        changed.append((record, _epoch(updated_at)))
+
+    records = _with_delivered_at(db, [record for record, _ in changed], page_size)
+    changed_ids = [record.donation_id for record in records]
+    changed_rows = [_record_row(record, updated_at) for record, (_, updated_at) in zip(records, changed)]
+
+    if current is not None and not changed_ids and not removed_ids:
+        return {"changed": 0, "rows": len(current), "watermark": current.watermark}
+
+    # Keep a donation's latest change only (it may appear on several pages)
+    latest = {donation_id: i for i, donation_id in enumerate(changed_ids)}
+    keep = sorted(latest.values())
+    new_ids = np.array([changed_ids[i] for i in keep], dtype=str)
+    new_columns = {
+        name: np.array([changed_rows[i][c] for i in keep], dtype=dtype)
+        for c, (name, dtype) in enumerate(COLUMNS.items())
+    }
+
+    if current is not None and len(current):
+        stale = np.isin(current.donation_ids, np.array(changed_ids + removed_ids, dtype=str))
+        kept = ~stale
+        # Fixed-width string columns widen to the longest id seen so far
+        donation_ids = np.concatenate([np.asarray(current.donation_ids[kept]), new_ids])
+        columns = {
+            name: np.concatenate([np.asarray(current.columns[name][kept]), new_columns[name]])
+            for name in COLUMNS
+        }
+    else:
+        donation_ids, columns = new_ids, new_columns
+
+    previous = current.manifest["generation"] if current is not None else None
+    watermark = newest.isoformat() if newest is not None else None
+    _publish(directory, donation_ids, columns, (previous or 0) + 1, watermark, previous)
+    logger.info(f"Delivery snapshot: {len(keep)} changed, {len(donation_ids)} rows, watermark {watermark}")
+    return {"changed": len(keep), "rows": int(len(donation_ids)), "watermark": watermark}
@@ -0,0 +1,180 @@
+# app/delivery/async_distance.py
+# Non-blocking Distance Matrix Client (aiohttp)
+
+import asyncio
+import concurrent.futures
+import os
+import threading
+from typing import Dict, List, Optional, Tuple, Union
+
+import aiohttp
+
+Points = Union[str, List[Tuple[float, float]]]
+
+
+class DistanceMatrixError(Exception):
+    """Distance Matrix request failed or returned a non-OK top-level status"""
+
+
+class DistanceMatrixTimeout(DistanceMatrixError):
+    """Distance Matrix did not answer within the per-call deadline"""
+
+
+# ============================================================================
+# ASYNC DISTANCE MATRIX CLIENT
+# ============================================================================
+
+class AsyncDistanceMatrixClient:
+    """
+    Distance Matrix over a pooled keep-alive aiohttp session.
+
+    The session lives on a background event loop owned by this client, so
+    Flask's synchronous handlers can submit a lookup and wait at most
+    `timeout` seconds for it. `distance_matrix` mirrors
+    googlemaps.Client.distance_matrix and returns the same JSON shape, so
+    PriceEstimationService can use either client.
+    """
+
+    ENDPOINT = "https://maps.googleapis.com/maps/api/distancematrix/json"
+
+    def __init__(self,
+                 api_key: str,
+                 timeout: float = 2.0,
+                 pool_size: int = 20,
+                 keepalive_seconds: float = 30):
+        self.api_key = api_key
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.keepalive_seconds = keepalive_seconds
+
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._pid: Optional[int] = None
+
+    @classmethod
+    def from_env(cls, api_key: str) -> "AsyncDistanceMatrixClient":
+        """Build a client from DISTANCE_MATRIX_* environment variables"""
+        return cls(
+            api_key,
+            timeout=float(os.getenv("DISTANCE_MATRIX_TIMEOUT_SECONDS", "2.0")),
+            pool_size=int(os.getenv("DISTANCE_MATRIX_POOL_SIZE", "20")),
+        )
+
+    def distance_matrix(self,
+                        origins: Points,
+                        destinations: Points,
+                        mode: str = "driving",
+                        units: str = "metric",
+                        departure_time: Optional[str] = None,
+                        timeout: Optional[float] = None) -> Dict:
+        """
+        Blocking call with a hard deadline.
+
+        Raises:
+            DistanceMatrixTimeout: deadline exceeded (request is cancelled)
+            DistanceMatrixError: HTTP or API-level failure
+        """
+        deadline = self.timeout if timeout is None else timeout
+        params = {
+            "origins": self._format_points(origins),
+            "destinations": self._format_points(destinations),
+            "mode": mode,
+            "units": units,
+            "key": self.api_key,
+        }
+        if departure_time is not None:
+            params["departure_time"] = departure_time
+
+        future = asyncio.run_coroutine_threadsafe(
+            self._fetch_outcome(params, deadline), self._ensure_loop()
+        )
+        try:
+            result, error = future.result(timeout=deadline)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise DistanceMatrixTimeout(f"Distance Matrix exceeded {deadline:.2f}s deadline")
+        if error is not None:
+            raise error
+        return result
+
+    def close(self) -> None:
+        """Close the pooled session and stop the background loop"""
+        with self._lock:
+            loop, session = self._loop, self._session
+            self._loop = self._session = None
+        if loop is None:
+            return
+        if session is not None:
+            asyncio.run_coroutine_threadsafe(session.close(), loop).result(timeout=5)
+        loop.call_soon_threadsafe(loop.stop)
+
+    # ------------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------------
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """
+        Start the background loop on first use. A forked gunicorn worker
+        does not inherit the parent's loop thread, so restart it per PID.
+        """
+        pid = os.getpid()
+        if self._loop is not None and self._pid == pid:
+            return self._loop
+        with self._lock:
+            if self._loop is None or self._pid != pid:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever, name="distance-matrix-loop", daemon=True
+                )
+                thread.start()
+                self._loop, self._session, self._pid = loop, None, pid
+            return self._loop
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                keepalive_timeout=self.keepalive_seconds,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def _fetch_outcome(self, params: Dict, deadline: float) -> Tuple[Optional[Dict], Optional[Exception]]:
+        """
+        Return errors instead of raising them, so a request that fails after
+        the caller has already given up does not leave an unretrieved
+        exception on the loop.
+        """
+        try:
+            return await self._fetch(params, deadline), None
+        except DistanceMatrixError as e:
+            return None, e
+
+    async def _fetch(self, params: Dict, deadline: float) -> Dict:
+        session = await self._get_session()
+        try:
+            async with session.get(
+                self.ENDPOINT,
+                params=params,
+                timeout=aiohttp.ClientTimeout(total=deadline),
+            ) as response:
+                response.raise_for_status()
+                result = await response.json()
+        except asyncio.TimeoutError:
+            raise DistanceMatrixTimeout(f"Distance Matrix exceeded {deadline:.2f}s deadline")
+        except (aiohttp.ClientError, ValueError) as e:
+            raise DistanceMatrixError(str(e))
+
+        if result.get("status") != "OK":
+            raise DistanceMatrixError(
+                f"{result.get('status')}: {result.get('error_message', '')}"
+            )
+        return result
+
+    @staticmethod
+    def _format_points(points: Points) -> str:
+        if isinstance(points, str):
+            return points
+        return "|".join(f"{lat},{lng}" for lat, lng in points)
@@ -0,0 +1,345 @@
+# app/delivery/batching.py
+# Multi-Stop Batching of Pending Delivery Orders
+#
+# Pending orders for the same NGO, created within one time window with
+# pickups close together, are proposed as one trip: the vehicle collects
+# every pickup in the cheapest order, then drops everything at the NGO.
+# Proposals only; booking stays a manual step.
+
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+from .geo import haversine_km
+
+if TYPE_CHECKING:
+    from .services import PriceEstimationService
+
+logger = logging.getLogger(__name__)
+
+Point = Tuple[float, float]
+
+DEFAULT_WINDOW_MINUTES = 30       # orders in one trip were created this close together
+DEFAULT_MAX_STOPS = 5             # pickups per trip
+DEFAULT_PICKUP_RADIUS_KM = 2.0    # straight line from the trip's first order
+DEFAULT_MAX_TRIP_MINUTES = 90     # first pickup -> drop, food has to stay fresh
+DEFAULT_BATCH_PROVIDER = "porter"
+
+# Or-opt moves segments of up to this many consecutive stops
+OR_OPT_MAX_SEGMENT = 3
+_EPSILON = 1e-9
+
+
+@dataclass(frozen=True, slots=True)
+class PendingOrder:
+    """A `delivery_orders` document still waiting for a booking"""
+    order_id: str
+    donation_id: str
+    ngo_id: Optional[str]
+    pickup: Point
+    dropoff: Point
+    serving_capacity: int = 0
+    created_at: Optional[datetime] = None
+
+    @classmethod
+    def from_doc(cls, order_id: str, data: Dict) -> Optional["PendingOrder"]:
+        """None if the order has no usable coordinates"""
+        try:
+            pickup = (float(data['pickup_lat']), float(data['pickup_lng']))
+            dropoff = (float(data['dropoff_lat']), float(data['dropoff_lng']))
+        except (KeyError, TypeError, ValueError):
+            return None
+        try:
+            serving_capacity = int(data.get('serving_capacity') or 0)
+        except (TypeError, ValueError):
+            serving_capacity = 0
+        created_at = data.get('created_at')
+        return cls(
+            order_id=order_id,
+            donation_id=data.get('donation_id', ''),
+            ngo_id=data.get('ngo_id') or None,
+            pickup=pickup,
+            dropoff=dropoff,
+            serving_capacity=serving_capacity,
+            created_at=created_at if isinstance(created_at, datetime) else None,
+        )
+
+    @property
+    def drop_key(self) -> str:
+        """Orders sharing a drop key can ride together"""
+        return self.ngo_id or f"{self.dropoff[0]:.4f},{self.dropoff[1]:.4f}"
+
+
+@dataclass(frozen=True, slots=True)
+class TripProposal:
+    """Several pending orders collected in one trip, priced against separate bookings"""
+    orders: Tuple[PendingOrder, ...]   # in pickup sequence
+    provider: str
+    distance_km: float                 # first pickup -> ... -> drop
+    duration_minutes: int
+    combined_price: float
+    separate_price: float              # sum of one booking per order
+
+    @property
+    def savings(self) -> float:
+        return self.separate_price - self.combined_price
+
+    def to_dict(self):
+        dropoff = self.orders[0].dropoff
+        return {
+            "ngoId": self.orders[0].ngo_id,
+            "dropoff": {"lat": dropoff[0], "lng": dropoff[1]},
+            "stops": [
+                {"orderId": o.order_id, "donationId": o.donation_id, "lat": o.pickup[0], "lng": o.pickup[1]}
+                for o in self.orders
+            ],
+            "provider": self.provider,
+            "distanceKm": round(self.distance_km, 2),
+            "durationMinutes": self.duration_minutes,
+            "combinedPrice": round(self.combined_price, 2),
+            "separatePrice": round(self.separate_price, 2),
+            "savings": round(self.savings, 2),
+            "bookingsSaved": len(self.orders) - 1,
+        }
+
+
+# ============================================================================
+# PICKUP SEQUENCE (open path over the pickups, ending at the drop)
+# ============================================================================
+
+def _path_cost(sequence: Sequence[int], cost: Sequence[Sequence[float]]) -> float:
+    """cost[i][j] for pickups i -> j; column len(cost) is the drop"""
+    drop = len(cost)
+    total = cost[sequence[-1]][drop]
+    for a, b in zip(sequence, sequence[1:]):
+        total += cost[a][b]
+    return total
+
+
+def _nearest_neighbour(start: int, cost: Sequence[Sequence[float]]) -> List[int]:
+    sequence = [start]
+    remaining = set(range(len(cost))) - {start}
+    while remaining:
+        here = cost[sequence[-1]]
+        nearest = min(remaining, key=lambda j: here[j])
+        sequence.append(nearest)
+        remaining.remove(nearest)
+    return sequence
+
+
+def _two_opt(sequence: List[int], cost, current: float) -> Optional[Tuple[List[int], float]]:
+    """First improving segment reversal (costs may be asymmetric, so paths are re-summed)"""
+    for i in range(len(sequence) - 1):
+        for j in range(i + 1, len(sequence)):
+            candidate = sequence[:i] + sequence[i:j + 1][::-1] + sequence[j + 1:]
+            candidate_cost = _path_cost(candidate, cost)
+            if candidate_cost < current - _EPSILON:
+                return candidate, candidate_cost
+    return None
+
+
+def _or_opt(sequence: List[int], cost, current: float) -> Optional[Tuple[List[int], float]]:
+    """First improving move of 1..OR_OPT_MAX_SEGMENT consecutive stops, either way round"""
+    for length in range(1, min(OR_OPT_MAX_SEGMENT, len(sequence) - 1) + 1):
+        for i in range(len(sequence) - length + 1):
+            segment = sequence[i:i + length]
+            rest = sequence[:i] + sequence[i + length:]
+            for k in range(len(rest) + 1):
+                for moved in (segment, segment[::-1]):
+                    candidate = rest[:k] + moved + rest[k:]
+                    candidate_cost = _path_cost(candidate, cost)
+                    if candidate_cost < current - _EPSILON:
+                        return candidate, candidate_cost
+    return None
+
+
+def plan_pickup_sequence(cost: Sequence[Sequence[float]]) -> Tuple[List[int], float]:
+    """
+    Cheapest order to visit n pickups before the drop. `cost` is n × (n + 1):
+    cost[i][j] between pickups, cost[i][n] from pickup i to the drop.
+
+    Nearest neighbour from every start, then 2-opt and Or-opt moves until
+    neither improves. Trips are a handful of stops, so this is near-optimal
+    in about a millisecond.
+
+    Returns:
+        (pickup indices in visiting order, total cost)
+    """
+    best_sequence, best_cost = None, float("inf")
+    for start in range(len(cost)):
+        sequence = _nearest_neighbour(start, cost)
+        sequence_cost = _path_cost(sequence, cost)
+        while True:
+            improved = _two_opt(sequence, cost, sequence_cost) or _or_opt(sequence, cost, sequence_cost)
+            if improved is None:
+                break
+            sequence, sequence_cost = improved
+        if sequence_cost < best_cost - _EPSILON:
+            best_sequence, best_cost = sequence, sequence_cost
+    return best_sequence, best_cost
+
+
+# ============================================================================
+# BATCHER
+# ============================================================================
+
+class TripBatcher:
+    """
+    Groups pending orders into candidate trips and keeps the ones that are
+    cheaper as one booking. Distances come from the price estimator's
+    matrix (route cache first, then the distance backend chain), so
+    re-planning the same pending set costs no new API calls.
+    """
+
+    def __init__(self,
+                 price_estimator: "PriceEstimationService",
+                 window_minutes: float = DEFAULT_WINDOW_MINUTES,
+                 max_stops: int = DEFAULT_MAX_STOPS,
+                 pickup_radius_km: float = DEFAULT_PICKUP_RADIUS_KM,
+                 max_trip_minutes: float = DEFAULT_MAX_TRIP_MINUTES):
+        self.price_estimator = price_estimator
+        self.window = timedelta(minutes=window_minutes)
+        self.max_stops = max(2, max_stops)
+        self.pickup_radius_km = pickup_radius_km
+        self.max_trip_minutes = max_trip_minutes
+
+    @classmethod
+    def from_env(cls, price_estimator: "PriceEstimationService") -> "TripBatcher":
+        return cls(
+            price_estimator,
+            window_minutes=float(os.getenv("BATCH_WINDOW_MINUTES", str(DEFAULT_WINDOW_MINUTES))),
+            max_stops=int(os.getenv("BATCH_MAX_STOPS", str(DEFAULT_MAX_STOPS))),
+            pickup_radius_km=float(os.getenv("BATCH_PICKUP_RADIUS_KM", str(DEFAULT_PICKUP_RADIUS_KM))),
+            max_trip_minutes=float(os.getenv("BATCH_MAX_TRIP_MINUTES", str(DEFAULT_MAX_TRIP_MINUTES))),
+        )
+
+    def lookback_start(self) -> datetime:
+        """Orders created before this are too old to batch"""
+        return datetime.now(timezone.utc) - self.window
+
+    def group(self, orders: Sequence[PendingOrder]) -> List[List[PendingOrder]]:
+        """
+        Candidate trips of 2+ orders created within the last window. Per
+        drop, the oldest unassigned order seeds a trip and takes the nearest
+        pickups created within the window after it and inside the pickup
+        radius, up to max_stops.
+        """
+        now = datetime.now(timezone.utc)
+        since = now - self.window
+        by_drop: Dict[str, List[PendingOrder]] = {}
+        for order in orders:
+            if order.created_at is not None and order.created_at < since:
+                continue
+            by_drop.setdefault(order.drop_key, []).append(order)
+
+        groups = []
+        for drop_orders in by_drop.values():
+            drop_orders.sort(key=lambda o: o.created_at or now)
+            assigned = set()
+            for seed in drop_orders:
+                if seed.order_id in assigned:
+                    continue
+                seed_time = seed.created_at or now
+                nearby = []
+                for other in drop_orders:
+                    if other is seed or other.order_id in assigned:
+                        continue
+                    if (other.created_at or now) - seed_time > self.window:
+                        break
+                    straight_km = haversine_km(*seed.pickup, *other.pickup)
+                    if straight_km <= self.pickup_radius_km:
+                        nearby.append((straight_km, other))
+                if not nearby:
+                    continue
+                nearby.sort(key=lambda item: item[0])
+                group = [seed] + [other for _, other in nearby[:self.max_stops - 1]]
+                assigned.update(o.order_id for o in group)
+                groups.append(group)
+        return groups
+
+    def plan(self, group: Sequence[PendingOrder], provider: str = DEFAULT_BATCH_PROVIDER) -> Optional[TripProposal]:
+        """
+        Best pickup sequence for one candidate trip. The farthest pickup is
+        dropped while the trip is too long or not cheaper than separate
+        bookings; None once fewer than two orders remain.
+        """
+        group = list(group)
+        if len(group) < 2:
+            return None
+
+        estimator = self.price_estimator
+        dropoff = group[0].dropoff
+        pickups = [o.pickup for o in group]
+        # Diagonal (pickup to itself) cells are answered locally by the estimator
+        matrix = estimator.estimate_distance_matrix(pickups, pickups + [dropoff])
+
+        # Nearest-first grouping means the farthest pickup is last
+        active = list(range(len(group)))
+        while len(active) >= 2:
+            km = [[matrix[i][j][0] for j in active + [len(group)]] for i in active]
+            sequence, distance_km = plan_pickup_sequence(km)
+            stops = [active[s] for s in sequence]
+            legs = list(zip(stops, stops[1:])) + [(stops[-1], len(group))]
+            # Each leg carries the estimator's fixed buffer, which doubles as time at the stop
+            duration_minutes = sum(matrix[a][b][1] for a, b in legs)
+
+            orders = tuple(group[s] for s in stops)
+            combined = estimator.calculate_estimated_price(
+                provider, distance_km, sum(o.serving_capacity for o in orders)
+            )
+            separate = sum(
+                estimator.calculate_estimated_price(provider, matrix[s][len(group)][0], group[s].serving_capacity)
+                for s in stops
+            )
+            if duration_minutes <= self.max_trip_minutes and combined < separate:
+                return TripProposal(orders, provider, distance_km, duration_minutes, combined, separate)
+            active.pop()
+        return None
+
+    def propose(self, orders: Sequence[PendingOrder],
+                provider: str = DEFAULT_BATCH_PROVIDER) -> List[TripProposal]:
+        """Trips worth booking as one, largest savings first"""
+        proposals = []
+        for group in self.group(orders):
+            try:
+                proposal = self.plan(group, provider)
+            except Exception as e:
+                logger.error(f"Could not plan trip for {[o.order_id for o in group]}: {str(e)}")
+                continue
+            if proposal is not None:
+                proposals.append(proposal)
+        proposals.sort(key=lambda p: p.savings, reverse=True)
+        return proposals
+
+
+def load_pending_orders(db, since: datetime, donation_cache=None) -> List[PendingOrder]:
+    """
+    Pending `delivery_orders` created at or after `since`, with usable
+    coordinates. The query filters on created_at only and status is checked
+    in memory, so no composite index is needed.
+
+    With a `donation_cache` (DocumentCache over donations), orders whose
+    donation is gone or already has a delivery booked are left out, which
+    covers orders created before /book started marking them.
+    """
+    orders = []
+    for doc in db.collection('delivery_orders').where('created_at', '>=', since).stream():
+        data = doc.to_dict() or {}
+        if data.get('status') != 'pending':
+            continue
+        order = PendingOrder.from_doc(doc.id, data)
+        if order is None:
+            logger.warning(f"Skipping delivery order {doc.id}: missing coordinates")
+            continue
+        orders.append(order)
+
+    if donation_cache is not None and orders:
+        donations = donation_cache.get_many(o.donation_id for o in orders)
+        orders = [
+            o for o in orders
+            if donations.get(o.donation_id) is not None
+            and not (donations[o.donation_id].get('delivery') or {}).get('status')
+        ]
+    return orders
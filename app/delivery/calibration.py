@@ -0,0 +1,293 @@
+# app/delivery/calibration.py
+# Calibrated Road-Distance Model for the Straight-Line Fallback
+#
+# Collect: DISTANCE_SAMPLE_LOG=/var/lib/surplus/distance-samples.csv (every live Distance Matrix answer)
+# Fit:     python -m app.delivery.calibration --samples distance-samples.csv --out calibration.json
+# Serve:   DISTANCE_CALIBRATION_PATH=calibration.json
+
+import argparse
+import csv
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+import logging
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .geo import haversine_km
+from .zone_grid import MATRIX_BUFFER_MINUTES, geohash_encode
+
+logger = logging.getLogger(__name__)
+
+CALIBRATION_FORMAT_VERSION = 1
+
+# The uncalibrated fallback: straight line at 20 km/h
+DEFAULT_DETOUR_FACTOR = 1.0
+DEFAULT_SPEED_KMPH = 20.0
+
+# Samples shorter than this are dominated by geocoding noise
+MIN_SAMPLE_STRAIGHT_KM = 0.3
+
+
+def time_bucket(timestamp: float, bucket_hours: int, utc_offset_hours: float) -> int:
+    """Local time-of-day bucket (0 .. 24 / bucket_hours - 1)"""
+    local_hour = int(((timestamp / 3600) + utc_offset_hours) % 24)
+    return local_hour // bucket_hours
+
+
+class RoadFactor(NamedTuple):
+    """Fitted correction for one zone / time bucket"""
+    detour: float                    # road km per straight-line km
+    speed_kmph: float                # driving speed, excluding the fixed buffer
+    samples: int
+
+
+# ============================================================================
+# SAMPLE LOG
+# ============================================================================
+
+class DistanceSampleLog:
+    """
+    Appends every live Distance Matrix answer to a CSV file:
+    timestamp, pickup_lat, pickup_lng, drop_lat, drop_lng, distance_km, duration_minutes
+
+    Each row is one small O_APPEND write, so several workers can share
+    the file without interleaving lines.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.written = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["DistanceSampleLog"]:
+        path = os.getenv("DISTANCE_SAMPLE_LOG")
+        return cls(path) if path else None
+
+    def record(self, pickup_lat: float, pickup_lng: float,
+               drop_lat: float, drop_lng: float,
+               distance_km: float, duration_minutes: int,
+               timestamp: Optional[float] = None) -> None:
+        line = (f"{timestamp if timestamp is not None else time.time():.0f},"
+                f"{pickup_lat:.6f},{pickup_lng:.6f},{drop_lat:.6f},{drop_lng:.6f},"
+                f"{distance_km:.3f},{duration_minutes}\n").encode("ascii")
+        try:
+            with self._lock:
+                fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, line)
+                finally:
+                    os.close(fd)
+                self.written += 1
+        except OSError as e:
+            logger.warning(f"Could not log distance sample: {str(e)}")
+
+
+def read_samples(path: str) -> Iterable[Tuple[float, float, float, float, float, float, int]]:
+    with open(path, newline="") as f:
+        for row in csv.reader(f):
+            if len(row) != 7:
+                continue
+            try:
+                yield (float(row[0]), float(row[1]), float(row[2]), float(row[3]),
+                       float(row[4]), float(row[5]), int(float(row[6])))
+            except ValueError:
+                continue
+
+
+# ============================================================================
+# CALIBRATION TABLE
+# ============================================================================
+
+class DistanceCalibration:
+    """
+    Lookup table of detour factor and speed, keyed by pickup geohash zone
+    and local time-of-day bucket.
+
+    Lookups back off from (zone, bucket) to zone, to bucket, to the global
+    fit, using the first level with at least `min_samples` samples. An
+    answer from the zone or (zone, bucket) level counts as confident.
+    """
+
+    def __init__(self, table: Dict):
+        if table.get("version") != CALIBRATION_FORMAT_VERSION:
+            raise ValueError(f"Unsupported calibration version {table.get('version')}")
+        self.precision = int(table["precision"])
+        self.bucket_hours = int(table["bucketHours"])
+        self.utc_offset_hours = float(table["utcOffsetHours"])
+        self.min_samples = int(table["minSamples"])
+
+        def factors(entries: Dict) -> Dict[str, RoadFactor]:
+            return {key: RoadFactor(*value) for key, value in entries.items()}
+
+        self.global_factor = RoadFactor(*table["global"])
+        self.buckets = factors(table.get("buckets", {}))
+        self.zones = factors(table.get("zones", {}))
+        self.zone_buckets = factors(table.get("zoneBuckets", {}))
+
+        self.confident_hits = 0
+        self.backoff_hits = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["DistanceCalibration"]:
+        """Load DISTANCE_CALIBRATION_PATH if set; None (flat 20 km/h) otherwise"""
+        path = os.getenv("DISTANCE_CALIBRATION_PATH")
+        if not path:
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                calibration = cls(json.load(f))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.error(f"Distance calibration disabled, could not load {path}: {str(e)}")
+            return None
+        logger.info(f"Loaded distance calibration {path}: {len(calibration.zones)} zones")
+        return calibration
+
+    def factor(self, pickup_lat: float, pickup_lng: float,
+               timestamp: Optional[float] = None) -> Tuple[RoadFactor, bool]:
+        """(RoadFactor, confident) for a trip starting here and now"""
+        zone = geohash_encode(pickup_lat, pickup_lng, self.precision)
+        bucket = str(time_bucket(timestamp if timestamp is not None else time.time(),
+                                 self.bucket_hours, self.utc_offset_hours))
+        for factors, key, confident in (
+            (self.zone_buckets, f"{zone}|{bucket}", True),
+            (self.zones, zone, True),
+            (self.buckets, bucket, False),
+        ):
+            found = factors.get(key)
+            if found is not None and found.samples >= self.min_samples:
+                if confident:
+                    self.confident_hits += 1
+                else:
+                    self.backoff_hits += 1
+                return found, confident
+        self.backoff_hits += 1
+        return self.global_factor, False
+
+    def estimate(self, pickup_lat: float, pickup_lng: float,
+                 drop_lat: float, drop_lng: float,
+                 straight_km: float,
+                 timestamp: Optional[float] = None) -> Tuple[float, int, bool]:
+        """
+        Returns:
+            (distance_km, duration_minutes incl. the fixed buffer, confident)
+        """
+        road, confident = self.factor(pickup_lat, pickup_lng, timestamp)
+        distance_km = round(straight_km * road.detour, 2)
+        duration_minutes = int(distance_km / road.speed_kmph * 60) + MATRIX_BUFFER_MINUTES
+        return distance_km, duration_minutes, confident
+
+    def stats(self) -> Dict:
+        """Counters for the /metrics endpoint"""
+        return {
+            "zones": len(self.zones),
+            "globalDetour": self.global_factor.detour,
+            "globalSpeedKmph": self.global_factor.speed_kmph,
+            "confidentHits": self.confident_hits,
+            "backoffHits": self.backoff_hits,
+        }
+
+
+def _fit_group(ratios: List[float], speeds: List[float]) -> Optional[List]:
+    if not ratios or not speeds:
+        return None
+    # Medians: robust to the odd ferry route or geocoding error
+    return [round(statistics.median(ratios), 4), round(statistics.median(speeds), 3), len(ratios)]
+
+
+def fit_calibration(samples: Iterable[Tuple[float, float, float, float, float, float, int]],
+                    precision: int = 5,
+                    bucket_hours: int = 4,
+                    utc_offset_hours: float = 5.5,
+                    min_samples: int = 20) -> Dict:
+    """Fit a calibration table (JSON-serializable) from logged samples"""
+    groups: Dict[Tuple[str, str], Tuple[List[float], List[float]]] = {}
+
+    def add(level: str, key: str, ratio: float, speed: Optional[float]) -> None:
+        ratios, speeds = groups.setdefault((level, key), ([], []))
+        ratios.append(ratio)
+        if speed is not None:
+            speeds.append(speed)
+
+    count = 0
+    for timestamp, p_lat, p_lng, d_lat, d_lng, distance_km, duration_minutes in samples:
+        straight_km = haversine_km(p_lat, p_lng, d_lat, d_lng)
+        if straight_km < MIN_SAMPLE_STRAIGHT_KM or distance_km <= 0:
+            continue
+        ratio = distance_km / straight_km
+        driving_minutes = duration_minutes - MATRIX_BUFFER_MINUTES
+        speed = distance_km / (driving_minutes / 60) if driving_minutes > 0 else None
+
+        zone = geohash_encode(p_lat, p_lng, precision)
+        bucket = str(time_bucket(timestamp, bucket_hours, utc_offset_hours))
+        add("global", "", ratio, speed)
+        add("buckets", bucket, ratio, speed)
+        add("zones", zone, ratio, speed)
+        add("zoneBuckets", f"{zone}|{bucket}", ratio, speed)
+        count += 1
+
+    table = {
+        "version": CALIBRATION_FORMAT_VERSION,
+        "precision": precision,
+        "bucketHours": bucket_hours,
+        "utcOffsetHours": utc_offset_hours,
+        "minSamples": min_samples,
+        "samples": count,
+        "global": [DEFAULT_DETOUR_FACTOR, DEFAULT_SPEED_KMPH, 0],
+        "buckets": {},
+        "zones": {},
+        "zoneBuckets": {},
+    }
+    for (level, key), (ratios, speeds) in groups.items():
+        fitted = _fit_group(ratios, speeds)
+        if fitted is None:
+            continue
+        if level == "global":
+            table["global"] = fitted
+        elif fitted[2] >= min_samples:
+            table[level][key] = fitted
+    return table
+
+
+def save_calibration(table: Dict, path: str) -> None:
+    """Write via temp file + rename so serving workers never read a partial file"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(table, f, separators=(",", ":"), sort_keys=True)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Fit the fallback road-distance model from logged samples")
+    parser.add_argument("--samples", required=True, help="CSV written via DISTANCE_SAMPLE_LOG")
+    parser.add_argument("--out", required=True, help="output calibration JSON")
+    parser.add_argument("--precision", type=int, default=5, help="geohash precision of zones")
+    parser.add_argument("--bucket-hours", type=int, default=4, help="time-of-day bucket width")
+    parser.add_argument("--utc-offset", type=float, default=5.5, help="local time offset for buckets")
+    parser.add_argument("--min-samples", type=int, default=20, help="samples needed to keep a zone/bucket")
+    args = parser.parse_args(argv)
+
+    table = fit_calibration(
+        read_samples(args.samples),
+        precision=args.precision,
+        bucket_hours=args.bucket_hours,
+        utc_offset_hours=args.utc_offset,
+        min_samples=args.min_samples,
+    )
+    save_calibration(table, args.out)
+    detour, speed, count = table["global"]
+    print(f"Fitted {table['samples']} samples: global detour {detour}, {speed} km/h; "
+          f"{len(table['zones'])} zones, {len(table['zoneBuckets'])} zone/time buckets -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
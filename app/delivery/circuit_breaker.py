@@ -0,0 +1,152 @@
+# app/delivery/circuit_breaker.py
+# Circuit Breaker for External Dependencies (Google Maps)
+
+import os
+import threading
+import time
+import logging
+from collections import deque
+from typing import Deque, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker over a rolling error-rate window.
+
+    - closed: calls go through; once at least `minimum_calls` were made in
+      the last `window_seconds` and the failure rate reaches
+      `failure_rate_threshold`, the breaker opens.
+    - open: calls are refused until `open_seconds` have passed.
+    - half_open: exactly one probe call is let through; success closes the
+      breaker, failure re-opens it for another `open_seconds`.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self,
+                 name: str,
+                 failure_rate_threshold: float = 0.5,
+                 minimum_calls: int = 5,
+                 window_seconds: float = 60,
+                 open_seconds: float = 30):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.minimum_calls = minimum_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._calls: Deque[Tuple[float, bool]] = deque()  # (timestamp, succeeded)
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+        self.rejected = 0
+        self.times_opened = 0
+
+    @classmethod
+    def from_env(cls, name: str, prefix: str) -> "CircuitBreaker":
+        """Build from <prefix>_FAILURE_RATE, _MIN_CALLS, _WINDOW_SECONDS, _OPEN_SECONDS"""
+        return cls(
+            name,
+            failure_rate_threshold=float(os.getenv(f"{prefix}_FAILURE_RATE", "0.5")),
+            minimum_calls=int(os.getenv(f"{prefix}_MIN_CALLS", "5")),
+            window_seconds=float(os.getenv(f"{prefix}_WINDOW_SECONDS", "60")),
+            open_seconds=float(os.getenv(f"{prefix}_OPEN_SECONDS", "30")),
+        )
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def allow_request(self) -> bool:
+        """
+        Whether the caller may hit the dependency now. A True from the
+        half-open state makes the caller the probe; it must report back
+        with record_success() or record_failure().
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    self.rejected += 1
+                    return False
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+                logger.info(f"Circuit {self.name} half-open, probing")
+
+            # HALF_OPEN: one probe at a time
+            if self._probe_in_flight:
+                self.rejected += 1
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._close()
+                return
+            self._record(True)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._open()
+                return
+            self._record(False)
+            if self._state == self.CLOSED and self._should_trip():
+                self._open()
+
+    def stats(self) -> Dict:
+        """State and counters for the /metrics endpoint"""
+        with self._lock:
+            self._trim(time.monotonic())
+            failures = sum(1 for _, ok in self._calls if not ok)
+            return {
+                "state": self._state,
+                "windowCalls": len(self._calls),
+                "windowFailures": failures,
+                "rejected": self.rejected,
+                "timesOpened": self.times_opened,
+            }
+
+    # ------------------------------------------------------------------------
+    # Internals (called with self._lock held)
+    # ------------------------------------------------------------------------
+
+    def _record(self, succeeded: bool) -> None:
+        now = time.monotonic()
+        self._calls.append((now, succeeded))
+        self._trim(now)
+
+    def _trim(self, now: float) -> None:
+        cutoff = now - self.window_seconds
+        while self._calls and self._calls[0][0] < cutoff:
+            self._calls.popleft()
+
+    def _should_trip(self) -> bool:
+        if len(self._calls) < self.minimum_calls:
+            return False
+        failures = sum(1 for _, ok in self._calls if not ok)
+        return failures / len(self._calls) >= self.failure_rate_threshold
+
+    def _open(self) -> None:
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+        self.times_opened += 1
+        logger.warning(f"Circuit {self.name} opened, skipping calls for {self.open_seconds:.0f}s")
+
+    def _close(self) -> None:
+        self._state = self.CLOSED
+        self._calls.clear()
+        self._probe_in_flight = False
+        logger.info(f"Circuit {self.name} closed")
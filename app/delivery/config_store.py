@@ -0,0 +1,220 @@
+# app/delivery/config_store.py
+# Hot-reloadable Delivery Config (Firestore + Local Snapshot)
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import logging
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from .models import DELIVERY_OPTIONS_SCHEMA, DELIVERY_PRICING_CONFIG
+
+logger = logging.getLogger(__name__)
+
+BUILTIN_CONFIG_VERSION = "builtin"
+
+_REQUIRED_PRICING_FIELDS = ("baseFare", "perKmRate", "minFare", "maxFare")
+_REQUIRED_OPTION_FIELDS = ("id", "name", "iconUrl", "description", "website")
+
+
+class DeliveryConfig(NamedTuple):
+    """One immutable generation of pricing + options config"""
+    version: str
+    pricing: Dict[str, Dict]
+    options: Dict[str, Dict]
+    digest: str = ""                 # config_digest(pricing, options)
+
+
+def config_digest(pricing: Dict, options: Dict) -> str:
+    """Content hash of a pricing/options payload, independent of key order"""
+    payload = json.dumps({"pricing": pricing, "options": options}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def validate_config(pricing: Dict, options: Dict) -> None:
+    """Raise ValueError if a pricing/options payload is not usable"""
+    if not isinstance(pricing, dict) or not pricing:
+        raise ValueError("pricing must be a non-empty map")
+    if not isinstance(options, dict) or not options:
+        raise ValueError("options must be a non-empty map")
+
+    for provider, config in pricing.items():
+        for field in _REQUIRED_PRICING_FIELDS:
+            value = config.get(field) if isinstance(config, dict) else None
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f"pricing.{provider}.{field} must be a number")
+
+    for option_id, option in options.items():
+        for field in _REQUIRED_OPTION_FIELDS:
+            if not isinstance(option, dict) or not isinstance(option.get(field), str):
+                raise ValueError(f"options.{option_id}.{field} must be a string")
+
+
+# ============================================================================
+# CONFIG STORE
+# ============================================================================
+
+class DeliveryConfigStore:
+    """
+    Holds the live delivery config and swaps it atomically on change.
+
+    - Cold start: versioned local snapshot file if present, else the
+      built-in DELIVERY_PRICING_CONFIG / DELIVERY_OPTIONS_SCHEMA.
+    - Live: a Firestore snapshot listener on `document_path` (fields
+      `version`, `pricing`, `options`) pushes every change; it is validated,
+      swapped in, handed to subscribers and written back to the snapshot.
+
+    The request path only ever reads `current`; it never touches Firestore.
+    """
+
+    def __init__(self,
+                 document_path: str = "config/delivery",
+                 snapshot_path: Optional[str] = None):
+        self.document_path = document_path
+        self.snapshot_path = snapshot_path
+
+        self._lock = threading.Lock()
+        self._subscribers: List[Callable[[DeliveryConfig], None]] = []
+        self._watch = None
+
+        self._current = self._load_snapshot() or DeliveryConfig(
+            version=BUILTIN_CONFIG_VERSION,
+            pricing=DELIVERY_PRICING_CONFIG,
+            options=DELIVERY_OPTIONS_SCHEMA,
+            digest=config_digest(DELIVERY_PRICING_CONFIG, DELIVERY_OPTIONS_SCHEMA),
+        )
+
+    @classmethod
+    def from_env(cls) -> "DeliveryConfigStore":
+        """Build from DELIVERY_CONFIG_DOC and DELIVERY_CONFIG_SNAPSHOT"""
+        default_snapshot = os.path.join(tempfile.gettempdir(), "surplus_serve_delivery_config.json")
+        return cls(
+            document_path=os.getenv("DELIVERY_CONFIG_DOC", "config/delivery"),
+            snapshot_path=os.getenv("DELIVERY_CONFIG_SNAPSHOT", default_snapshot) or None,
+        )
+
+    @property
+    def current(self) -> DeliveryConfig:
+        return self._current
+
+    def subscribe(self, callback: Callable[[DeliveryConfig], None]) -> None:
+        """Register a callback and immediately hand it the current config"""
+        with self._lock:
+            self._subscribers.append(callback)
+            config = self._current
+        callback(config)
+
+    def start(self, db) -> None:
+        """Attach the Firestore snapshot listener (idempotent)"""
+        if self._watch is not None:
+            return
+        try:
+            self._watch = db.document(self.document_path).on_snapshot(self._on_snapshot)
+            logger.info(f"Listening for delivery config on {self.document_path}")
+        except Exception as e:
+            logger.error(f"Could not listen on {self.document_path}, keeping {self._current.version}: {str(e)}")
+
+    def stop(self) -> None:
+        if self._watch is not None:
+            self._watch.unsubscribe()
+            self._watch = None
+
+    def apply(self, version: str, pricing: Dict, options: Dict, persist: bool = True) -> bool:
+        """
+        Validate and swap in a new config. Returns False (keeping the
+        current config) if the payload is invalid or identical to the
+        current one. An edit that changes content without bumping
+        `version` is still applied.
+        """
+        try:
+            validate_config(pricing, options)
+        except ValueError as e:
+            logger.error(f"Rejected delivery config {version}: {str(e)}")
+            return False
+
+        digest = config_digest(pricing, options)
+        with self._lock:
+            if version == self._current.version and digest == self._current.digest:
+                return False
+            if version == self._current.version:
+                logger.warning(f"Delivery config {version} changed without a version bump")
+            config = DeliveryConfig(version=version, pricing=pricing, options=options, digest=digest)
+            self._current = config
+            subscribers = list(self._subscribers)
+
+        logger.info(f"Delivery config switched to version {version}")
+        for callback in subscribers:
+            try:
+                callback(config)
+            except Exception as e:
+                logger.error(f"Delivery config subscriber failed: {str(e)}")
+
+        if persist:
+            self._save_snapshot(config)
+        return True
+
+    # ------------------------------------------------------------------------
+    # Firestore listener
+    # ------------------------------------------------------------------------
+
+    def _on_snapshot(self, doc_snapshots, changes, read_time) -> None:
+        for doc in doc_snapshots:
+            if not doc.exists:
+                logger.warning(f"{self.document_path} missing, keeping {self._current.version}")
+                continue
+            data = doc.to_dict() or {}
+            version = str(data.get("version") or (doc.update_time.isoformat() if doc.update_time else ""))
+            last_updated = doc.update_time.isoformat() if doc.update_time else datetime.now().isoformat()
+            pricing = {
+                provider: {**config, "provider": provider, "lastUpdated": last_updated}
+                for provider, config in (data.get("pricing") or {}).items()
+                if isinstance(config, dict)
+            }
+            self.apply(version, pricing, data.get("options") or {})
+
+    # ------------------------------------------------------------------------
+    # Local snapshot
+    # ------------------------------------------------------------------------
+
+    def _load_snapshot(self) -> Optional[DeliveryConfig]:
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return None
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            validate_config(data.get("pricing"), data.get("options"))
+            logger.info(f"Loaded delivery config {data['version']} from {self.snapshot_path}")
+            return DeliveryConfig(
+                version=data["version"],
+                pricing=data["pricing"],
+                options=data["options"],
+                digest=config_digest(data["pricing"], data["options"]),
+            )
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring delivery config snapshot: {str(e)}")
+            return None
+
+    def _save_snapshot(self, config: DeliveryConfig) -> None:
+        """Write via temp file + rename so other workers never read a partial file"""
+        if not self.snapshot_path:
+            return
+        tmp_path = None
+        try:
+            directory = os.path.dirname(os.path.abspath(self.snapshot_path))
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({
+                    "version": config.version,
+                    "savedAt": datetime.now().isoformat(),
+                    "pricing": config.pricing,
+                    "options": config.options,
+                }, f)
+            os.replace(tmp_path, self.snapshot_path)
+        except (OSError, TypeError, ValueError) as e:
+            # TypeError: a Firestore value (timestamp, GeoPoint, ...) JSON can't encode
+            logger.warning(f"Could not write delivery config snapshot: {str(e)}")
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
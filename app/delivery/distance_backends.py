@@ -0,0 +1,207 @@
+# app/delivery/distance_backends.py
+# Pluggable Distance Backends and Fallback Chains
+#
+# DISTANCE_BACKENDS=road_graph,google,zone_grid,haversine   (tried in order; haversine always ends the chain)
+
+import logging
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Protocol, Sequence, Tuple
+
+from .models import DistanceSource
+
+if TYPE_CHECKING:
+    from .services import PriceEstimationService
+
+logger = logging.getLogger(__name__)
+
+Estimate = Tuple[float, int, DistanceSource]
+Point = Tuple[float, float]
+
+# The local road graph answers first when loaded; Google covers points off it
+DEFAULT_CHAIN = ("road_graph", "google", "zone_grid", "haversine")
+# DISTANCE_LOCAL_FIRST=1: Google only when nothing local is confident
+LOCAL_FIRST_CHAIN = ("road_graph", "zone_grid", "calibrated", "google", "haversine")
+
+
+class DistanceBackend(Protocol):
+    """
+    One source of (distance_km, duration_minutes). A backend returns None
+    (or leaves a matrix cell None) when it cannot answer, and the next
+    backend in the chain is asked.
+    """
+
+    name: str
+
+    def route(self, pickup_lat: float, pickup_lng: float,
+              drop_lat: float, drop_lng: float) -> Optional[Estimate]:
+        ...
+
+    def fill_matrix(self, rows: List[List[Optional[Estimate]]],
+                    origins: Sequence[Point], destinations: Sequence[Point]) -> None:
+        """Fill the None cells of rows[i][j] (origins[i] -> destinations[j]) it can answer"""
+        ...
+
+
+class _RouteByRoute:
+    """fill_matrix for backends without a batch API: one route() per missing cell"""
+
+    def fill_matrix(self, rows, origins, destinations) -> None:
+        for i, (o_lat, o_lng) in enumerate(origins):
+            for j, (d_lat, d_lng) in enumerate(destinations):
+                if rows[i][j] is None:
+                    rows[i][j] = self.route(o_lat, o_lng, d_lat, d_lng)
+
+
+# ============================================================================
+# BACKENDS
+# ============================================================================
+
+class GoogleDistanceBackend:
+    """Distance Matrix API behind the service's single-flight, circuit breaker and route cache"""
+
+    name = "google"
+
+    def __init__(self, service: "PriceEstimationService"):
+        self.service = service
+
+    def route(self, pickup_lat, pickup_lng, drop_lat, drop_lng) -> Optional[Estimate]:
+        service = self.service
+        cache_key = service.route_cache.key(pickup_lat, pickup_lng, drop_lat, drop_lng)
+        # Concurrent quotes for the same route share one lookup
+        return service.inflight.do(
+            cache_key,
+            lambda: service._fetch_route(cache_key, pickup_lat, pickup_lng, drop_lat, drop_lng),
+        )
+
+    def fill_matrix(self, rows, origins, destinations) -> None:
+        """Uncached cells in blocks within the API's per-request limits"""
+        service = self.service
+        dest_chunk = min(service.MATRIX_MAX_DESTINATIONS, len(destinations))
+        origin_chunk = max(1, min(service.MATRIX_MAX_ORIGINS,
+                                  service.MATRIX_MAX_ELEMENTS // dest_chunk))
+        for o_start in range(0, len(origins), origin_chunk):
+            for d_start in range(0, len(destinations), dest_chunk):
+                service._fill_matrix_block(
+                    rows, origins, destinations,
+                    range(o_start, min(o_start + origin_chunk, len(origins))),
+                    range(d_start, min(d_start + dest_chunk, len(destinations))),
+                )
+
+
+class RoadGraphBackend:
+    """Fastest path over the local OSM road graph (no network)"""
+
+    name = "road_graph"
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def route(self, pickup_lat, pickup_lng, drop_lat, drop_lng) -> Optional[Estimate]:
+        estimate = self.graph.route(pickup_lat, pickup_lng, drop_lat, drop_lng)
+        return (*estimate, DistanceSource.ROAD_GRAPH) if estimate is not None else None
+
+    def fill_matrix(self, rows, origins, destinations) -> None:
+        """One matrix query over the origins and destinations that still have gaps"""
+        row_ids = [i for i, row in enumerate(rows) if any(cell is None for cell in row)]
+        if not row_ids:
+            return
+        col_ids = [j for j in range(len(destinations)) if any(rows[i][j] is None for i in row_ids)]
+        found = self.graph.route_matrix([origins[i] for i in row_ids], [destinations[j] for j in col_ids])
+        for i, found_row in zip(row_ids, found):
+            for j, estimate in zip(col_ids, found_row):
+                if rows[i][j] is None and estimate is not None:
+                    rows[i][j] = (*estimate, DistanceSource.ROAD_GRAPH)
+
+
+class ZoneGridBackend(_RouteByRoute):
+    """Precomputed zone × zone road distances"""
+
+    name = "zone_grid"
+
+    def __init__(self, grid):
+        self.grid = grid
+
+    def route(self, pickup_lat, pickup_lng, drop_lat, drop_lng) -> Optional[Estimate]:
+        estimate = self.grid.lookup(pickup_lat, pickup_lng, drop_lat, drop_lng)
+        return (*estimate, DistanceSource.ZONE_GRID) if estimate is not None else None
+
+
+class ConfidentCalibrationBackend(_RouteByRoute):
+    """Calibrated straight line, only where the pickup zone has its own fit"""
+
+    name = "calibrated"
+
+    def __init__(self, service: "PriceEstimationService"):
+        self.service = service
+
+    def route(self, pickup_lat, pickup_lng, drop_lat, drop_lng) -> Optional[Estimate]:
+        straight_km = self.service._haversine_distance(pickup_lat, pickup_lng, drop_lat, drop_lng)
+        distance_km, duration_minutes, confident = self.service.calibration.estimate(
+            pickup_lat, pickup_lng, drop_lat, drop_lng, straight_km
+        )
+        return (distance_km, duration_minutes, DistanceSource.CALIBRATED) if confident else None
+
+
+class HaversineBackend(_RouteByRoute):
+    """Straight line (calibrated when a table is loaded); always answers"""
+
+    name = "haversine"
+
+    def __init__(self, service: "PriceEstimationService"):
+        self.service = service
+
+    def route(self, pickup_lat, pickup_lng, drop_lat, drop_lng) -> Estimate:
+        return self.service._haversine_estimate(pickup_lat, pickup_lng, drop_lat, drop_lng)
+
+
+# ============================================================================
+# REGISTRY
+# ============================================================================
+
+# name -> factory(service); a factory returns None when its backend is not configured
+BACKEND_FACTORIES: Dict[str, Callable[["PriceEstimationService"], Optional[DistanceBackend]]] = {
+    "google": lambda service: GoogleDistanceBackend(service) if service.gmaps is not None else None,
+    "road_graph": lambda service: RoadGraphBackend(service.road_graph) if service.road_graph is not None else None,
+    "zone_grid": lambda service: ZoneGridBackend(service.zone_grid) if service.zone_grid is not None else None,
+    "calibrated": lambda service: ConfidentCalibrationBackend(service) if service.calibration is not None else None,
+    "haversine": lambda service: HaversineBackend(service),
+}
+
+
+def register_distance_backend(name: str):
+    """Decorator adding a backend factory under `name` (usable in DISTANCE_BACKENDS)"""
+    def decorator(factory):
+        BACKEND_FACTORIES[name] = factory
+        return factory
+    return decorator
+
+
+def parse_chain(value: Optional[str], local_first: bool = False) -> Tuple[str, ...]:
+    """Backend names from a comma-separated DISTANCE_BACKENDS value, or the default chain"""
+    if value:
+        return tuple(name.strip() for name in value.split(",") if name.strip())
+    return LOCAL_FIRST_CHAIN if local_first else DEFAULT_CHAIN
+
+
+def build_chain(service: "PriceEstimationService", names: Sequence[str]) -> List[DistanceBackend]:
+    """
+    Instantiate the named backends in order, skipping unknown or
+    unconfigured ones. Haversine is appended if missing, so a chain
+    always ends with a backend that answers.
+    """
+    chain: List[DistanceBackend] = []
+    for name in names:
+        factory = BACKEND_FACTORIES.get(name)
+        if factory is None:
+            logger.error(f"Unknown distance backend '{name}', known: {', '.join(BACKEND_FACTORIES)}")
+            continue
+        backend = factory(service)
+        if backend is None:
+            logger.info(f"Distance backend '{name}' not configured, skipped")
+            continue
+        if any(existing.name == backend.name for existing in chain):
+            continue
+        chain.append(backend)
+    if not chain or chain[-1].name != "haversine":
+        chain = [backend for backend in chain if backend.name != "haversine"]
+        chain.append(HaversineBackend(service))
+    return chain
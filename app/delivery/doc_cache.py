@@ -0,0 +1,264 @@
+# app/delivery/doc_cache.py
+# Read-through Cache for Firestore Documents
+
+import os
+import threading
+import time
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from .singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    __slots__ = ("data", "update_time", "expires_at", "hits", "watch")
+
+    def __init__(self, data: Optional[Dict], update_time, expires_at: float):
+        self.data = data                 # None = document does not exist
+        self.update_time = update_time
+        self.expires_at = expires_at
+        self.hits = 0
+        self.watch = None
+
+
+# ============================================================================
+# DOCUMENT CACHE
+# ============================================================================
+
+class DocumentCache:
+    """
+    Per-worker read-through cache of one Firestore collection.
+
+    - Every entry lives for at most `ttl_seconds` (missing documents too),
+      in an LRU bounded by `max_entries`.
+    - Once an entry has been read `watch_after_hits` times it gets its own
+      on_snapshot listener (at most `max_watches` at a time). The listener
+      refreshes the entry on every change, so hot documents are never
+      staler than one listener tick and can stay cached for
+      `watched_ttl_seconds` instead.
+    - Concurrent misses for the same document share one Firestore read.
+
+    Returned dicts are shared between callers and must not be mutated.
+    """
+
+    # Documents per get_all call, and concurrent get_all calls per get_many
+    GET_ALL_CHUNK = 100
+    GET_ALL_PARALLELISM = 4
+
+    def __init__(self,
+                 db,
+                 collection: str,
+                 max_entries: int = 2000,
+                 ttl_seconds: float = 5,
+                 watched_ttl_seconds: float = 300,
+                 watch_after_hits: int = 3,
+                 max_watches: int = 100):
+        self.db = db
+        self.collection = collection
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.watched_ttl_seconds = watched_ttl_seconds
+        self.watch_after_hits = watch_after_hits
+        self.max_watches = max_watches
+
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight = SingleFlight()
+        self._watches = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls, db, collection: str) -> "DocumentCache":
+        """Build from DOC_CACHE_* environment variables"""
+        return cls(
+            db,
+            collection,
+            max_entries=int(os.getenv("DOC_CACHE_SIZE", "2000")),
+            ttl_seconds=float(os.getenv("DOC_CACHE_TTL_SECONDS", "5")),
+            max_watches=int(os.getenv("DOC_CACHE_MAX_WATCHES", "100")),
+        )
+
+    def get(self, doc_id: str) -> Optional[Dict]:
+        """Return the document's data, or None if it does not exist"""
+        now = time.time()
+        watch_ref = None
+
+        with self._lock:
+            entry = self._entries.get(doc_id)
+            if entry is not None and entry.expires_at > now:
+                self._entries.move_to_end(doc_id)
+                self.hits += 1
+                entry.hits += 1
+                if (entry.watch is None and entry.hits >= self.watch_after_hits
+                        and self._watches < self.max_watches):
+                    entry.watch = True          # reserved; replaced by the real watch below
+                    self._watches += 1
+                    watch_ref = doc_id
+                data = entry.data
+            else:
+                self.misses += 1
+                data = None
+                entry = None
+
+        if watch_ref is not None:
+            self._start_watch(watch_ref)
+        if entry is not None:
+            return data
+
+        return self._inflight.do(doc_id, lambda: self._load(doc_id))
+
+    def get_many(self, doc_ids: Iterable[str]) -> Dict[str, Optional[Dict]]:
+        """
+        Resolve several documents at once. Cache hits are served locally;
+        misses are fetched with get_all in parallel chunks.
+
+        Returns:
+            Map of doc_id -> data (None if the document does not exist)
+        """
+        now = time.time()
+        found: Dict[str, Optional[Dict]] = {}
+        missing: List[str] = []
+
+        with self._lock:
+            for doc_id in doc_ids:
+                if doc_id in found:
+                    continue
+                entry = self._entries.get(doc_id)
+                if entry is not None and entry.expires_at > now:
+                    self._entries.move_to_end(doc_id)
+                    self.hits += 1
+                    found[doc_id] = entry.data
+                else:
+                    self.misses += 1
+                    found[doc_id] = None
+                    missing.append(doc_id)
+
+        if not missing:
+            return found
+
+        chunks = [missing[i:i + self.GET_ALL_CHUNK] for i in range(0, len(missing), self.GET_ALL_CHUNK)]
+        if len(chunks) == 1:
+            results = [self._load_chunk(chunks[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(len(chunks), self.GET_ALL_PARALLELISM)) as pool:
+                results = list(pool.map(self._load_chunk, chunks))
+
+        for loaded in results:
+            found.update(loaded)
+        return found
+
+    def invalidate(self, doc_id: str) -> None:
+        """Drop an entry after a local write so the next read goes to Firestore"""
+        with self._lock:
+            entry = self._entries.pop(doc_id, None)
+            if entry is None:
+                return
+            self.invalidations += 1
+        self._stop_watch(entry)
+
+    def stats(self) -> Dict:
+        """Counters for the /metrics endpoint"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxEntries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": round(self.hits / total, 4) if total else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "watches": self._watches,
+            }
+
+    # ------------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------------
+
+    def _load(self, doc_id: str) -> Optional[Dict]:
+        doc = self.db.collection(self.collection).document(doc_id).get()
+        data = doc.to_dict() if doc.exists else None
+        self._store(doc_id, data, getattr(doc, "update_time", None))
+        return data
+
+    def _load_chunk(self, doc_ids: List[str]) -> Dict[str, Optional[Dict]]:
+        collection = self.db.collection(self.collection)
+        loaded: Dict[str, Optional[Dict]] = {}
+        for doc in self.db.get_all([collection.document(doc_id) for doc_id in doc_ids]):
+            data = doc.to_dict() if doc.exists else None
+            self._store(doc.id, data, getattr(doc, "update_time", None))
+            loaded[doc.id] = data
+        return loaded
+
+    def _store(self, doc_id: str, data: Optional[Dict], update_time) -> None:
+        evicted: List[_Entry] = []
+        with self._lock:
+            entry = self._entries.get(doc_id)
+            if entry is not None:
+                # A listener may already have delivered a newer version
+                if entry.update_time and update_time and update_time < entry.update_time:
+                    return
+                entry.data = data
+                entry.update_time = update_time
+                entry.expires_at = time.time() + (
+                    self.watched_ttl_seconds if entry.watch is not None else self.ttl_seconds)
+                self._entries.move_to_end(doc_id)
+                return
+
+            self._entries[doc_id] = _Entry(data, update_time, time.time() + self.ttl_seconds)
+            while len(self._entries) > self.max_entries:
+                _, old = self._entries.popitem(last=False)
+                self.evictions += 1
+                evicted.append(old)
+
+        for old in evicted:
+            self._stop_watch(old)
+
+    def _start_watch(self, doc_id: str) -> None:
+        try:
+            watch = self.db.collection(self.collection).document(doc_id).on_snapshot(
+                lambda docs, changes, read_time: self._on_snapshot(doc_id, docs)
+            )
+        except Exception as e:
+            logger.warning(f"Could not watch {self.collection}/{doc_id}: {str(e)}")
+            watch = None
+
+        with self._lock:
+            entry = self._entries.get(doc_id)
+            if entry is not None and entry.watch is True:
+                if watch is not None:
+                    entry.watch = watch
+                    entry.expires_at = time.time() + self.watched_ttl_seconds
+                    return
+                entry.watch = None
+            self._watches -= 1
+        # Entry was evicted or invalidated while the listener was attaching
+        if watch is not None:
+            watch.unsubscribe()
+
+    def _stop_watch(self, entry: _Entry) -> None:
+        watch, entry.watch = entry.watch, None
+        if watch is None:
+            return
+        if watch is True:
+            # Still attaching; _start_watch sees the entry gone and cleans up
+            return
+        with self._lock:
+            self._watches -= 1
+        try:
+            watch.unsubscribe()
+        except Exception as e:
+            logger.warning(f"Error detaching {self.collection} listener: {str(e)}")
+
+    def _on_snapshot(self, doc_id: str, docs) -> None:
+        for doc in docs:
+            data = doc.to_dict() if doc.exists else None
+            self._store(doc_id, data, getattr(doc, "update_time", None))
@@ -0,0 +1,188 @@
+# app/delivery/export.py
+# Streaming Export of Delivery Collections (NDJSON / CSV)
+
+import base64
+import binascii
+import csv
+import io
+import json
+import logging
+import os
+from datetime import date, datetime
+from typing import Dict, Iterator, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+EXPORTABLE_COLLECTIONS = ("delivery_orders", "deliveries", "donations")
+EXPORT_FORMATS = ("ndjson", "csv")
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(doc_id: str) -> str:
+    """Opaque resume token for 'everything after this document'"""
+    return base64.urlsafe_b64encode(doc_id.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> str:
+    """Raises ValueError on a malformed token"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        return base64.b64decode(padded.encode("ascii"), altchars=b"-_", validate=True).decode("utf-8")
+    except (binascii.Error, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {str(e)}")
+
+
+def _export_default(value):
+    """Firestore value types -> JSON (ISO 8601 timestamps, keeping sub-second precision)"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, "latitude") and hasattr(value, "longitude"):   # GeoPoint
+        return {"latitude": value.latitude, "longitude": value.longitude}
+    if hasattr(value, "path") and hasattr(value, "id"):              # DocumentReference
+        return value.path
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode("ascii")
+    return str(value)
+
+
+def iter_documents(db,
+                   collection: str,
+                   after: Optional[str] = None,
+                   page_size: int = DEFAULT_PAGE_SIZE,
+                   limit: Optional[int] = None) -> Iterator[Dict]:
+    """
+    Yield {"_id": doc_id, **fields} for every document in document-ID
+    order, one `page_size` query at a time. Only the current page's
+    stream is open, so memory does not grow with the collection.
+
+    Args:
+        after: resume after this document ID (exclusive)
+        limit: stop after this many documents
+    """
+    emitted = 0
+    while True:
+        query = db.collection(collection).order_by("__name__").limit(page_size)
+        if after is not None:
+            query = query.start_after({"__name__": after})
+
+        page_count = 0
+        for doc in query.stream():
+            page_count += 1
+            after = doc.id
+            yield {"_id": doc.id, **(doc.to_dict() or {})}
+            emitted += 1
+            if limit is not None and emitted >= limit:
+                return
+
+        if page_count < page_size:
+            return
+
+
+def ndjson_lines(rows: Iterator[Dict],
+                 limit: Optional[int] = None,
+                 cursor_trailer: bool = False) -> Iterator[str]:
+    """
+    One JSON object per row. With `cursor_trailer`, a final
+    {"_nextCursor": token} record follows: the cursor for the next page if
+    `limit` cut the export short, null once the collection is exhausted.
+    """
+    last_id, count = None, 0
+    for row in rows:
+        last_id = row["_id"]
+        count += 1
+        yield json.dumps(row, default=_export_default, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+    if cursor_trailer:
+        more = limit is not None and count >= limit and last_id is not None
+        yield json.dumps({"_nextCursor": encode_cursor(last_id) if more else None}) + "\n"
+
+
+def csv_lines(rows: Iterator[Dict], fields: Optional[Sequence[str]] = None) -> Iterator[str]:
+    """
+    CSV with an `_id` column. Columns are `fields` if given, else the
+    top-level keys of the first row; keys first seen later are dropped
+    (pass `fields` to pin them). Nested values are JSON-encoded.
+    """
+    buffer = io.StringIO()
+    writer = None
+    columns: List[str] = []
+
+    for row in rows:
+        if writer is None:
+            columns = ["_id"] + [f for f in (fields or sorted(row)) if f != "_id"]
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+        writer.writerow([_csv_cell(row.get(column)) for column in columns])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if writer is None and fields:
+        csv.writer(buffer).writerow(["_id"] + [f for f in fields if f != "_id"])
+        yield buffer.getvalue()
+
+
+def _csv_cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=_export_default, ensure_ascii=False, separators=(",", ":"))
+    encoded = _export_default(value)
+    return json.dumps(encoded, separators=(",", ":")) if isinstance(encoded, dict) else encoded
+
+
+def export_lines(db,
+                 collection: str,
+                 fmt: str = "ndjson",
+                 after: Optional[str] = None,
+                 page_size: int = DEFAULT_PAGE_SIZE,
+                 limit: Optional[int] = None,
+                 fields: Optional[Sequence[str]] = None,
+                 cursor_trailer: bool = False) -> Iterator[str]:
+    """
+    Text lines of a collection export in `fmt` (see EXPORT_FORMATS).
+    `cursor_trailer` ends NDJSON with a resume record (see ndjson_lines);
+    CSV has no room for one, so CSV clients resume from the last `_id`.
+    """
+    if collection not in EXPORTABLE_COLLECTIONS:
+        raise ValueError(f"collection must be one of: {', '.join(EXPORTABLE_COLLECTIONS)}")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    if not 1 <= page_size <= MAX_PAGE_SIZE:
+        raise ValueError(f"page_size must be between 1 and {MAX_PAGE_SIZE}")
+    if limit is not None and limit < 1:
+        raise ValueError("limit must be at least 1")
+
+    rows = iter_documents(db, collection, after=after, page_size=page_size, limit=limit)
+    if fmt == "csv":
+        return csv_lines(rows, fields)
+    return ndjson_lines(rows, limit=limit, cursor_trailer=cursor_trailer)
+
+
+def last_exported_id(path: str) -> Optional[str]:
+    """
+    `_id` of the last complete row of an earlier NDJSON export, read from
+    the file's tail. A partial trailing row (interrupted write) is
+    truncated away so it is exported again.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        tail, start = b"", size
+        while start > 0 and tail.count(b"\n") < 2:
+            step = min(65536, start)
+            start -= step
+            f.seek(start)
+            tail = f.read(step) + tail
+        complete, _, partial = tail.rpartition(b"\n")
+        if partial:
+            f.truncate(size - len(partial))
+        last = complete.rsplit(b"\n", 1)[-1]
+        return json.loads(last)["_id"] if last.strip() else None
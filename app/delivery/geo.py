@@ -0,0 +1,17 @@
+# app/delivery/geo.py
+# Great-Circle Distance Helper
+#
+# The one scalar Haversine used across the delivery package. Array code
+# (bulk_pricing.haversine_km, road_graph edge lengths) keeps its numpy
+# version but shares EARTH_RADIUS_KM.
+
+from math import radians, sin, cos, sqrt, atan2
+
+EARTH_RADIUS_KM = 6371
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance in km (unrounded)"""
+    lat1, lng1, lat2, lng2 = map(radians, [lat1, lng1, lat2, lng2])
+    h = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lng2 - lng1) / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * atan2(sqrt(h), sqrt(1 - h))
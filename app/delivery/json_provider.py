@@ -0,0 +1,93 @@
+# app/delivery/json_provider.py
+# Fast JSON Provider for API Responses
+
+import dataclasses
+import decimal
+import uuid
+from datetime import date
+from typing import Any, Mapping
+
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:  # stdlib json fallback, same output
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    """
+    Types the encoders do not handle natively. Matches Flask's default
+    provider, plus delivery models (via to_dict) and read-only mappings.
+    """
+    to_dict = getattr(value, "to_dict", None)
+    if callable(to_dict):
+        return to_dict()
+    if isinstance(value, Mapping):
+        return dict(value)
+    if isinstance(value, date):
+        return http_date(value)
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    if hasattr(value, "__html__"):
+        return str(value.__html__())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+# ============================================================================
+# JSON PROVIDER
+# ============================================================================
+
+class DeliveryJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider that encodes with orjson when it is installed.
+
+    Responses are encoded straight to bytes in one pass (no intermediate
+    str), with the same key order, date format and separators as Flask's
+    default provider. Routes may hand delivery models to jsonify directly;
+    they are expanded through `to_dict` during encoding.
+
+    Differences from the stdlib path: non-ASCII text is emitted as UTF-8
+    instead of \\u escapes, and NaN/Infinity encode as null.
+    """
+
+    default = staticmethod(_default)
+
+    @property
+    def fast(self) -> bool:
+        return orjson is not None
+
+    def _orjson_options(self, indent: bool = False) -> int:
+        # Route dataclasses and dates through _default so they match Flask's output
+        option = orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if orjson is None or set(kwargs) - {"separators"}:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_default, option=self._orjson_options()).decode("utf-8")
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(
+            obj,
+            default=_default,
+            option=self._orjson_options(indent) | orjson.OPT_APPEND_NEWLINE,
+        )
+        return self._app.response_class(body, mimetype=self.mimetype)
@@ -0,0 +1,253 @@
+# app/delivery/location_ingest.py
+# Driver Location Ingest with Write Coalescing
+
+import os
+import threading
+import time
+import logging
+from typing import Dict, List, NamedTuple, Optional
+
+from firebase_admin import firestore
+
+from .geo import haversine_km
+from .write_batcher import MAX_BATCH_WRITES, apply_ops, update_op
+
+logger = logging.getLogger(__name__)
+
+
+class DriverFix(NamedTuple):
+    """One GPS fix for a delivery's driver"""
+    lat: float
+    lng: float
+    recorded_at: float               # epoch seconds (driver clock if sent, else server)
+
+
+def distance_m(a: DriverFix, b: DriverFix) -> float:
+    """Great-circle distance between two fixes in meters"""
+    return haversine_km(a.lat, a.lng, b.lat, b.lng) * 1000
+
+
+# Driver apps send epoch seconds or milliseconds; anything above this is milliseconds
+_MILLISECONDS_THRESHOLD = 1e11
+
+# A delivery whose write fails this many flushes in a row (e.g. no
+# deliveries/{id} document) is dropped from the buffer
+MAX_FLUSH_FAILURES = 3
+
+
+def normalize_recorded_at(recorded_at: Optional[float], now: float) -> float:
+    """Client timestamp as epoch seconds, never later than server time"""
+    if recorded_at is None:
+        return now
+    if recorded_at > _MILLISECONDS_THRESHOLD:
+        recorded_at /= 1000
+    return min(recorded_at, now)
+
+
+class _Track:
+    __slots__ = ("latest", "flushed", "flushed_at", "dirty", "failures")
+
+    def __init__(self, fix: DriverFix):
+        self.latest = fix
+        self.flushed: Optional[DriverFix] = None
+        self.flushed_at = 0.0
+        self.dirty = True
+        self.failures = 0
+
+
+# ============================================================================
+# LOCATION INGEST BUFFER
+# ============================================================================
+
+class LocationIngestBuffer:
+    """
+    Buffers driver pings in memory, keeping only the latest fix per delivery.
+
+    Fixes reach Firestore (`deliveries/{id}.driver_lat/driver_lng`) on a
+    fixed cadence, or sooner when the driver has moved more than
+    `move_threshold_m` since the last written fix — but never more often
+    than once per `min_write_interval` per document, which keeps each
+    delivery well under Firestore's per-document write rate. Only the
+    deliveries document is written; the donation document is left alone.
+
+    Trackers read live positions straight from the buffer.
+    """
+
+    def __init__(self,
+                 db,
+                 flush_interval_seconds: float = 10,
+                 move_threshold_m: float = 150,
+                 min_write_interval: float = 2,
+                 idle_seconds: float = 3600):
+        self.db = db
+        self.flush_interval_seconds = flush_interval_seconds
+        self.move_threshold_m = move_threshold_m
+        self.min_write_interval = min_write_interval
+        self.idle_seconds = idle_seconds
+
+        self._cond = threading.Condition()
+        self._tracks: Dict[str, _Track] = {}
+        self._urgent = False
+        self._pid: Optional[int] = None
+
+        self.pings = 0
+        self.stale_pings = 0
+        self.writes = 0
+        self.failed_writes = 0
+        self.dropped = 0
+
+    @classmethod
+    def from_env(cls, db) -> "LocationIngestBuffer":
+        """Build from DRIVER_LOCATION_* environment variables"""
+        return cls(
+            db,
+            flush_interval_seconds=float(os.getenv("DRIVER_LOCATION_FLUSH_SECONDS", "10")),
+            move_threshold_m=float(os.getenv("DRIVER_LOCATION_MOVE_THRESHOLD_M", "150")),
+        )
+
+    def ingest(self, delivery_id: str, lat: float, lng: float,
+               recorded_at: Optional[float] = None) -> None:
+        """
+        Record a ping; out-of-order pings older than the latest fix are dropped.
+        `recorded_at` may be epoch seconds or milliseconds; future times are
+        clamped to server time so a fast driver clock cannot pin the track.
+        """
+        fix = DriverFix(lat, lng, normalize_recorded_at(recorded_at, time.time()))
+        with self._cond:
+            self._ensure_flusher()
+            self.pings += 1
+            track = self._tracks.get(delivery_id)
+            if track is None:
+                self._tracks[delivery_id] = _Track(fix)
+                self._urgent = True
+                self._cond.notify()
+                return
+            if fix.recorded_at < track.latest.recorded_at:
+                self.stale_pings += 1
+                return
+            track.latest = fix
+            track.dirty = True
+            if track.flushed is None or distance_m(track.flushed, fix) >= self.move_threshold_m:
+                self._urgent = True
+                self._cond.notify()
+
+    def latest(self, delivery_id: str) -> Optional[DriverFix]:
+        with self._cond:
+            track = self._tracks.get(delivery_id)
+            return track.latest if track else None
+
+    def flush(self, force: bool = False) -> int:
+        """
+        Write dirty fixes to Firestore. Without `force`, only fixes that are
+        due (cadence elapsed, or moved past the threshold) are written.
+
+        Returns:
+            Number of documents written
+        """
+        now = time.time()
+        due: List = []
+        with self._cond:
+            for delivery_id, track in list(self._tracks.items()):
+                if not track.dirty:
+                    if now - track.latest.recorded_at > self.idle_seconds:
+                        del self._tracks[delivery_id]
+                    continue
+                since_write = now - track.flushed_at
+                moved = track.flushed is None or distance_m(track.flushed, track.latest) >= self.move_threshold_m
+                if force or since_write >= self.flush_interval_seconds or (
+                        moved and since_write >= self.min_write_interval):
+                    due.append((delivery_id, track.latest))
+
+        written = 0
+        for start in range(0, len(due), MAX_BATCH_WRITES):
+            written += self._commit_chunk(due[start:start + MAX_BATCH_WRITES], now)
+        return written
+
+    def _commit_chunk(self, chunk: List, now: float) -> int:
+        """
+        Commit one batch of fixes. A failed batch is bisected (as in
+        WriteCoalescer) so one bad document only holds back its own track.
+        """
+        batch = self.db.batch()
+        apply_ops(batch, [
+            update_op(self.db.collection('deliveries').document(delivery_id), {
+                'driver_lat': fix.lat,
+                'driver_lng': fix.lng,
+                'driver_location_updated_at': firestore.SERVER_TIMESTAMP,
+            })
+            for delivery_id, fix in chunk
+        ])
+        try:
+            batch.commit()
+        except Exception as e:
+            if len(chunk) > 1:
+                middle = len(chunk) // 2
+                return self._commit_chunk(chunk[:middle], now) + self._commit_chunk(chunk[middle:], now)
+            self._record_failure(chunk[0][0], e)
+            return 0
+
+        with self._cond:
+            for delivery_id, fix in chunk:
+                track = self._tracks.get(delivery_id)
+                if track is None:
+                    continue
+                track.flushed = fix
+                track.flushed_at = now
+                track.dirty = track.latest is not fix
+                track.failures = 0
+            self.writes += len(chunk)
+        return len(chunk)
+
+    def _record_failure(self, delivery_id: str, error: Exception) -> None:
+        with self._cond:
+            self.failed_writes += 1
+            track = self._tracks.get(delivery_id)
+            if track is None:
+                return
+            track.failures += 1
+            if track.failures >= MAX_FLUSH_FAILURES:
+                del self._tracks[delivery_id]
+                self.dropped += 1
+                logger.error(f"Dropping driver location for {delivery_id} after "
+                             f"{track.failures} failed writes: {str(error)}")
+            else:
+                logger.warning(f"Driver location write failed for {delivery_id}: {str(error)}")
+
+    def stats(self) -> Dict:
+        """Counters for the /metrics endpoint"""
+        with self._cond:
+            return {
+                "tracked": len(self._tracks),
+                "pings": self.pings,
+                "stalePings": self.stale_pings,
+                "writes": self.writes,
+                "failedWrites": self.failed_writes,
+                "dropped": self.dropped,
+            }
+
+    # ------------------------------------------------------------------------
+    # Flusher
+    # ------------------------------------------------------------------------
+
+    def _ensure_flusher(self) -> None:
+        """Start the flusher thread (per PID, so forked workers get their own)"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        self._pid = pid
+        threading.Thread(target=self._run, name="driver-location-flusher", daemon=True).start()
+
+    def _run(self) -> None:
+        # Wake on the cadence, or early when a ping crossed the move threshold;
+        # min_write_interval still caps how often one document is written
+        tick = min(self.flush_interval_seconds, self.min_write_interval)
+        while True:
+            with self._cond:
+                if not self._urgent:
+                    self._cond.wait(timeout=tick)
+                self._urgent = False
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Driver location flusher error: {str(e)}")
+            time.sleep(0.2)
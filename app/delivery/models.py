@@ -2,7 +2,8 @@
 # Firestore Models for Delivery Module
 
 from dataclasses import dataclass
-from typing import Optional, List
+from types import MappingProxyType
+from typing import Optional, List, Mapping, Tuple
 from datetime import datetime
 from enum import Enum
 
@@ -28,11 +29,25 @@ class DeliveryStatus(str, Enum):
     CANCELLED = "cancelled"          # Delivery cancelled
 
 
+class DistanceSource(str, Enum):
+    """Where a quote's distance and duration came from"""
+    GOOGLE = "google"                # Live Distance Matrix call
+    CACHE = "cache"                  # Route cache (earlier Distance Matrix result)
+    ROAD_GRAPH = "road_graph"        # Local router over the OSM road graph
+    ZONE_GRID = "zone_grid"          # Precomputed zone × zone road distances
+    CALIBRATED = "calibrated"        # Straight line × fitted detour factor and speed
+    HAVERSINE = "haversine"          # Straight-line fallback
+
+
 # ============================================================================
 # DATA CLASSES (Pydantic Models for validation)
 # ============================================================================
+# All models are slotted (no per-instance __dict__). Records that are held
+# in memory are also frozen; the two built fresh for every quote
+# (DeliveryPriceData, PriceEstimateResponse) skip frozen, whose __init__
+# costs ~4x more per object, and are never mutated after construction.
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class LocationData:
     """Represents a geographic location"""
     latitude: float
@@ -51,7 +66,7 @@ class LocationData:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class DeliveryPriceData:
     """Price estimation for a delivery service"""
     provider: str                    # "porter", "dunzo", "rapido", "swiggy"
@@ -76,7 +91,7 @@ class DeliveryPriceData:
         }
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class DeliveryOption:
     """Represents a delivery service option"""
     id: str                         # "porter", "dunzo", "rapido", "swiggy", "self"
@@ -97,7 +112,7 @@ class DeliveryOption:
         }
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class DeliveryRecord:
     """Complete delivery record for a donation"""
     donation_id: str                # Reference to donation
@@ -130,7 +145,7 @@ class DeliveryRecord:
         }
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class PriceEstimateRequest:
     """Request for price estimation"""
     pickup_latitude: float
@@ -147,17 +162,21 @@ class PriceEstimateRequest:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class PriceEstimateResponse:
     """Response with estimated prices"""
     distance_km: float
     estimated_duration_minutes: int
     providers: dict  # {provider_id: DeliveryPriceData}
+    distance_source: DistanceSource = DistanceSource.HAVERSINE
+    config_version: str = ""         # Pricing config generation used
     
     def to_dict(self):
         return {
             "distanceKm": round(self.distance_km, 2),
             "estimatedDurationMinutes": self.estimated_duration_minutes,
+            "distanceSource": self.distance_source.value,
+            "configVersion": self.config_version,
             "providers": {
                 key: value.to_dict() if isinstance(value, DeliveryPriceData) else value
                 for key, value in self.providers.items()
@@ -263,4 +282,25 @@ DELIVERY_PRICING_CONFIG = {
         "estimatedDeliveryTime": 0,
         "lastUpdated": datetime.now().isoformat(),
     },
-}
\ No newline at end of file
+}
+
+# ============================================================================
+# DELIVERY STATUS DISPLAY — built once, read-only
+# ============================================================================
+
+STATUS_BADGES: Mapping[str, Mapping[str, str]] = MappingProxyType({
+    status: MappingProxyType(badge) for status, badge in {
+        "pending": {"color": "gray", "label": "Pending", "icon": "⏱️"},
+        "booked": {"color": "blue", "label": "Booked", "icon": "✓"},
+        "in_progress": {"color": "orange", "label": "On the way", "icon": "🚚"},
+        "delivered": {"color": "green", "label": "Delivered", "icon": "✓✓"},
+        "cancelled": {"color": "red", "label": "Cancelled", "icon": "✗"},
+    }.items()
+})
+
+STATUS_TIMELINE: Tuple[Mapping, ...] = tuple(MappingProxyType(step) for step in (
+    {"step": 1, "status": "pending", "label": "Pending"},
+    {"step": 2, "status": "booked", "label": "Booked"},
+    {"step": 3, "status": "in_progress", "label": "In Transit"},
+    {"step": 4, "status": "delivered", "label": "Delivered"},
+))
\ No newline at end of file
@@ -0,0 +1,237 @@
+# app/delivery/ngo_index.py
+# Spatial Index of NGO Drop Points
+
+import os
+import threading
+import logging
+from math import radians, cos, floor
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from .geo import haversine_km
+
+logger = logging.getLogger(__name__)
+
+# Grid cell size in degrees; 0.05° ≈ 5.5 km north-south
+DEFAULT_CELL_DEGREES = 0.05
+
+_KM_PER_DEGREE = 111.32
+
+Cell = Tuple[int, int]
+
+
+class NgoPoint(NamedTuple):
+    """One NGO drop point"""
+    ngo_id: str
+    name: str
+    lat: float
+    lng: float
+
+
+def ngo_point_from_doc(ngo_id: str, data: Dict) -> Optional[NgoPoint]:
+    """
+    Read an NGO's location from a users/{id} document: a `location`
+    GeoPoint (set at signup) or `latitude`/`longitude` (profile screen).
+    """
+    location = data.get('location')
+    if location is not None and hasattr(location, 'latitude'):
+        lat, lng = location.latitude, location.longitude
+    else:
+        lat, lng = data.get('latitude'), data.get('longitude')
+    if not isinstance(lat, (int, float)) or not isinstance(lng, (int, float)):
+        return None
+    if not (-90 <= lat <= 90) or not (-180 <= lng <= 180):
+        return None
+    name = data.get('ngoName') or data.get('name') or ''
+    return NgoPoint(ngo_id, name, float(lat), float(lng))
+
+
+# ============================================================================
+# NGO INDEX
+# ============================================================================
+
+class NgoIndex:
+    """
+    Lat/lng grid over NGO locations for nearest-K lookups.
+
+    Points are bucketed into `cell_degrees` cells; a query scans rings of
+    cells outward from the pickup until the K-th best Haversine distance
+    is closer than anything an unscanned ring could hold. When the rings
+    would cover more cells than are occupied it scans the points instead.
+
+    `start(db)` loads `users` where userType == 'ngo' with a snapshot
+    listener, so NGOs that sign up, move or leave are applied as
+    incremental changes without rebuilding the index.
+    """
+
+    def __init__(self, cell_degrees: float = DEFAULT_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+
+        self._lock = threading.Lock()
+        self._points: Dict[str, NgoPoint] = {}
+        self._cells: Dict[Cell, Set[str]] = {}
+        self._bounds: Optional[Tuple[int, int, int, int]] = None
+        self._watch = None
+
+        self.queries = 0
+        self.updates = 0
+
+    @classmethod
+    def from_env(cls) -> "NgoIndex":
+        """Build from NGO_INDEX_CELL_DEGREES"""
+        return cls(cell_degrees=float(os.getenv("NGO_INDEX_CELL_DEGREES", str(DEFAULT_CELL_DEGREES))))
+
+    def start(self, db) -> None:
+        """Attach the Firestore listener on NGO user documents (idempotent)"""
+        if self._watch is not None:
+            return
+        try:
+            query = db.collection('users').where('userType', '==', 'ngo')
+            self._watch = query.on_snapshot(self._on_snapshot)
+            logger.info("Listening for NGO locations")
+        except Exception as e:
+            logger.error(f"Could not listen for NGO locations: {str(e)}")
+
+    def stop(self) -> None:
+        if self._watch is not None:
+            self._watch.unsubscribe()
+            self._watch = None
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def upsert(self, point: NgoPoint) -> None:
+        with self._lock:
+            self._remove(point.ngo_id)
+            self._points[point.ngo_id] = point
+            self._cells.setdefault(self._cell(point.lat, point.lng), set()).add(point.ngo_id)
+            self._bounds = None
+            self.updates += 1
+
+    def remove(self, ngo_id: str) -> None:
+        with self._lock:
+            self._remove(ngo_id)
+            self.updates += 1
+
+    def nearest(self,
+                lat: float,
+                lng: float,
+                k: int,
+                max_distance_km: Optional[float] = None) -> List[Tuple[float, NgoPoint]]:
+        """
+        The K NGOs closest to (lat, lng) by straight-line distance.
+
+        Returns:
+            [(distance_km, NgoPoint), ...] sorted by distance
+        """
+        with self._lock:
+            self.queries += 1
+            if not self._points or k <= 0:
+                return []
+
+            # Smallest cell side in km at this latitude: a point in ring r+1
+            # is at least r of these away from the query
+            lat_side = self.cell_degrees * _KM_PER_DEGREE
+            lng_side = lat_side * max(cos(radians(min(abs(lat) + self.cell_degrees, 89.9))), 1e-6)
+            min_side_km = min(lat_side, lng_side)
+
+            center_row, center_col = self._cell(lat, lng)
+            occupied = self._occupied_bounds()
+            max_ring = max(
+                abs(center_row - occupied[0]), abs(center_row - occupied[1]),
+                abs(center_col - occupied[2]), abs(center_col - occupied[3]),
+            )
+            if max_distance_km is not None:
+                max_ring = min(max_ring, int(max_distance_km / min_side_km) + 1)
+
+            found: List[Tuple[float, NgoPoint]] = []
+            # Sparse grid or a wide radius: the rings would visit more cells
+            # than are occupied, so checking every point is cheaper
+            if (2 * max_ring + 1) ** 2 > len(self._cells):
+                for point in self._points.values():
+                    distance_km = haversine_km(lat, lng, point.lat, point.lng)
+                    if max_distance_km is None or distance_km <= max_distance_km:
+                        found.append((distance_km, point))
+                found.sort(key=lambda item: item[0])
+                return found[:k]
+
+            for ring in range(max_ring + 1):
+                for cell in self._ring(center_row, center_col, ring):
+                    for ngo_id in self._cells.get(cell, ()):
+                        point = self._points[ngo_id]
+                        distance_km = haversine_km(lat, lng, point.lat, point.lng)
+                        if max_distance_km is None or distance_km <= max_distance_km:
+                            found.append((distance_km, point))
+                if len(found) >= k:
+                    found.sort(key=lambda item: item[0])
+                    if found[k - 1][0] <= ring * min_side_km:
+                        break
+
+            found.sort(key=lambda item: item[0])
+            return found[:k]
+
+    def stats(self) -> Dict:
+        """Counters for the /metrics endpoint"""
+        with self._lock:
+            return {
+                "ngos": len(self._points),
+                "cells": len(self._cells),
+                "queries": self.queries,
+                "updates": self.updates,
+                "listening": self._watch is not None,
+            }
+
+    # ------------------------------------------------------------------------
+    # Internals (callers hold self._lock)
+    # ------------------------------------------------------------------------
+
+    def _cell(self, lat: float, lng: float) -> Cell:
+        return floor(lat / self.cell_degrees), floor(lng / self.cell_degrees)
+
+    def _remove(self, ngo_id: str) -> None:
+        point = self._points.pop(ngo_id, None)
+        if point is None:
+            return
+        self._bounds = None
+        cell = self._cell(point.lat, point.lng)
+        members = self._cells.get(cell)
+        if members is not None:
+            members.discard(ngo_id)
+            if not members:
+                del self._cells[cell]
+
+    def _occupied_bounds(self) -> Tuple[int, int, int, int]:
+        """(min_row, max_row, min_col, max_col) of non-empty cells, cached between updates"""
+        if self._bounds is None:
+            rows = [cell[0] for cell in self._cells]
+            cols = [cell[1] for cell in self._cells]
+            self._bounds = (min(rows), max(rows), min(cols), max(cols))
+        return self._bounds
+
+    @staticmethod
+    def _ring(row: int, col: int, ring: int):
+        if ring == 0:
+            yield row, col
+            return
+        for c in range(col - ring, col + ring + 1):
+            yield row - ring, c
+            yield row + ring, c
+        for r in range(row - ring + 1, row + ring):
+            yield r, col - ring
+            yield r, col + ring
+
+    # ------------------------------------------------------------------------
+    # Listener callback (Firestore watch thread)
+    # ------------------------------------------------------------------------
+
+    def _on_snapshot(self, docs, changes, read_time) -> None:
+        for change in changes:
+            doc = change.document
+            if change.type.name == 'REMOVED':
+                self.remove(doc.id)
+                continue
+            point = ngo_point_from_doc(doc.id, doc.to_dict() or {})
+            if point is None:
+                # No usable location (yet): make sure a stale one is not served
+                self.remove(doc.id)
+            else:
+                self.upsert(point)
@@ -0,0 +1,60 @@
+# app/delivery/pricing.py
+# Compiled Pricing Tables
+
+from types import MappingProxyType
+from typing import Dict, Mapping, NamedTuple, Optional, Tuple
+
+
+class ProviderRate(NamedTuple):
+    """One provider's pricing, unpacked from DELIVERY_PRICING_CONFIG"""
+    provider: str
+    base_fare: float
+    per_km_rate: float
+    min_fare: float
+    max_fare: float
+    estimated_delivery_time: int
+
+    def price(self, distance_km: float, food_multiplier: Optional[float] = None) -> float:
+        """
+        Formula: (base_fare + (distance_km * per_km_rate)) * food_multiplier,
+        clamped to [min_fare, max_fare] and rounded to 2 decimals.
+        """
+        calculated_price = self.base_fare + (distance_km * self.per_km_rate)
+        if food_multiplier is not None:
+            calculated_price *= food_multiplier
+        return round(max(self.min_fare, min(calculated_price, self.max_fare)), 2)
+
+
+class PricingTable(NamedTuple):
+    """
+    Immutable, pre-validated view of a pricing config.
+
+    `rates` keeps config order for iteration on the quote path;
+    `by_provider` is a read-only index for single-provider lookups.
+    Swapping the whole table is one reference assignment, so readers that
+    grab it once per quote always see a consistent set of rates.
+    """
+    rates: Tuple[ProviderRate, ...]
+    by_provider: Mapping[str, ProviderRate]
+    version: str
+
+
+def compile_pricing_table(pricing_config: Dict[str, Dict], version: str) -> PricingTable:
+    """Compile DELIVERY_PRICING_CONFIG-shaped dicts into a PricingTable"""
+    rates = []
+    for provider, config in pricing_config.items():
+        base_fare = config.get("baseFare", 0)
+        rates.append(ProviderRate(
+            provider=provider,
+            base_fare=base_fare,
+            per_km_rate=config.get("perKmRate", 0),
+            min_fare=config.get("minFare", base_fare),
+            max_fare=config.get("maxFare", 10000),
+            estimated_delivery_time=config.get("estimatedDeliveryTime", 0),
+        ))
+    rates = tuple(rates)
+    return PricingTable(
+        rates=rates,
+        by_provider=MappingProxyType({rate.provider: rate for rate in rates}),
+        version=version,
+    )
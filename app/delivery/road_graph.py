@@ -0,0 +1,693 @@
+# app/delivery/road_graph.py
+# Local Road-Graph Router over an OpenStreetMap Extract (Contraction Hierarchies)
+#
+# Build (offline, from an OSM XML extract, e.g. osmium cat city.osm.pbf -o city.osm;
+# contraction takes minutes for a city in pure Python):
+#     python -m app.delivery.road_graph --osm bengaluru.osm --out roads-blr.bin
+# Serve: ROAD_GRAPH_PATH=roads-blr.bin
+
+import argparse
+import heapq
+import os
+import re
+import struct
+import tempfile
+import logging
+import xml.etree.ElementTree as ET
+from math import radians, cos, ceil, inf
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .geo import EARTH_RADIUS_KM
+from .zone_grid import MATRIX_BUFFER_MINUTES
+
+logger = logging.getLogger(__name__)
+
+# magic, format version, flags, node count, edge count,
+# upward edge count, downward edge count, snap cell size (degrees)
+_HEADER = struct.Struct("<4sHHIIIId")
+_MAGIC = b"RGRF"
+_VERSION = 2
+FLAG_CONTRACTED = 1
+
+DEFAULT_SNAP_CELL_DEGREES = 0.005
+
+# Points farther than this from any road node are not routed
+DEFAULT_MAX_SNAP_M = 1000.0
+
+# Walking/parking leg between a point and its snapped node, and
+# the give-up bound for unreachable targets (plain Dijkstra)
+SNAP_LEG_SPEED_MPS = 20 / 3.6
+MAX_ROUTE_SECONDS = 4 * 3600
+
+# Contraction: a witness search gives up after settling this many nodes
+# (a lower limit builds faster but adds redundant shortcuts)
+WITNESS_SETTLE_LIMIT = 100
+
+_M_PER_DEGREE = 111_320.0
+
+# Drivable highway classes -> default speed (km/h) when maxspeed is missing
+HIGHWAY_SPEEDS_KMPH = {
+    "motorway": 80, "motorway_link": 45,
+    "trunk": 60, "trunk_link": 40,
+    "primary": 45, "primary_link": 35,
+    "secondary": 40, "secondary_link": 30,
+    "tertiary": 35, "tertiary_link": 25,
+    "unclassified": 25, "residential": 20,
+    "living_street": 10, "service": 15, "road": 20,
+}
+
+# One CSR edge: head node, travel time, length. Packed so a node's
+# neighbours come out of a single slice.
+EDGE_DTYPE = np.dtype([("target", "<i4"), ("time_s", "<f4"), ("length_m", "<f4")])
+
+_MAXSPEED = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(mph)?")
+
+
+def _cell_keys(lat: np.ndarray, lng: np.ndarray, cell_degrees: float) -> np.ndarray:
+    rows = np.floor((np.asarray(lat) + 90.0) / cell_degrees).astype(np.int64)
+    cols = np.floor((np.asarray(lng) + 180.0) / cell_degrees).astype(np.int64)
+    return rows * (1 << 20) + cols
+
+
+def _layout(node_count: int, edge_count: int, contracted: bool = False,
+            up_count: int = 0, down_count: int = 0) -> List[Tuple[str, str, int, int]]:
+    """(name, dtype, length, byte offset) of every array, each 8-byte aligned"""
+    arrays = [
+        ("cell_key", "<i8", node_count),
+        ("lat", "<f8", node_count),
+        ("lng", "<f8", node_count),
+        ("indptr", "<i8", node_count + 1),
+        ("edges", EDGE_DTYPE, edge_count),
+    ]
+    # Contraction hierarchy: upward edges for the forward search, and
+    # reversed upward edges for the backward search
+    for prefix, count in (("up", up_count), ("down", down_count)) if contracted else ():
+        arrays += [
+            (f"{prefix}_indptr", "<i8", node_count + 1),
+            (f"{prefix}_edges", EDGE_DTYPE, count),
+        ]
+    layout = []
+    offset = _HEADER.size
+    for name, dtype, length in arrays:
+        offset = (offset + 7) // 8 * 8
+        layout.append((name, dtype, length, offset))
+        offset += np.dtype(dtype).itemsize * length
+    return layout
+
+
+# ============================================================================
+# ROAD GRAPH
+# ============================================================================
+
+class RoadGraph:
+    """
+    Directed road graph in CSR form (indptr plus packed target / travel
+    time / length edges), memory-mapped from one file so every worker on the
+    host shares it through the page cache.
+
+    Nodes are numbered in snap-cell order, so the node list doubles as the
+    spatial index: points snap to the nearest node by binary-searching
+    the sorted cell keys of the surrounding cells.
+
+    Routes are the fastest path on travel time; the reported distance is
+    that path's length, as with the Distance Matrix API. Files built with
+    contraction hierarchies answer with a bidirectional upward search
+    (a few hundred settled nodes for a city, not hundreds of thousands),
+    and matrices with one upward search per distinct point. Uncontracted
+    files fall back to plain Dijkstra.
+    """
+
+    def __init__(self, path: str, max_snap_m: float = DEFAULT_MAX_SNAP_M):
+        self.path = path
+        self.max_snap_m = max_snap_m
+        with open(path, "rb") as f:
+            header = _HEADER.unpack(f.read(_HEADER.size))
+        magic, version, flags, node_count, edge_count, up_count, down_count, cell_degrees = header
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{path} is not a road graph (version {_VERSION})")
+
+        self.node_count = node_count
+        self.edge_count = edge_count
+        self.cell_degrees = cell_degrees
+        self.contracted = bool(flags & FLAG_CONTRACTED)
+        self.shortcut_count = up_count + down_count - edge_count if self.contracted else 0
+        for name, dtype, length, offset in _layout(node_count, edge_count, self.contracted, up_count, down_count):
+            # Plain ndarray views of the mapping: memmap's per-index overhead
+            # dominates the search loops otherwise
+            array = (np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(length,)).view(np.ndarray)
+                     if length else np.zeros(0, dtype=dtype))
+            setattr(self, name, array)
+        if self.contracted:
+            self._forward = (self.up_indptr, self.up_edges)
+            self._backward = (self.down_indptr, self.down_edges)
+
+        self.queries = 0
+        self.unsnapped = 0
+        self.unreachable = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["RoadGraph"]:
+        """Load ROAD_GRAPH_PATH if set; None (no local router) otherwise"""
+        path = os.getenv("ROAD_GRAPH_PATH")
+        if not path:
+            return None
+        try:
+            graph = cls(path, max_snap_m=float(os.getenv("ROAD_GRAPH_MAX_SNAP_M", str(DEFAULT_MAX_SNAP_M))))
+        except (OSError, ValueError, struct.error) as e:
+            logger.error(f"Road graph disabled, could not load {path}: {str(e)}")
+            return None
+        logger.info(f"Loaded road graph {path}: {graph.node_count} nodes, {graph.edge_count} edges"
+                    f"{', contracted' if graph.contracted else ''}")
+        return graph
+
+    # ------------------------------------------------------------------------
+    # Snapping
+    # ------------------------------------------------------------------------
+
+    def snap(self, lat: float, lng: float) -> Optional[Tuple[int, float]]:
+        """(node, straight-line metres to it) for the nearest node within max_snap_m"""
+        m_per_lng_degree = _M_PER_DEGREE * max(cos(radians(lat)), 1e-6)
+        cell_m = self.cell_degrees * min(_M_PER_DEGREE, m_per_lng_degree)
+        reach = ceil(self.max_snap_m / cell_m)
+        center = int(_cell_keys(lat, lng, self.cell_degrees))
+
+        candidates = []
+        for row in range(-reach, reach + 1):
+            first = center + row * (1 << 20) - reach
+            lo = int(np.searchsorted(self.cell_key, first, side="left"))
+            hi = int(np.searchsorted(self.cell_key, first + 2 * reach, side="right"))
+            if hi > lo:
+                candidates.append(np.arange(lo, hi))
+        if not candidates:
+            return None
+
+        nodes = np.concatenate(candidates)
+        dy = (self.lat[nodes] - lat) * _M_PER_DEGREE
+        dx = (self.lng[nodes] - lng) * m_per_lng_degree
+        squared = dx * dx + dy * dy
+        best = int(np.argmin(squared))
+        snap_m = float(np.sqrt(squared[best]))
+        if snap_m > self.max_snap_m:
+            return None
+        return int(nodes[best]), snap_m
+
+    # ------------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------------
+
+    def route(self, pickup_lat: float, pickup_lng: float,
+              drop_lat: float, drop_lng: float) -> Optional[Tuple[float, int]]:
+        """(distance_km, duration_minutes) or None if a point is off the graph or unreachable"""
+        self.queries += 1
+        origin = self.snap(pickup_lat, pickup_lng)
+        target = self.snap(drop_lat, drop_lng)
+        if origin is None or target is None:
+            self.unsnapped += 1
+            return None
+        if self.contracted:
+            found = self._ch_query(origin[0], target[0])
+        else:
+            found = self._shortest_paths(origin[0], {target[0]}).get(target[0])
+        if found is None:
+            self.unreachable += 1
+            return None
+        return self._estimate(*found, origin[1] + target[1])
+
+    def route_many(self, pickup_lat: float, pickup_lng: float,
+                   destinations: Sequence[Tuple[float, float]]) -> List[Optional[Tuple[float, int]]]:
+        """One pickup to many drops"""
+        return self.route_matrix([(pickup_lat, pickup_lng)], destinations)[0]
+
+    def route_matrix(self, origins: Sequence[Tuple[float, float]],
+                     destinations: Sequence[Tuple[float, float]]) -> List[List[Optional[Tuple[float, int]]]]:
+        """
+        rows[i][j] = (distance_km, duration_minutes) or None for origins[i] -> destinations[j].
+        One search per distinct snapped origin/destination node, not per pair.
+        """
+        self.queries += 1
+        sources = [self.snap(lat, lng) for lat, lng in origins]
+        targets = [self.snap(lat, lng) for lat, lng in destinations]
+        source_nodes = {source[0] for source in sources if source is not None}
+        target_nodes = {target[0] for target in targets if target is not None}
+        if self.contracted:
+            table = self._ch_many_to_many(source_nodes, target_nodes)
+        else:
+            table = {node: self._shortest_paths(node, target_nodes) for node in source_nodes}
+
+        rows: List[List[Optional[Tuple[float, int]]]] = []
+        for source in sources:
+            found = table.get(source[0], {}) if source is not None else {}
+            row: List[Optional[Tuple[float, int]]] = []
+            for target in targets:
+                if source is None or target is None:
+                    self.unsnapped += 1
+                    row.append(None)
+                elif target[0] not in found:
+                    self.unreachable += 1
+                    row.append(None)
+                else:
+                    row.append(self._estimate(*found[target[0]], source[1] + target[1]))
+            rows.append(row)
+        return rows
+
+    def distances_km(self, pickup_lat, pickup_lng, drop_lat, drop_lng) -> np.ndarray:
+        """Road distance for N pickup -> drop pairs (arrays); NaN where the graph cannot route"""
+        distances = np.full(len(pickup_lat), np.nan)
+        for i, pair in enumerate(zip(pickup_lat, pickup_lng, drop_lat, drop_lng)):
+            estimate = self.route(*map(float, pair))
+            if estimate is not None:
+                distances[i] = estimate[0]
+        return distances
+
+    @staticmethod
+    def _estimate(time_s: float, length_m: float, snap_m: float) -> Tuple[float, int]:
+        distance_km = (length_m + snap_m) / 1000
+        minutes = (time_s + snap_m / SNAP_LEG_SPEED_MPS) / 60
+        return round(distance_km, 2), int(minutes) + MATRIX_BUFFER_MINUTES
+
+    def _shortest_paths(self, source: int, targets: set) -> Dict[int, Tuple[float, float]]:
+        """Dijkstra on travel time from `source` until every target is settled"""
+        indptr, edges = self.indptr, self.edges
+        best = {source: 0.0}
+        lengths = {source: 0.0}
+        settled: Dict[int, Tuple[float, float]] = {}
+        remaining = set(targets)
+        heap = [(0.0, source)]
+        while heap and remaining:
+            t, u = heapq.heappop(heap)
+            if u in settled:
+                continue
+            if t > MAX_ROUTE_SECONDS:
+                break
+            settled[u] = (t, lengths[u])
+            remaining.discard(u)
+            start, end = int(indptr[u]), int(indptr[u + 1])
+            base_length = lengths[u]
+            for v, w, d in edges[start:end].tolist():
+                candidate = t + w
+                if candidate < best.get(v, inf):
+                    best[v] = candidate
+                    lengths[v] = base_length + d
+                    heapq.heappush(heap, (candidate, v))
+        return {node: settled[node] for node in targets if node in settled}
+
+    # ------------------------------------------------------------------------
+    # Contraction hierarchy search
+    # ------------------------------------------------------------------------
+
+    def _ch_query(self, source: int, target: int) -> Optional[Tuple[float, float]]:
+        """
+        (time_s, length_m) of the fastest path. Forward and backward upward
+        searches alternate; each stops once its smallest key cannot beat
+        the best meeting point found so far.
+        """
+        if source == target:
+            return 0.0, 0.0
+        graphs = (self._forward, self._backward)
+        tentative = ({source: 0.0}, {target: 0.0})
+        settled: Tuple[Dict[int, Optional[Tuple[float, float]]], ...] = ({}, {})
+        heaps = ([(0.0, 0.0, source)], [(0.0, 0.0, target)])
+        best, best_length = inf, 0.0
+
+        while True:
+            forward = bool(heaps[0]) and heaps[0][0][0] < best
+            backward = bool(heaps[1]) and heaps[1][0][0] < best
+            if not forward and not backward:
+                break
+            side = 0 if forward and (not backward or heaps[0][0][0] <= heaps[1][0][0]) else 1
+
+            t, length, u = heapq.heappop(heaps[side])
+            if u in settled[side]:
+                continue
+            distances = tentative[side]
+            if self._stalled(u, t, distances, graphs[1 - side]):
+                settled[side][u] = None
+                continue
+            settled[side][u] = (t, length)
+            met = settled[1 - side].get(u)
+            if met is not None and t + met[0] < best:
+                best, best_length = t + met[0], length + met[1]
+
+            indptr, edges = graphs[side]
+            start, end = int(indptr[u]), int(indptr[u + 1])
+            for v, w, d in edges[start:end].tolist():
+                candidate = t + w
+                if candidate < distances.get(v, inf):
+                    distances[v] = candidate
+                    heapq.heappush(heaps[side], (candidate, length + d, v))
+
+        return (best, best_length) if best < inf else None
+
+    @staticmethod
+    def _stalled(u: int, t: float, distances: Dict[int, float], opposite) -> bool:
+        """
+        Stall-on-demand: u is reached more cheaply through a higher node
+        (an edge of the opposite direction's graph at u), so its key is
+        not a shortest distance and expanding it only widens the search.
+        """
+        indptr, edges = opposite
+        start, end = int(indptr[u]), int(indptr[u + 1])
+        for x, w, _ in edges[start:end].tolist():
+            if distances.get(x, inf) + w < t:
+                return True
+        return False
+
+    def _ch_search(self, source: int, graph, opposite) -> Dict[int, Tuple[float, float]]:
+        """Complete upward search: (time_s, length_m) to every unstalled node reachable upward"""
+        indptr, edges = graph
+        tentative = {source: 0.0}
+        settled: Dict[int, Tuple[float, float]] = {}
+        stalled = set()
+        heap = [(0.0, 0.0, source)]
+        while heap:
+            t, length, u = heapq.heappop(heap)
+            if u in settled or u in stalled:
+                continue
+            if self._stalled(u, t, tentative, opposite):
+                stalled.add(u)
+                continue
+            settled[u] = (t, length)
+            start, end = int(indptr[u]), int(indptr[u + 1])
+            for v, w, d in edges[start:end].tolist():
+                candidate = t + w
+                if candidate < tentative.get(v, inf):
+                    tentative[v] = candidate
+                    heapq.heappush(heap, (candidate, length + d, v))
+        return settled
+
+    def _ch_many_to_many(self, sources, targets) -> Dict[int, Dict[int, Tuple[float, float]]]:
+        """
+        Bucket many-to-many: each target's backward search leaves
+        (target, time, length) in a bucket at every node it settles; each
+        source's forward search then scans the buckets it reaches.
+        """
+        buckets: Dict[int, List[Tuple[int, float, float]]] = {}
+        for target in targets:
+            for node, (t, length) in self._ch_search(target, self._backward, self._forward).items():
+                buckets.setdefault(node, []).append((target, t, length))
+
+        table: Dict[int, Dict[int, Tuple[float, float]]] = {}
+        for source in sources:
+            found: Dict[int, Tuple[float, float]] = {}
+            for node, (t, length) in self._ch_search(source, self._forward, self._backward).items():
+                for target, t_back, length_back in buckets.get(node, ()):
+                    if t + t_back < found.get(target, (inf, 0.0))[0]:
+                        found[target] = (t + t_back, length + length_back)
+            table[source] = found
+        return table
+
+    def stats(self) -> Dict:
+        """Counters for the /metrics endpoint"""
+        return {
+            "nodes": self.node_count,
+            "edges": self.edge_count,
+            "contracted": self.contracted,
+            "shortcuts": self.shortcut_count,
+            "queries": self.queries,
+            "unsnapped": self.unsnapped,
+            "unreachable": self.unreachable,
+        }
+
+
+# ============================================================================
+# BUILD (offline)
+# ============================================================================
+
+def _way_speed_kmph(tags: Dict[str, str]) -> Optional[float]:
+    highway = tags.get("highway")
+    if highway not in HIGHWAY_SPEEDS_KMPH:
+        return None
+    if tags.get("access") in ("no", "private") or tags.get("motor_vehicle") == "no":
+        return None
+    match = _MAXSPEED.match(tags.get("maxspeed", ""))
+    if match:
+        speed = float(match.group(1)) * (1.609 if match.group(2) else 1.0)
+        if speed > 0:
+            return speed
+    return float(HIGHWAY_SPEEDS_KMPH[highway])
+
+
+def _way_direction(tags: Dict[str, str]) -> int:
+    """1 = forward only, -1 = reverse only, 0 = both ways"""
+    oneway = tags.get("oneway")
+    if oneway == "-1":
+        return -1
+    if oneway in ("yes", "true", "1"):
+        return 1
+    if oneway is None and (tags.get("junction") == "roundabout" or tags.get("highway") == "motorway"):
+        return 1
+    return 0
+
+
+def read_osm_edges(osm_path: str):
+    """
+    Parse an OSM XML extract into drivable edges.
+
+    Returns:
+        (node_lat, node_lng, src, dst, speed_kmph) with src/dst indexing
+        the node arrays (only nodes on drivable ways are kept)
+    """
+    coords: Dict[int, Tuple[float, float]] = {}
+    ways: List[Tuple[List[int], float, int]] = []
+    for _, element in ET.iterparse(osm_path, events=("end",)):
+        if element.tag == "node":
+            coords[int(element.get("id"))] = (float(element.get("lat")), float(element.get("lon")))
+            element.clear()
+        elif element.tag == "way":
+            tags = {tag.get("k"): tag.get("v") for tag in element.iter("tag")}
+            speed = _way_speed_kmph(tags)
+            if speed is not None:
+                refs = [int(nd.get("ref")) for nd in element.iter("nd")]
+                ways.append((refs, speed, _way_direction(tags)))
+            element.clear()
+        elif element.tag == "relation":
+            element.clear()
+
+    index: Dict[int, int] = {}
+    src: List[int] = []
+    dst: List[int] = []
+    speeds: List[float] = []
+    for refs, speed, direction in ways:
+        refs = [ref for ref in refs if ref in coords]
+        for a, b in zip(refs, refs[1:]):
+            if a == b:
+                continue
+            ia = index.setdefault(a, len(index))
+            ib = index.setdefault(b, len(index))
+            if direction >= 0:
+                src.append(ia)
+                dst.append(ib)
+                speeds.append(speed)
+            if direction <= 0:
+                src.append(ib)
+                dst.append(ia)
+                speeds.append(speed)
+
+    node_lat = np.empty(len(index))
+    node_lng = np.empty(len(index))
+    for osm_id, i in index.items():
+        node_lat[i], node_lng[i] = coords[osm_id]
+    return node_lat, node_lng, np.array(src, dtype=np.int64), np.array(dst, dtype=np.int64), np.array(speeds)
+
+
+def _edge_lengths_m(lat: np.ndarray, lng: np.ndarray, src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+    lat1, lng1, lat2, lng2 = (np.radians(a) for a in (lat[src], lng[src], lat[dst], lng[dst]))
+    h = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return EARTH_RADIUS_KM * 1000 * 2 * np.arctan2(np.sqrt(h), np.sqrt(1 - h))
+
+
+def _shortcuts(out_adj: List[Dict], in_adj: List[Dict], v: int) -> List[Tuple[int, int, float, float]]:
+    """Shortcuts (u, w, time_s, length_m) needed to contract v: u -> v -> w with no faster witness"""
+    shortcuts = []
+    outs = out_adj[v]
+    for u, (t_in, length_in) in in_adj[v].items():
+        via = {w: t_in + t_out for w, (t_out, _) in outs.items() if w != u}
+        if not via:
+            continue
+        limit = max(via.values())
+        # Witness search from u that avoids v, bounded by the longest via path
+        tentative = {u: 0.0}
+        settled = set()
+        remaining = set(via)
+        heap = [(0.0, u)]
+        while heap and remaining and len(settled) < WITNESS_SETTLE_LIMIT:
+            t, x = heapq.heappop(heap)
+            if x in settled:
+                continue
+            if t > limit:
+                break
+            settled.add(x)
+            remaining.discard(x)
+            for y, (w, _) in out_adj[x].items():
+                if y != v and t + w < tentative.get(y, inf):
+                    tentative[y] = t + w
+                    heapq.heappush(heap, (t + w, y))
+        for w, t_via in via.items():
+            if tentative.get(w, inf) > t_via:
+                shortcuts.append((u, w, t_via, length_in + outs[w][1]))
+    return shortcuts
+
+
+def contract_graph(node_count: int, src: np.ndarray, dst: np.ndarray,
+                   time_s: np.ndarray, length_m: np.ndarray):
+    """
+    Contraction hierarchy preprocessing. Nodes are contracted in order of
+    edge difference (shortcuts added minus edges removed) plus contracted
+    neighbours, with lazy priority updates.
+
+    Returns:
+        (up, down), each (src, dst, time_s, length_m) lists. `up` holds
+        edges to higher-ranked nodes; `down` holds edges from higher-ranked
+        nodes, stored reversed (at the lower-ranked end) so the backward
+        search also only walks upward.
+    """
+    out_adj: List[Dict[int, Tuple[float, float]]] = [{} for _ in range(node_count)]
+    in_adj: List[Dict[int, Tuple[float, float]]] = [{} for _ in range(node_count)]
+    for u, v, t, length in zip(src.tolist(), dst.tolist(), np.asarray(time_s).tolist(),
+                               np.asarray(length_m).tolist()):
+        if u != v and t < out_adj[u].get(v, (inf, 0.0))[0]:
+            out_adj[u][v] = (t, length)
+            in_adj[v][u] = (t, length)
+
+    contracted_neighbours = [0] * node_count
+
+    def priority(v: int, shortcut_count: int) -> int:
+        return shortcut_count - len(in_adj[v]) - len(out_adj[v]) + contracted_neighbours[v]
+
+    heap = [(priority(v, len(_shortcuts(out_adj, in_adj, v))), v) for v in range(node_count)]
+    heapq.heapify(heap)
+    up: Tuple[List, List, List, List] = ([], [], [], [])
+    down: Tuple[List, List, List, List] = ([], [], [], [])
+
+    while heap:
+        _, v = heapq.heappop(heap)
+        shortcuts = _shortcuts(out_adj, in_adj, v)
+        current = priority(v, len(shortcuts))
+        if heap and current > heap[0][0]:
+            heapq.heappush(heap, (current, v))
+            continue
+
+        for edges, adjacency in ((up, out_adj[v]), (down, in_adj[v])):
+            for x, (t, length) in adjacency.items():
+                edges[0].append(v)
+                edges[1].append(x)
+                edges[2].append(t)
+                edges[3].append(length)
+        for w in out_adj[v]:
+            del in_adj[w][v]
+            contracted_neighbours[w] += 1
+        for u in in_adj[v]:
+            del out_adj[u][v]
+            contracted_neighbours[u] += 1
+        out_adj[v] = {}
+        in_adj[v] = {}
+
+        for u, w, t, length in shortcuts:
+            if t < out_adj[u].get(w, (inf, 0.0))[0]:
+                out_adj[u][w] = (t, length)
+                in_adj[w][u] = (t, length)
+
+    return up, down
+
+
+def _csr(node_count: int, src, dst, time_s, length_m) -> Tuple[np.ndarray, np.ndarray]:
+    """(indptr, edges) with edges grouped by src"""
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+    order = np.lexsort((dst, src))
+    indptr = np.zeros(node_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=node_count), out=indptr[1:])
+    edges = np.empty(len(order), dtype=EDGE_DTYPE)
+    edges["target"] = dst[order]
+    edges["time_s"] = np.asarray(time_s)[order]
+    edges["length_m"] = np.asarray(length_m)[order]
+    return indptr, edges
+
+
+def write_road_graph(path: str,
+                     node_lat: np.ndarray,
+                     node_lng: np.ndarray,
+                     src: np.ndarray,
+                     dst: np.ndarray,
+                     time_s: np.ndarray,
+                     length_m: np.ndarray,
+                     cell_degrees: float = DEFAULT_SNAP_CELL_DEGREES,
+                     contract: bool = True) -> None:
+    """
+    Renumber nodes in snap-cell order, lay the edges out as CSR, optionally
+    build the contraction hierarchy, and write the file atomically (temp
+    file + rename).
+    """
+    keys = _cell_keys(node_lat, node_lng, cell_degrees)
+    order = np.argsort(keys, kind="stable")
+    renumber = np.empty_like(order)
+    renumber[order] = np.arange(len(order))
+    node_count = len(order)
+    src, dst = renumber[src], renumber[dst]
+
+    indptr, edges = _csr(node_count, src, dst, time_s, length_m)
+    arrays = {
+        "cell_key": keys[order],
+        "lat": node_lat[order],
+        "lng": node_lng[order],
+        "indptr": indptr,
+        "edges": edges,
+    }
+
+    flags, up_count, down_count = 0, 0, 0
+    if contract:
+        for prefix, hierarchy in zip(("up", "down"), contract_graph(node_count, src, dst, time_s, length_m)):
+            arrays[f"{prefix}_indptr"], arrays[f"{prefix}_edges"] = _csr(node_count, *hierarchy)
+        flags = FLAG_CONTRACTED
+        up_count, down_count = len(arrays["up_edges"]), len(arrays["down_edges"])
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, flags, node_count, len(edges),
+                                 up_count, down_count, cell_degrees))
+            for name, dtype, length, offset in _layout(node_count, len(edges), contract, up_count, down_count):
+                f.write(b"\0" * (offset - f.tell()))
+                f.write(np.ascontiguousarray(arrays[name], dtype=dtype).tobytes())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def build_road_graph(osm_path: str, path: str,
+                     cell_degrees: float = DEFAULT_SNAP_CELL_DEGREES,
+                     contract: bool = True) -> Tuple[int, int]:
+    """
+    OSM XML extract -> road graph file.
+
+    Returns:
+        (node_count, edge_count)
+    """
+    node_lat, node_lng, src, dst, speed_kmph = read_osm_edges(osm_path)
+    length_m = _edge_lengths_m(node_lat, node_lng, src, dst)
+    time_s = length_m / (speed_kmph / 3.6)
+    write_road_graph(path, node_lat, node_lng, src, dst, time_s, length_m, cell_degrees, contract)
+    return len(node_lat), len(src)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Build a road graph file from an OSM XML extract")
+    parser.add_argument("--osm", required=True, help="OSM XML extract (.osm)")
+    parser.add_argument("--out", required=True, help="output road graph file")
+    parser.add_argument("--cell-degrees", type=float, default=DEFAULT_SNAP_CELL_DEGREES,
+                        help="snap index cell size")
+    parser.add_argument("--no-contract", action="store_true",
+                        help="skip contraction hierarchies (fast build, Dijkstra queries)")
+    args = parser.parse_args(argv)
+
+    nodes, edges = build_road_graph(args.osm, args.out, args.cell_degrees, contract=not args.no_contract)
+    print(f"Wrote {args.out}: {nodes} nodes, {edges} edges")
+
+
+if __name__ == "__main__":
+    main()
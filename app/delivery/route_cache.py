@@ -0,0 +1,220 @@
+# app/delivery/route_cache.py
+# Route Cache for Distance Matrix Results
+
+import os
+import sqlite3
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (pickup_lat, pickup_lng, drop_lat, drop_lng) scaled to integers
+RouteKey = Tuple[int, int, int, int]
+
+
+def quantize_route(pickup_lat: float,
+                   pickup_lng: float,
+                   drop_lat: float,
+                   drop_lng: float,
+                   precision: int = 4) -> RouteKey:
+    """
+    Snap a route to a grid so nearby pickup/drop points share a cache entry.
+
+    precision=4 is roughly 11 m at the equator, well below Distance Matrix's
+    own snapping to the road network.
+    """
+    scale = 10 ** precision
+    return (
+        int(round(pickup_lat * scale)),
+        int(round(pickup_lng * scale)),
+        int(round(drop_lat * scale)),
+        int(round(drop_lng * scale)),
+    )
+
+
+# ============================================================================
+# ROUTE CACHE
+# ============================================================================
+
+class RouteCache:
+    """
+    Two-tier cache of (distance_km, duration_minutes) per quantized route.
+
+    - Memory tier: per-process LRU with TTL.
+    - Disk tier (optional): SQLite file shared by every worker on the host,
+      so a restarted gunicorn worker starts warm.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS routes (
+            key TEXT PRIMARY KEY,
+            distance_km REAL NOT NULL,
+            duration_minutes INTEGER NOT NULL,
+            expires_at REAL NOT NULL
+        )
+    """
+
+    def __init__(self,
+                 max_entries: int = 10000,
+                 ttl_seconds: float = 6 * 3600,
+                 precision: int = 4,
+                 db_path: Optional[str] = None,
+                 max_disk_entries: int = 200000):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.precision = precision
+        self.db_path = db_path
+        self.max_disk_entries = max_disk_entries
+
+        self._entries: "OrderedDict[RouteKey, Tuple[float, int, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._disk_writes = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.db_path:
+            try:
+                self._connection().execute(self._SCHEMA)
+            except sqlite3.Error as e:
+                logger.error(f"Route cache disk tier disabled: {str(e)}")
+                self.db_path = None
+
+    @classmethod
+    def from_env(cls) -> "RouteCache":
+        """Build a cache from ROUTE_CACHE_* environment variables"""
+        return cls(
+            max_entries=int(os.getenv("ROUTE_CACHE_SIZE", "10000")),
+            ttl_seconds=float(os.getenv("ROUTE_CACHE_TTL_SECONDS", str(6 * 3600))),
+            precision=int(os.getenv("ROUTE_CACHE_PRECISION", "4")),
+            db_path=os.getenv("ROUTE_CACHE_PATH") or None,
+        )
+
+    def key(self, pickup_lat: float, pickup_lng: float,
+            drop_lat: float, drop_lng: float) -> RouteKey:
+        return quantize_route(pickup_lat, pickup_lng, drop_lat, drop_lng, self.precision)
+
+    def get(self, key: RouteKey, record: bool = True) -> Optional[Tuple[float, int]]:
+        """
+        Return (distance_km, duration_minutes) or None on a miss.
+        record=False skips the hit/miss counters (for re-checks of a key
+        whose miss was already counted).
+        """
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[2] > now:
+                    self._entries.move_to_end(key)
+                    if record:
+                        self.memory_hits += 1
+                    return entry[0], entry[1]
+                del self._entries[key]
+
+        if self.db_path:
+            row = self._disk_get(key, now)
+            if row is not None:
+                distance_km, duration_minutes, expires_at = row
+                with self._lock:
+                    self._put(key, (distance_km, duration_minutes, expires_at))
+                    if record:
+                        self.disk_hits += 1
+                return distance_km, duration_minutes
+
+        if record:
+            with self._lock:
+                self.misses += 1
+        return None
+
+    def set(self, key: RouteKey, distance_km: float, duration_minutes: int) -> None:
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._put(key, (distance_km, duration_minutes, expires_at))
+        if self.db_path:
+            self._disk_set(key, distance_km, duration_minutes, expires_at)
+
+    def stats(self) -> Dict:
+        """Counters for the /metrics endpoint"""
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            total = hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxEntries": self.max_entries,
+                "memoryHits": self.memory_hits,
+                "diskHits": self.disk_hits,
+                "hits": hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hitRate": round(hits / total, 4) if total else 0.0,
+                "diskEnabled": bool(self.db_path),
+            }
+
+    def _put(self, key: RouteKey, entry: Tuple[float, int, float]) -> None:
+        """Insert under self._lock, evicting least recently used entries"""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    # ------------------------------------------------------------------------
+    # Disk tier
+    # ------------------------------------------------------------------------
+
+    def _connection(self) -> sqlite3.Connection:
+        """One SQLite connection per thread; WAL lets workers read concurrently"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _disk_key(key: RouteKey) -> str:
+        return ",".join(str(part) for part in key)
+
+    def _disk_get(self, key: RouteKey, now: float) -> Optional[Tuple[float, int, float]]:
+        try:
+            row = self._connection().execute(
+                "SELECT distance_km, duration_minutes, expires_at FROM routes "
+                "WHERE key = ? AND expires_at > ?",
+                (self._disk_key(key), now),
+            ).fetchone()
+            return row
+        except sqlite3.Error as e:
+            logger.warning(f"Route cache disk read failed: {str(e)}")
+            return None
+
+    def _disk_set(self, key: RouteKey, distance_km: float,
+                  duration_minutes: int, expires_at: float) -> None:
+        try:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO routes (key, distance_km, duration_minutes, expires_at) "
+                "VALUES (?, ?, ?, ?)",
+                (self._disk_key(key), distance_km, duration_minutes, expires_at),
+            )
+            self._disk_writes += 1
+            if self._disk_writes % 1000 == 0:
+                self._disk_prune(conn)
+        except sqlite3.Error as e:
+            logger.warning(f"Route cache disk write failed: {str(e)}")
+
+    def _disk_prune(self, conn: sqlite3.Connection) -> None:
+        """Drop expired rows, then the soonest-expiring rows above the size cap"""
+        conn.execute("DELETE FROM routes WHERE expires_at <= ?", (time.time(),))
+        conn.execute(
+            "DELETE FROM routes WHERE key IN ("
+            "SELECT key FROM routes ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,),
+        )
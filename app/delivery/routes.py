@@ -1,14 +1,29 @@
 # app/delivery/routes.py
 # Flask Routes for Delivery API Endpoints (Firebase-Compatible)
 
-from flask import Blueprint, request, jsonify, render_template
+from flask import Blueprint, Response, request, jsonify, render_template, stream_with_context
 from flask_cors import cross_origin
 from .services import DeliveryService
 from .models import LocationData, DeliveryStatus
+from .status_stream import StatusBroadcaster
+from .write_batcher import WriteCoalescer, set_op, update_op
+from .location_ingest import LocationIngestBuffer
+from .doc_cache import DocumentCache
+from .ngo_index import NgoIndex
+from .analytics import SnapshotReader, refresh_snapshot
+from .batching import DEFAULT_BATCH_PROVIDER, TripBatcher, load_pending_orders
+from .export import (
+    DEFAULT_PAGE_SIZE, EXPORT_FORMATS, EXPORTABLE_COLLECTIONS, decode_cursor, export_lines, last_exported_id
+)
 import firebase_admin
 from firebase_admin import firestore
+import click
+import hmac
 import logging
-from datetime import datetime
+import os
+import sys
+from datetime import datetime, timezone
+from math import isfinite
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +34,34 @@ delivery_bp = Blueprint('delivery', __name__, url_prefix='/api/delivery')
 delivery_service = DeliveryService()
 db = firestore.client()
 
+# Groups writes from concurrent requests into shared WriteBatch commits
+write_batcher = WriteCoalescer.from_env(db)
+
+# Latest driver fix per delivery, flushed to Firestore on a cadence
+location_buffer = LocationIngestBuffer.from_env(db)
+
+# Read-through caches for polled documents; hot ones are kept fresh by listeners
+donation_cache = DocumentCache.from_env(db, 'donations')
+delivery_doc_cache = DocumentCache.from_env(db, 'deliveries')
+
+# One Firestore listener per watched donation, shared by every open status page
+status_broadcaster = StatusBroadcaster(db, delivery_service.status.build_status_payload)
+
+# NGO drop points for /nearest, kept current by a listener (NGO_INDEX_LISTENER=0 to disable)
+ngo_index = NgoIndex.from_env()
+
+# Columnar delivery history for impact reports (ANALYTICS_SNAPSHOT_DIR)
+analytics_snapshot = SnapshotReader.from_env()
+
+# Multi-stop trip proposals over pending delivery orders
+trip_batcher = TripBatcher.from_env(delivery_service.price_estimator)
+
+# Live pricing/options updates from Firestore (DELIVERY_CONFIG_LISTENER=0 to disable)
+if os.getenv("DELIVERY_CONFIG_LISTENER", "1") != "0":
+    delivery_service.config.start(db)
+if os.getenv("NGO_INDEX_LISTENER", "1") != "0":
+    ngo_index.start(db)
+
 # ============================================================================
 # FRONTEND PAGES (✅ ADDED — NOTHING REMOVED)
 # ============================================================================
@@ -51,16 +94,52 @@ def health_check():
         "timestamp": datetime.now().isoformat()
     }), 200
 
+# ============================================================================
+# METRICS
+# ============================================================================
+
+@delivery_bp.route('/metrics', methods=['GET'])
+def metrics():
+    return jsonify({
+        "success": True,
+        "data": {
+            "routeCache": delivery_service.price_estimator.route_cache.stats(),
+            "singleFlight": delivery_service.price_estimator.inflight.stats(),
+            "mapsBreaker": delivery_service.price_estimator.maps_breaker.stats(),
+            "distanceBackends": [backend.name for backend in delivery_service.price_estimator.distance_backends],
+            "roadGraph": (delivery_service.price_estimator.road_graph.stats()
+                          if delivery_service.price_estimator.road_graph else None),
+            "zoneGrid": (delivery_service.price_estimator.zone_grid.stats()
+                         if delivery_service.price_estimator.zone_grid else None),
+            "distanceCalibration": (delivery_service.price_estimator.calibration.stats()
+                                    if delivery_service.price_estimator.calibration else None),
+            "statusStream": status_broadcaster.stats(),
+            "writeBatcher": write_batcher.stats(),
+            "driverLocations": location_buffer.stats(),
+            "donationCache": donation_cache.stats(),
+            "deliveryCache": delivery_doc_cache.stats(),
+            "ngoIndex": ngo_index.stats(),
+        }
+    }), 200
+
 # ============================================================================
 # DELIVERY OPTIONS (API)
 # ============================================================================
 
+# Clients revalidate with If-None-Match after this; unchanged options cost a 304
+OPTIONS_MAX_AGE_SECONDS = 300
+
+
 @delivery_bp.route('/options', methods=['GET'])
 @cross_origin()
 def get_delivery_options():
     try:
-        options = delivery_service.get_delivery_options()
-        return jsonify({"success": True, "data": options}), 200
+        body, etag = delivery_service.options.get_serialized_options()
+        response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = f'public, max-age={OPTIONS_MAX_AGE_SECONDS}'
+        response.headers['X-Config-Version'] = delivery_service.options.version
+        return response.make_conditional(request)
     except Exception as e:
         logger.error(f"Error getting delivery options: {str(e)}")
         return jsonify({"success": False, "error": str(e)}), 500
@@ -119,13 +198,172 @@ def quote():
 
         return jsonify({
             "success": True,
-            "data": estimates.to_dict()
+            "data": estimates
         }), 200
 
     except Exception as e:
         logger.error(f"Error in /quote: {str(e)}", exc_info=True)
         return jsonify({"success": False, "error": str(e)}), 500
 
+# ============================================================================
+# BATCH PRICE ESTIMATION (/quote/batch) — many pickups × many drops
+# ============================================================================
+
+# 25 × 25, the largest matrix a dispatcher screen asks for
+MAX_BATCH_QUOTE_ELEMENTS = 625
+
+
+def _parse_points(points, field):
+    """Validate a list of {"lat", "lng"} objects into [(lat, lng), ...]"""
+    if not isinstance(points, list) or not points:
+        raise ValueError(f"{field} must be a non-empty list")
+    parsed = []
+    for index, point in enumerate(points):
+        try:
+            lat = float(point['lat'])
+            lng = float(point['lng'])
+        except (KeyError, ValueError, TypeError):
+            raise ValueError(f"{field}[{index}] must have numeric lat and lng")
+        if not (-90 <= lat <= 90) or not (-180 <= lng <= 180):
+            raise ValueError(f"{field}[{index}] is out of range")
+        parsed.append((lat, lng))
+    return parsed
+
+
+@delivery_bp.route('/quote/batch', methods=['POST'])
+@cross_origin()
+def quote_batch():
+    try:
+        data = request.get_json()
+        
+        if not data:
+            return jsonify({"success": False, "error": "No data provided"}), 400
+        
+        try:
+            origins = _parse_points(data.get('origins'), 'origins')
+            destinations = _parse_points(data.get('destinations'), 'destinations')
+            serving_capacity = int(data.get('serving_capacity', 0))
+        except (ValueError, TypeError) as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        
+        if len(origins) * len(destinations) > MAX_BATCH_QUOTE_ELEMENTS:
+            return jsonify({
+                "success": False,
+                "error": f"At most {MAX_BATCH_QUOTE_ELEMENTS} origin/destination pairs per batch"
+            }), 400
+        
+        rows = delivery_service.price_estimator.estimate_all_providers_matrix(
+            origins, destinations, serving_capacity
+        )
+        
+        return jsonify({
+            "success": True,
+            "data": {
+                "rows": rows
+            }
+        }), 200
+    
+    except Exception as e:
+        logger.error(f"Error in /quote/batch: {str(e)}", exc_info=True)
+        return jsonify({"success": False, "error": str(e)}), 500
+
+# ============================================================================
+# NEAREST NGOs (/nearest) — K closest or cheapest drop points, priced
+# ============================================================================
+
+MAX_NEAREST_K = 20
+MAX_NEAREST_DISTANCE_KM = 100
+# Straight-line candidates sent to Distance Matrix per requested NGO when
+# ranking by price (road distance can reorder the straight-line ranking)
+NEAREST_CANDIDATE_FACTOR = 2
+MAX_NEAREST_CANDIDATES = 25
+
+
+def _ranking_price(estimate, provider=None):
+    """Price used to rank an NGO: one provider's, or the cheapest paid option"""
+    if provider:
+        price_data = estimate.providers.get(provider)
+        return price_data.estimated_price if price_data else float('inf')
+    paid = [p.estimated_price for p in estimate.providers.values() if p.estimated_price > 0]
+    return min(paid) if paid else 0.0
+
+
+@delivery_bp.route('/nearest', methods=['POST'])
+@cross_origin()
+def nearest_ngos():
+    """
+    Body: {pickup_lat, pickup_lng, k=5, sort_by="distance"|"price",
+    provider?, max_distance_km=25, serving_capacity=0}
+
+    Candidates come from the in-memory NGO index by straight-line distance;
+    only those are priced, with one batched Distance Matrix lookup.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        try:
+            pickup_lat = float(data['pickup_lat'])
+            pickup_lng = float(data['pickup_lng'])
+            k = int(data.get('k', 5))
+            max_distance_km = float(data.get('max_distance_km', 25))
+            serving_capacity = int(data.get('serving_capacity', 0))
+        except (KeyError, ValueError, TypeError):
+            return jsonify({"success": False, "error": "pickup_lat and pickup_lng must be numbers"}), 400
+
+        if not (-90 <= pickup_lat <= 90) or not (-180 <= pickup_lng <= 180):
+            return jsonify({"success": False, "error": "Coordinates out of range"}), 400
+        if not 1 <= k <= MAX_NEAREST_K:
+            return jsonify({"success": False, "error": f"k must be between 1 and {MAX_NEAREST_K}"}), 400
+        if not (isfinite(max_distance_km) and 0 < max_distance_km <= MAX_NEAREST_DISTANCE_KM):
+            return jsonify({
+                "success": False,
+                "error": f"max_distance_km must be greater than 0 and at most {MAX_NEAREST_DISTANCE_KM}",
+            }), 400
+
+        sort_by = data.get('sort_by', 'distance')
+        if sort_by not in ('distance', 'price'):
+            return jsonify({"success": False, "error": "sort_by must be 'distance' or 'price'"}), 400
+        provider = data.get('provider')
+
+        candidate_count = min(k * NEAREST_CANDIDATE_FACTOR, MAX_NEAREST_CANDIDATES)
+        candidates = ngo_index.nearest(pickup_lat, pickup_lng, candidate_count, max_distance_km)
+        if not candidates:
+            return jsonify({"success": True, "data": {"ngos": [], "indexedNgos": len(ngo_index)}}), 200
+
+        estimates = delivery_service.price_estimator.estimate_all_providers_matrix(
+            [(pickup_lat, pickup_lng)],
+            [(point.lat, point.lng) for _, point in candidates],
+            serving_capacity,
+        )[0]
+
+        ranked = []
+        for (straight_km, point), estimate in zip(candidates, estimates):
+            price = _ranking_price(estimate, provider)
+            rank_key = (price, estimate.distance_km) if sort_by == 'price' else (estimate.distance_km, price)
+            ranked.append((rank_key, straight_km, point, estimate, price))
+        ranked.sort(key=lambda item: item[0])
+
+        return jsonify({
+            "success": True,
+            "data": {
+                "ngos": [
+                    {
+                        "ngoId": point.ngo_id,
+                        "name": point.name,
+                        "lat": point.lat,
+                        "lng": point.lng,
+                        "straightLineKm": round(straight_km, 2),
+                        "rankingPrice": price,
+                        "estimate": estimate,
+                    }
+                    for _, straight_km, point, estimate, price in ranked[:k]
+                ],
+                "indexedNgos": len(ngo_index),
+            }
+        }), 200
+    except Exception as e:
+        logger.error(f"Error in /nearest: {str(e)}", exc_info=True)
+        return jsonify({"success": False, "error": str(e)}), 500
+
 # ============================================================================
 # CREATE DELIVERY ORDER (Firebase version of /order)
 # ============================================================================
@@ -152,18 +390,22 @@ def order():
             'ngo_phone': data.get('ngo_phone', ''),
             'donor_name': data.get('donor_name', ''),
             'donor_phone': data.get('donor_phone', ''),
+            'serving_capacity': data.get('serving_capacity', 0),
             'status': 'pending',
             'created_at': firestore.SERVER_TIMESTAMP
         }
-        order_ref.set(order_data)
 
-        # Update donation with delivery info
-        db.collection('donations').document(donation_id).update({
-            "status": "in_delivery",
-            "deliveryOrderId": order_ref.id,
-            "deliveryStatus": "pending",
-            "updatedAt": firestore.SERVER_TIMESTAMP
-        })
+        # Order + donation update commit together in one round trip
+        write_batcher.commit([
+            set_op(order_ref, order_data),
+            update_op(db.collection('donations').document(donation_id), {
+                "status": "in_delivery",
+                "deliveryOrderId": order_ref.id,
+                "deliveryStatus": "pending",
+                "updatedAt": firestore.SERVER_TIMESTAMP
+            }),
+        ])
+        donation_cache.invalidate(donation_id)
 
         return jsonify({
             "success": True,
@@ -289,17 +531,28 @@ def record_booking():
     try:
         data = request.get_json()
         donation_id = data['donationId']
-        db.collection('donations').document(donation_id).update({
-            "delivery": {
-                "method": data['provider'],
-                "status": "booked",
-                "estimatedPrice": float(data['estimatedPrice']),
-                "distanceKm": float(data.get('distance', 0)),
-                "bookedAt": firestore.SERVER_TIMESTAMP
-            },
-            "status": "in_delivery",
-            "updatedAt": firestore.SERVER_TIMESTAMP
-        })
+        ops = [
+            update_op(db.collection('donations').document(donation_id), {
+                "delivery": {
+                    "method": data['provider'],
+                    "status": "booked",
+                    "estimatedPrice": float(data['estimatedPrice']),
+                    "distanceKm": float(data.get('distance', 0)),
+                    "bookedAt": firestore.SERVER_TIMESTAMP
+                },
+                "status": "in_delivery",
+                "updatedAt": firestore.SERVER_TIMESTAMP
+            }),
+        ]
+        # Take the delivery order out of the pending set (/batches)
+        order_id = data.get('orderId') or (donation_cache.get(donation_id) or {}).get('deliveryOrderId')
+        if order_id:
+            ops.append(update_op(db.collection('delivery_orders').document(order_id), {
+                'status': 'booked',
+                'booked_at': firestore.SERVER_TIMESTAMP,
+            }))
+        write_batcher.commit(ops)
+        donation_cache.invalidate(donation_id)
         return jsonify({
             "success": True,
             "data": {
@@ -311,31 +564,347 @@ def record_booking():
         logger.error(f"Error recording booking: {str(e)}")
         return jsonify({"success": False, "error": str(e)}), 500
 
+# Badges/timeline never change at runtime; clients may cache them for a day
+STATUS_META_MAX_AGE_SECONDS = 86400
+
+
+@delivery_bp.route('/status-meta', methods=['GET'])
+@cross_origin()
+def get_status_meta():
+    """Static badge styling and timeline referenced by /status via metaVersion"""
+    try:
+        body, version = delivery_service.status.get_serialized_meta()
+        response = Response(body, mimetype='application/json')
+        response.set_etag(version)
+        response.headers['Cache-Control'] = f'public, max-age={STATUS_META_MAX_AGE_SECONDS}'
+        return response.make_conditional(request)
+    except Exception as e:
+        logger.error(f"Error getting status meta: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+# Donation IDs accepted by one /status/batch request
+MAX_BATCH_STATUS_IDS = 300
+
+
+@delivery_bp.route('/status/batch', methods=['POST'])
+@cross_origin()
+def get_delivery_status_batch():
+    """
+    Status for many donations in one call (dashboards, history screens).
+
+    Body: {"donation_ids": [...]}. Each entry carries the same fields as
+    /status/<donation_id>; unknown IDs are listed under "missing".
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        donation_ids = data.get('donation_ids')
+        if not isinstance(donation_ids, list) or not donation_ids:
+            return jsonify({"success": False, "error": "donation_ids must be a non-empty list"}), 400
+        if not all(isinstance(donation_id, str) and donation_id for donation_id in donation_ids):
+            return jsonify({"success": False, "error": "donation_ids must be non-empty strings"}), 400
+        if len(donation_ids) > MAX_BATCH_STATUS_IDS:
+            return jsonify({
+                "success": False,
+                "error": f"At most {MAX_BATCH_STATUS_IDS} donation_ids per request"
+            }), 400
+
+        statuses, missing = {}, []
+        for donation_id, donation_data in donation_cache.get_many(donation_ids).items():
+            if donation_data is None:
+                missing.append(donation_id)
+                continue
+            statuses[donation_id] = delivery_service.status.build_status_payload(donation_id, donation_data)
+
+        return jsonify({
+            "success": True,
+            "data": {
+                "statuses": statuses,
+                "missing": missing,
+                "metaVersion": delivery_service.status.get_meta_version(),
+            }
+        }), 200
+    except Exception as e:
+        logger.error(f"Error getting batch delivery status: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
 @delivery_bp.route('/status/<donation_id>', methods=['GET'])
 @cross_origin()
 def get_delivery_status(donation_id):
     try:
-        doc = db.collection('donations').document(donation_id).get()
-        if not doc.exists:
+        donation_data = donation_cache.get(donation_id)
+        if donation_data is None:
             return jsonify({"success": False, "error": "Donation not found"}), 404
-        donation_data = doc.to_dict()
-        delivery_data = donation_data.get('delivery', {})
-        status = delivery_data.get('status', 'pending')
-        status_badge = delivery_service.status.get_status_badge(status)
+        return jsonify({
+            "success": True,
+            "data": delivery_service.status.build_status_payload(donation_id, donation_data)
+        }), 200
+    except Exception as e:
+        logger.error(f"Error getting delivery status: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+# ============================================================================
+# DRIVER LOCATION INGEST
+# ============================================================================
+
+@delivery_bp.route('/location', methods=['POST'])
+@cross_origin()
+def ingest_driver_location():
+    """
+    High-frequency GPS pings from drivers. Buffered in memory; Firestore
+    only sees the latest fix per delivery on the flush cadence.
+    """
+    try:
+        data = request.get_json()
+        if not data or not data.get('donation_id'):
+            return jsonify({"success": False, "error": "donation_id required"}), 400
+
+        try:
+            driver_lat = float(data['driver_lat'])
+            driver_lng = float(data['driver_lng'])
+            recorded_at = float(data['recorded_at']) if data.get('recorded_at') is not None else None
+        except (KeyError, ValueError, TypeError):
+            return jsonify({"success": False, "error": "driver_lat and driver_lng must be numbers"}), 400
+
+        if not (-90 <= driver_lat <= 90) or not (-180 <= driver_lng <= 180):
+            return jsonify({"success": False, "error": "Coordinates out of range"}), 400
+
+        location_buffer.ingest(data['donation_id'], driver_lat, driver_lng, recorded_at)
+        return jsonify({"success": True}), 202
+    except Exception as e:
+        logger.error(f"Error ingesting driver location: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@delivery_bp.route('/location/<donation_id>', methods=['GET'])
+@cross_origin()
+def get_driver_location(donation_id):
+    """
+    Live driver position from this worker's buffer. Pings that landed on
+    another worker are read back from the last flushed Firestore fix.
+    """
+    try:
+        fix = location_buffer.latest(donation_id)
+        if fix is not None:
+            return jsonify({
+                "success": True,
+                "data": {
+                    "donationId": donation_id,
+                    "driverLat": fix.lat,
+                    "driverLng": fix.lng,
+                    "recordedAt": fix.recorded_at,
+                    "source": "live",
+                }
+            }), 200
+
+        delivery_data = delivery_doc_cache.get(donation_id)
+        if delivery_data is None:
+            return jsonify({"success": False, "error": "Delivery not found"}), 404
         return jsonify({
             "success": True,
             "data": {
                 "donationId": donation_id,
-                "method": delivery_data.get('method'),
-                "status": status,
-                "estimatedPrice": delivery_data.get('estimatedPrice'),
-                "distance": delivery_data.get('distanceKm'),
-                "statusBadge": status_badge,
-                "timeline": delivery_service.status.get_status_timeline(),
-                "bookedAt": delivery_data.get('bookedAt'),
-                "deliveredAt": delivery_data.get('deliveredAt')
+                "driverLat": delivery_data.get('driver_lat'),
+                "driverLng": delivery_data.get('driver_lng'),
+                "recordedAt": None,
+                "source": "firestore",
             }
         }), 200
     except Exception as e:
-        logger.error(f"Error getting delivery status: {str(e)}")
-        return jsonify({"success": False, "error": str(e)}), 500
\ No newline at end of file
+        logger.error(f"Error getting driver location: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@delivery_bp.route('/status/<donation_id>/stream', methods=['GET'])
+@cross_origin()
+def stream_delivery_status(donation_id):
+    """
+    Server-Sent Events: a full `snapshot` event on connect, then `delta`
+    events only when the delivery status actually changes.
+    """
+    return Response(
+        status_broadcaster.stream(donation_id),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',  # let nginx pass events through unbuffered
+        },
+    )
+
+# ============================================================================
+# STREAMING EXPORT (reporting) — NDJSON / CSV, resumable
+# ============================================================================
+
+def _export_authorized() -> bool:
+    """Exports contain phone numbers; require EXPORT_API_TOKEN as a bearer token"""
+    token = os.getenv("EXPORT_API_TOKEN")
+    if not token:
+        return False
+    supplied = request.headers.get('Authorization', '')
+    return hmac.compare_digest(supplied.encode(), f"Bearer {token}".encode())
+
+
+@delivery_bp.route('/export/<collection>', methods=['GET'])
+def export_collection(collection):
+    """
+    Stream a whole collection in document-ID order.
+
+    Query: format=ndjson|csv, cursor=<token> or after=<document id>
+    (resume after that document), limit, page_size, fields=a,b,c (CSV
+    columns). Every row carries `_id`.
+
+    NDJSON ends with {"_nextCursor": token}: pass it back as cursor= for
+    the next page, or stop when it is null (collection exhausted). An
+    interrupted stream has no trailer; resume with after=<last _id>, the
+    same as CSV.
+    """
+    if not _export_authorized():
+        return jsonify({"success": False, "error": "Export not authorized"}), 403
+    try:
+        after = decode_cursor(request.args['cursor']) if request.args.get('cursor') else request.args.get('after') or None
+        limit = int(request.args['limit']) if request.args.get('limit') else None
+        page_size = int(request.args.get('page_size', DEFAULT_PAGE_SIZE))
+        fields = [f for f in request.args.get('fields', '').split(',') if f] or None
+        fmt = request.args.get('format', 'ndjson')
+        lines = export_lines(db, collection, fmt, after=after, page_size=page_size, limit=limit,
+                             fields=fields, cursor_trailer=True)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    return Response(
+        stream_with_context(lines),
+        mimetype='text/csv' if fmt == 'csv' else 'application/x-ndjson',
+        headers={
+            'Content-Disposition': f'attachment; filename={collection}.{fmt}',
+            'Cache-Control': 'no-store',
+            'X-Accel-Buffering': 'no',
+        },
+    )
+
+
+@delivery_bp.cli.command('export')
+@click.argument('collection', type=click.Choice(EXPORTABLE_COLLECTIONS))
+@click.option('--format', 'fmt', type=click.Choice(EXPORT_FORMATS), default='ndjson')
+@click.option('--out', type=click.Path(dir_okay=False), default=None, help='Output file (default stdout)')
+@click.option('--after', default=None, help='Resume after this document ID')
+@click.option('--resume', is_flag=True, help='Continue an interrupted NDJSON export in --out')
+@click.option('--page-size', type=int, default=DEFAULT_PAGE_SIZE)
+@click.option('--limit', type=int, default=None)
+def export_collection_command(collection, fmt, out, after, resume, page_size, limit):
+    """Export a delivery collection: flask --app app delivery export deliveries --out deliveries.ndjson"""
+    if resume:
+        if fmt != 'ndjson' or not out:
+            raise click.UsageError("--resume needs --format ndjson and --out")
+        after = last_exported_id(out) or after
+
+    stream = open(out, 'a' if resume else 'w', encoding='utf-8', newline='') if out else sys.stdout
+    count = 0
+    try:
+        for line in export_lines(db, collection, fmt, after=after, page_size=page_size, limit=limit):
+            stream.write(line)
+            count += 1
+    finally:
+        if out:
+            stream.close()
+    click.echo(f"Exported {count} lines from {collection}", err=True)
+
+
+# ============================================================================
+# IMPACT ANALYTICS (columnar snapshot, refreshed by `flask delivery snapshot`)
+# ============================================================================
+
+def _epoch_arg(name):
+    """Optional ISO date/datetime query parameter as epoch seconds (UTC if no offset)"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+@delivery_bp.route('/analytics/summary', methods=['GET'])
+@cross_origin()
+def analytics_summary():
+    """
+    Delivery totals from the snapshot: km delivered, spend per provider,
+    median booked -> delivered minutes and status counts.
+    Optional since/until (ISO dates) filter on booking time.
+    """
+    try:
+        snapshot = analytics_snapshot.get()
+        if snapshot is None:
+            return jsonify({"success": False, "error": "Analytics snapshot not available"}), 503
+        try:
+            since, until = _epoch_arg('since'), _epoch_arg('until')
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        return jsonify({"success": True, "data": snapshot.summary(since, until)}), 200
+    except Exception as e:
+        logger.error(f"Error in /analytics/summary: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@delivery_bp.cli.command('snapshot')
+@click.option('--dir', 'directory', default=lambda: os.getenv("ANALYTICS_SNAPSHOT_DIR"),
+              help='Snapshot directory (default ANALYTICS_SNAPSHOT_DIR)')
+def snapshot_command(directory):
+    """Append donations changed since the last run to the analytics snapshot"""
+    if not directory:
+        raise click.UsageError("--dir or ANALYTICS_SNAPSHOT_DIR is required")
+    result = refresh_snapshot(db, directory)
+    click.echo(f"{result['changed']} changed, {result['rows']} rows, watermark {result['watermark']}")
+
+
+# ============================================================================
+# MULTI-STOP BATCHING (pending orders -> combined trip proposals)
+# ============================================================================
+
+def _batch_proposals(provider):
+    orders = load_pending_orders(db, trip_batcher.lookback_start(), donation_cache)
+    proposals = trip_batcher.propose(orders, provider)
+    return orders, proposals
+
+
+@delivery_bp.route('/batches', methods=['GET'])
+@cross_origin()
+def batch_proposals():
+    """
+    Combined trips for pending orders that share an NGO, were created within
+    the last BATCH_WINDOW_MINUTES and have nearby pickups, priced for
+    `provider` (default porter) against booking each order separately.
+    """
+    try:
+        provider = request.args.get('provider', DEFAULT_BATCH_PROVIDER)
+        if provider not in delivery_service.price_estimator.pricing_table.by_provider:
+            return jsonify({"success": False, "error": f"Unknown provider: {provider}"}), 400
+        orders, proposals = _batch_proposals(provider)
+        return jsonify({
+            "success": True,
+            "data": {
+                "trips": proposals,
+                "pendingOrders": len(orders),
+                "bookingsSaved": sum(len(p.orders) - 1 for p in proposals),
+                "estimatedSavings": round(sum(p.savings for p in proposals), 2),
+            }
+        }), 200
+    except Exception as e:
+        logger.error(f"Error in /batches: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@delivery_bp.cli.command('batches')
+@click.option('--provider', default=DEFAULT_BATCH_PROVIDER, help='Provider to price trips for')
+def batches_command(provider):
+    """Print combined-trip proposals for the pending delivery orders"""
+    if provider not in delivery_service.price_estimator.pricing_table.by_provider:
+        raise click.UsageError(f"Unknown provider: {provider}")
+    orders, proposals = _batch_proposals(provider)
+    for proposal in proposals:
+        stops = ' -> '.join(o.order_id for o in proposal.orders)
+        click.echo(f"{stops} -> {proposal.orders[0].drop_key}: {proposal.distance_km:.2f} km, "
+                   f"₹{proposal.combined_price:.2f} vs ₹{proposal.separate_price:.2f} separately")
+    click.echo(f"{len(proposals)} trips from {len(orders)} pending orders, "
+               f"saving ₹{sum(p.savings for p in proposals):.2f}", err=True)
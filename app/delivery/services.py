@@ -2,13 +2,29 @@
 # Core Business Logic for Delivery Module
 
 import googlemaps
+import numpy as np
+import hashlib
+import json
 import os
-from typing import Dict, Tuple, Optional
+from typing import Dict, List, Mapping, Tuple, Optional
 from datetime import datetime, timedelta
 from .models import (
     DeliveryPriceData, PriceEstimateResponse, LocationData,
-    DeliveryOption, DELIVERY_OPTIONS_SCHEMA, DELIVERY_PRICING_CONFIG
+    DeliveryOption, DistanceSource, DELIVERY_OPTIONS_SCHEMA, DELIVERY_PRICING_CONFIG,
+    STATUS_BADGES, STATUS_TIMELINE
 )
+from . import geo
+from .route_cache import RouteCache
+from .bulk_pricing import BulkPricingEngine, haversine_km
+from .pricing import compile_pricing_table
+from .config_store import BUILTIN_CONFIG_VERSION, DeliveryConfig, DeliveryConfigStore
+from .async_distance import AsyncDistanceMatrixClient
+from .singleflight import SingleFlight
+from .circuit_breaker import CircuitBreaker
+from .zone_grid import ZoneGrid
+from .calibration import DistanceCalibration, DistanceSampleLog
+from .road_graph import RoadGraph
+from .distance_backends import build_chain, parse_chain
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,18 +36,66 @@ logger = logging.getLogger(__name__)
 class PriceEstimationService:
     """
     Calculates estimated delivery prices based on distance.
-    Uses Google Distance Matrix API for actual distance calculation.
+    Distances come from an ordered chain of backends (Google Distance
+    Matrix, local road graph, zone grid, Haversine; see distance_backends),
+    with a route cache in front of Google so repeat quotes skip the network.
     """
     
+    # Distance Matrix per-request limits
+    MATRIX_MAX_ORIGINS = 25
+    MATRIX_MAX_DESTINATIONS = 25
+    MATRIX_MAX_ELEMENTS = 100
+    
     def __init__(self):
         """Initialize with Google Maps API key"""
         api_key = os.getenv("GOOGLE_MAPS_API_KEY")
-        if api_key:
+        if api_key and os.getenv("DISTANCE_MATRIX_CLIENT", "async") == "sync":
             self.gmaps = googlemaps.Client(key=api_key)
+        elif api_key:
+            # Pooled aiohttp client with a hard per-call deadline; a timeout
+            # raises and falls through to Haversine like any other failure
+            self.gmaps = AsyncDistanceMatrixClient.from_env(api_key)
         else:
             self.gmaps = None
             logger.warning("GOOGLE_MAPS_API_KEY not found, using Haversine fallback")
-        self.pricing_config = DELIVERY_PRICING_CONFIG
+        self.load_pricing(DELIVERY_PRICING_CONFIG, BUILTIN_CONFIG_VERSION)
+        self.route_cache = RouteCache.from_env()
+        self.inflight = SingleFlight.from_env()
+        self.maps_breaker = CircuitBreaker.from_env("google_maps", "MAPS_BREAKER")
+        # Precomputed zone × zone road distances (ZONE_GRID_PATH), between the API and Haversine
+        self.zone_grid = ZoneGrid.from_env()
+        # Detour/speed table fitted from logged API answers (DISTANCE_CALIBRATION_PATH)
+        self.calibration = DistanceCalibration.from_env()
+        self.sample_log = DistanceSampleLog.from_env()
+        # Local fastest-path router over an OSM extract (ROAD_GRAPH_PATH)
+        self.road_graph = RoadGraph.from_env()
+        # Ordered fallback chain (DISTANCE_BACKENDS); DISTANCE_LOCAL_FIRST=1
+        # puts the local backends ahead of Google (cache hits still win)
+        self.distance_backends = build_chain(self, parse_chain(
+            os.getenv("DISTANCE_BACKENDS"),
+            local_first=os.getenv("DISTANCE_LOCAL_FIRST", "0") == "1",
+        ))
+        self.uses_google = any(backend.name == "google" for backend in self.distance_backends)
+        logger.info(f"Distance backends: {' -> '.join(b.name for b in self.distance_backends)}")
+    
+    def load_pricing(self, pricing_config: Dict[str, Dict], version: str) -> None:
+        """
+        Compile a pricing config and swap it in atomically. Quotes already
+        in progress finish on the table they started with.
+        """
+        table = compile_pricing_table(pricing_config, version)
+        self.pricing_config = pricing_config
+        self.pricing_table = table
+    
+    @property
+    def bulk_engine(self) -> BulkPricingEngine:
+        """Vectorized engine for the current pricing table (rebuilt after a reload)"""
+        engine = getattr(self, "_bulk_engine", None)
+        table = self.pricing_table
+        if engine is None or engine.table is not table:
+            engine = BulkPricingEngine(table)
+            self._bulk_engine = engine
+        return engine
     
     def estimate_distance(self, 
                          pickup_lat: float, 
@@ -39,7 +103,16 @@ class PriceEstimationService:
                          drop_lat: float,
                          drop_lng: float) -> Tuple[float, int]:
         """
-        Calculate distance and duration between two points using Google Distance Matrix API.
+        Calculate distance and duration between two points.
+        
+        A cached Distance Matrix answer for the quantized route wins; otherwise
+        the backends in self.distance_backends are asked in order until one
+        answers. The default chain (DISTANCE_BACKENDS, see distance_backends.py)
+        is road_graph -> google -> zone_grid -> haversine; with
+        DISTANCE_LOCAL_FIRST=1 it is road_graph -> zone_grid -> calibrated ->
+        google -> haversine. Unconfigured backends are skipped, and haversine
+        (calibrated when DISTANCE_CALIBRATION_PATH is loaded) always answers.
+        Only Google answers are cached.
         
         Args:
             pickup_lat, pickup_lng: Pickup location coordinates
@@ -48,40 +121,214 @@ class PriceEstimationService:
         Returns:
             (distance_km: float, duration_minutes: int)
         """
+        distance_km, duration_minutes, _ = self.estimate_distance_with_source(
+            pickup_lat, pickup_lng, drop_lat, drop_lng
+        )
+        return distance_km, duration_minutes
+    
+    def estimate_distance_with_source(self,
+                                      pickup_lat: float,
+                                      pickup_lng: float,
+                                      drop_lat: float,
+                                      drop_lng: float) -> Tuple[float, int, DistanceSource]:
+        """
+        Same as estimate_distance, plus which source produced the numbers.
+        
+        Asks each backend in self.distance_backends in turn until one
+        answers; a backend that raises is logged and skipped. While the
+        Maps circuit breaker is open the Google backend declines at once.
+        
+        Returns:
+            (distance_km: float, duration_minutes: int, source: DistanceSource)
+        """
+        if self.uses_google:
+            cached = self.route_cache.get(
+                self.route_cache.key(pickup_lat, pickup_lng, drop_lat, drop_lng)
+            )
+            if cached is not None:
+                return (*cached, DistanceSource.CACHE)
+        
+        for backend in self.distance_backends:
+            try:
+                estimate = backend.route(pickup_lat, pickup_lng, drop_lat, drop_lng)
+            except Exception as e:
+                logger.error(f"Exception in {backend.name} distance backend: {str(e)}")
+                continue
+            if estimate is not None:
+                return estimate
+        return self._haversine_estimate(pickup_lat, pickup_lng, drop_lat, drop_lng)
+    
+    def _fetch_route(self, cache_key, pickup_lat: float, pickup_lng: float,
+                     drop_lat: float, drop_lng: float) -> Optional[Tuple[float, int, DistanceSource]]:
+        """
+        Single-flight body for estimate_distance: one Distance Matrix call,
+        cached on success. Returns None if the API could not resolve the route
+        or the circuit breaker is open.
+        """
+        # Another thread or worker may have filled the cache while we waited
+        cached = self.route_cache.get(cache_key, record=False)
+        if cached is not None:
+            return (*cached, DistanceSource.CACHE)
+        
+        if not self.maps_breaker.allow_request():
+            return None
+        
+        result = self._call_distance_matrix(
+            f"{pickup_lat},{pickup_lng}", f"{drop_lat},{drop_lng}"
+        )
+        
+        element = result['rows'][0]['elements'][0]
+        estimate = self._parse_matrix_element(element)
+        if estimate is None:
+            logger.error(f"Distance Matrix API error: {element['status']}")
+            return None
+        
+        distance_km, duration_minutes = estimate
+        logger.info(f"Distance calculated: {distance_km:.2f} km, Duration: {duration_minutes} minutes")
+        self.route_cache.set(cache_key, distance_km, duration_minutes)
+        if self.sample_log is not None:
+            self.sample_log.record(pickup_lat, pickup_lng, drop_lat, drop_lng, distance_km, duration_minutes)
+        return distance_km, duration_minutes, DistanceSource.GOOGLE
+    
+    def _call_distance_matrix(self, origins, destinations) -> Dict:
+        """
+        Distance Matrix call that reports to the circuit breaker. Element-level
+        statuses such as ZERO_RESULTS are answers, not outages, so only raised
+        errors (timeouts, quota, transport) count as failures.
+        """
         try:
-            if self.gmaps is None:
-                logger.info("Google Maps not configured, using Haversine")
-                distance_km = self._haversine_distance(pickup_lat, pickup_lng, drop_lat, drop_lng)
-                duration_minutes = int((distance_km / 20) * 60) + 10  # 20 kmph + 10 min buffer
-                return distance_km, duration_minutes
-            
+            # departure_time adds duration_in_traffic, so logged samples carry
+            # the time-of-day speeds the calibration buckets are fitted on
             result = self.gmaps.distance_matrix(
-                origins=f"{pickup_lat},{pickup_lng}",
-                destinations=f"{drop_lat},{drop_lng}",
+                origins=origins,
+                destinations=destinations,
                 mode="driving",
-                units="metric"
+                units="metric",
+                departure_time="now"
             )
+        except Exception:
+            self.maps_breaker.record_failure()
+            raise
+        self.maps_breaker.record_success()
+        return result
+    
+    def estimate_distance_matrix(self,
+                                 origins: List[Tuple[float, float]],
+                                 destinations: List[Tuple[float, float]]) -> List[List[Tuple[float, int, DistanceSource]]]:
+        """
+        Calculate distance and duration for every origin × destination pair.
+        
+        Cached routes are served locally; each backend in the chain then
+        fills the cells still missing. The Google backend requests them in
+        blocks that respect Distance Matrix's per-request limits, so pricing
+        one donation against 25 NGOs costs one HTTP call instead of 25.
+        
+        Args:
+            origins: [(lat, lng), ...] pickup points
+            destinations: [(lat, lng), ...] drop points
             
-            if result['rows'][0]['elements'][0]['status'] == 'OK':
-                distance_m = result['rows'][0]['elements'][0]['distance']['value']
-                duration_s = result['rows'][0]['elements'][0]['duration']['value']
-                
-                distance_km = distance_m / 1000
-                duration_minutes = int(duration_s / 60) + 10  # Add 10 min buffer
-                
-                logger.info(f"Distance calculated: {distance_km:.2f} km, Duration: {duration_minutes} minutes")
-                return distance_km, duration_minutes
-            else:
-                logger.error(f"Distance Matrix API error: {result['rows'][0]['elements'][0]['status']}")
-                distance_km = self._haversine_distance(pickup_lat, pickup_lng, drop_lat, drop_lng)
-                duration_minutes = int((distance_km / 20) * 60) + 10
-                return distance_km, duration_minutes
+        Returns:
+            rows[i][j] = (distance_km, duration_minutes, source) for origins[i] → destinations[j]
+        """
+        rows: List[List[Optional[Tuple[float, int, DistanceSource]]]] = [
+            [None] * len(destinations) for _ in origins
+        ]
+        if not origins or not destinations:
+            return rows
+        
+        # A point to itself (e.g. the diagonal of a pickups x pickups matrix)
+        # is answered locally instead of spending a cache or API element
+        for i, origin in enumerate(origins):
+            for j, destination in enumerate(destinations):
+                if origin == destination:
+                    rows[i][j] = self._haversine_estimate(*origin, *destination)
+        
+        if self.uses_google:
+            for i, (o_lat, o_lng) in enumerate(origins):
+                for j, (d_lat, d_lng) in enumerate(destinations):
+                    cached = self.route_cache.get(
+                        self.route_cache.key(o_lat, o_lng, d_lat, d_lng)
+                    )
+                    if cached is not None:
+                        rows[i][j] = (*cached, DistanceSource.CACHE)
+        
+        for backend in self.distance_backends:
+            if all(cell is not None for row in rows for cell in row):
+                break
+            try:
+                backend.fill_matrix(rows, origins, destinations)
+            except Exception as e:
+                logger.error(f"Exception in {backend.name} distance backend: {str(e)}")
+        
+        for i, (o_lat, o_lng) in enumerate(origins):
+            for j, (d_lat, d_lng) in enumerate(destinations):
+                if rows[i][j] is None:
+                    rows[i][j] = self._haversine_estimate(o_lat, o_lng, d_lat, d_lng)
         
+        return rows
+    
+    def _fill_matrix_block(self, rows, origins, destinations, origin_range, dest_range) -> None:
+        """Request the uncached elements of one block in a single Distance Matrix call"""
+        missing = [(i, j) for i in origin_range for j in dest_range if rows[i][j] is None]
+        if not missing or not self.maps_breaker.allow_request():
+            return
+        
+        # Only send the origins/destinations that still have a missing element
+        origin_idx = sorted({i for i, _ in missing})
+        dest_idx = sorted({j for _, j in missing})
+        
+        try:
+            result = self._call_distance_matrix(
+                [origins[i] for i in origin_idx],
+                [destinations[j] for j in dest_idx],
+            )
         except Exception as e:
-            logger.error(f"Exception in estimate_distance: {str(e)}")
-            distance_km = self._haversine_distance(pickup_lat, pickup_lng, drop_lat, drop_lng)
-            duration_minutes = int((distance_km / 20) * 60) + 10
-            return distance_km, duration_minutes
+            logger.error(f"Exception in estimate_distance_matrix: {str(e)}")
+            return
+        
+        for row_pos, i in enumerate(origin_idx):
+            elements = result['rows'][row_pos]['elements']
+            for col_pos, j in enumerate(dest_idx):
+                if rows[i][j] is not None:
+                    continue
+                estimate = self._parse_matrix_element(elements[col_pos])
+                if estimate is None:
+                    logger.error(f"Distance Matrix API error: {elements[col_pos]['status']}")
+                    continue
+                rows[i][j] = (*estimate, DistanceSource.GOOGLE)
+                self.route_cache.set(
+                    self.route_cache.key(*origins[i], *destinations[j]), *estimate
+                )
+                if self.sample_log is not None:
+                    self.sample_log.record(*origins[i], *destinations[j], *estimate)
+    
+    @staticmethod
+    def _parse_matrix_element(element: Dict) -> Optional[Tuple[float, int]]:
+        """
+        Convert one Distance Matrix element to (distance_km, duration_minutes),
+        preferring the traffic-aware duration when the API returns one
+        """
+        if element.get('status') != 'OK':
+            return None
+        distance_km = element['distance']['value'] / 1000
+        duration = element.get('duration_in_traffic') or element['duration']
+        duration_minutes = int(duration['value'] / 60) + 10  # Add 10 min buffer
+        return distance_km, duration_minutes
+    
+    def _haversine_estimate(self, pickup_lat: float, pickup_lng: float,
+                            drop_lat: float, drop_lng: float) -> Tuple[float, int, DistanceSource]:
+        """
+        Straight-line distance corrected by the calibration table's detour
+        factor and speed; without a table, straight line at 20 kmph + 10 min buffer.
+        """
+        distance_km = self._haversine_distance(pickup_lat, pickup_lng, drop_lat, drop_lng)
+        if self.calibration is not None:
+            distance_km, duration_minutes, _ = self.calibration.estimate(
+                pickup_lat, pickup_lng, drop_lat, drop_lng, distance_km
+            )
+            return distance_km, duration_minutes, DistanceSource.CALIBRATED
+        duration_minutes = int((distance_km / 20) * 60) + 10
+        return distance_km, duration_minutes, DistanceSource.HAVERSINE
     
     @staticmethod
     def _haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
@@ -89,19 +336,7 @@ class PriceEstimationService:
         Fallback: Calculate distance using Haversine formula (when API is unavailable).
         Returns distance in kilometers.
         """
-        from math import radians, sin, cos, sqrt, atan2
-        
-        R = 6371  # Earth radius in km
-        
-        lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        
-        a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-        c = 2 * atan2(sqrt(a), sqrt(1-a))
-        distance = R * c
-        
-        return round(distance, 2)
+        return round(geo.haversine_km(lat1, lon1, lat2, lon2), 2)
     
     @staticmethod
     def calculate_food_multiplier(serving_capacity: int) -> float:
@@ -140,29 +375,18 @@ class PriceEstimationService:
         Returns:
             Estimated price in rupees (₹)
         """
-        config = self.pricing_config.get(provider)
-        if not config:
+        rate = self.pricing_table.by_provider.get(provider)
+        if rate is None:
             logger.warning(f"Provider {provider} not found in config")
             return 0
         
-        base_fare = config.get("baseFare", 0)
-        per_km_rate = config.get("perKmRate", 0)
-        min_fare = config.get("minFare", base_fare)
-        max_fare = config.get("maxFare", 10000)
-        
-        # Calculate base price
-        calculated_price = base_fare + (distance_km * per_km_rate)
-        
         # Apply food quantity multiplier
-        if serving_capacity > 0:
-            food_multiplier = self.calculate_food_multiplier(serving_capacity)
-            calculated_price *= food_multiplier
+        food_multiplier = self.calculate_food_multiplier(serving_capacity) if serving_capacity > 0 else None
+        final_price = rate.price(distance_km, food_multiplier)
         
-        # Apply min/max boundaries
-        final_price = max(min_fare, min(calculated_price, max_fare))
-        
-        logger.info(f"Price for {provider}: ₹{final_price:.2f} (distance: {distance_km:.2f}km, serves: {serving_capacity})")
-        return round(final_price, 2)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Price for {provider}: ₹{final_price:.2f} (distance: {distance_km:.2f}km, serves: {serving_capacity})")
+        return final_price
     
     def estimate_all_providers(self, 
                               pickup_lat: float, 
@@ -177,24 +401,76 @@ class PriceEstimationService:
             PriceEstimateResponse with prices for all providers
         """
         # Get distance from Google API or Haversine
-        distance_km, duration_minutes = self.estimate_distance(
+        distance_km, duration_minutes, source = self.estimate_distance_with_source(
             pickup_lat, pickup_lng, drop_lat, drop_lng
         )
+        return self._build_estimate(distance_km, duration_minutes, serving_capacity, source)
+    
+    def estimate_all_providers_matrix(self,
+                                      origins: List[Tuple[float, float]],
+                                      destinations: List[Tuple[float, float]],
+                                      serving_capacity: int = 0) -> List[List[PriceEstimateResponse]]:
+        """
+        Estimate prices for ALL delivery providers on every origin × destination pair.
         
-        # Calculate price for each provider
-        providers = {}
-        for provider in self.pricing_config.keys():
-            estimated_price = self.calculate_estimated_price(provider, distance_km, serving_capacity)
-            
-            config = self.pricing_config[provider]
+        Returns:
+            rows[i][j] = PriceEstimateResponse for origins[i] → destinations[j]
+        """
+        matrix = self.estimate_distance_matrix(origins, destinations)
+        return [
+            [self._build_estimate(distance_km, duration_minutes, serving_capacity, source)
+             for distance_km, duration_minutes, source in row]
+            for row in matrix
+        ]
+    
+    def estimate_bulk(self,
+                      pickup_lat, pickup_lng,
+                      drop_lat, drop_lng,
+                      serving_capacity=0):
+        """
+        Quotes for many pairs at once (e.g. nightly re-pricing). Road
+        distances come from the local road graph when one is loaded;
+        pairs it cannot route, or every pair without one, use the
+        straight line.
+        
+        Args:
+            pickup_lat, pickup_lng, drop_lat, drop_lng: arrays of N coordinates
+            serving_capacity: scalar or array of N serving capacities
             
-            providers[provider] = DeliveryPriceData(
-                provider=provider,
-                base_fare=config.get("baseFare", 0),
-                per_km_rate=config.get("perKmRate", 0),
-                estimated_price=estimated_price,
-                min_fare=config.get("minFare", 0),
-                max_fare=config.get("maxFare", 10000),
+        Returns:
+            (distance_km: N array, prices: providers × N array);
+            row order is self.bulk_engine.providers
+        """
+        if self.road_graph is None:
+            return self.bulk_engine.quote(
+                pickup_lat, pickup_lng, drop_lat, drop_lng, serving_capacity
+            )
+        road_km = self.road_graph.distances_km(pickup_lat, pickup_lng, drop_lat, drop_lng)
+        distance = np.where(
+            np.isnan(road_km),
+            haversine_km(pickup_lat, pickup_lng, drop_lat, drop_lng),
+            road_km,
+        )
+        return distance, self.bulk_engine.price_matrix(distance, serving_capacity)
+    
+    def _build_estimate(self,
+                        distance_km: float,
+                        duration_minutes: int,
+                        serving_capacity: int,
+                        distance_source: DistanceSource = DistanceSource.HAVERSINE) -> PriceEstimateResponse:
+        """Price every provider for an already-resolved distance"""
+        table = self.pricing_table
+        food_multiplier = self.calculate_food_multiplier(serving_capacity) if serving_capacity > 0 else None
+        
+        providers = {}
+        for rate in table.rates:
+            providers[rate.provider] = DeliveryPriceData(
+                provider=rate.provider,
+                base_fare=rate.base_fare,
+                per_km_rate=rate.per_km_rate,
+                estimated_price=rate.price(distance_km, food_multiplier),
+                min_fare=rate.min_fare,
+                max_fare=rate.max_fare,
                 distance_km=distance_km,
                 estimated_time_minutes=duration_minutes,
             )
@@ -202,7 +478,9 @@ class PriceEstimationService:
         return PriceEstimateResponse(
             distance_km=distance_km,
             estimated_duration_minutes=duration_minutes,
-            providers=providers
+            providers=providers,
+            distance_source=distance_source,
+            config_version=table.version,
         )
 
 
@@ -216,7 +494,20 @@ class DeliveryOptionService:
     """
     
     def __init__(self):
-        self.options = DELIVERY_OPTIONS_SCHEMA
+        self.load_options(DELIVERY_OPTIONS_SCHEMA, BUILTIN_CONFIG_VERSION)
+    
+    def load_options(self, options: Dict[str, Dict], version: str) -> None:
+        """Swap in a new options map; (version, options) change together"""
+        self._snapshot = (version, options)
+        self._serialized = None
+    
+    @property
+    def options(self) -> Dict[str, Dict]:
+        return self._snapshot[1]
+    
+    @property
+    def version(self) -> str:
+        return self._snapshot[0]
     
     def get_all_options(self) -> Dict[str, DeliveryOption]:
         """Get all available delivery options"""
@@ -232,6 +523,30 @@ class DeliveryOptionService:
             for key, val in self.options.items()
         }
     
+    def get_serialized_options(self) -> Tuple[bytes, str]:
+        """
+        The /options response body and its strong ETag, built once per
+        config version. Options only change when the config store swaps in
+        a new version, so every other request reuses the same bytes.
+        
+        Returns:
+            (body: bytes, etag: str)
+        """
+        snapshot = self._snapshot
+        cached = self._serialized
+        if cached is not None and cached[0] is snapshot:
+            return cached[1], cached[2]
+        
+        options = {key: opt.to_dict() for key, opt in self.get_all_options().items()}
+        body = json.dumps(
+            {"success": True, "data": options},
+            separators=(",", ":"),
+            sort_keys=True,
+        ).encode("utf-8") + b"\n"  # same bytes Flask's jsonify produced
+        etag = hashlib.sha256(body).hexdigest()
+        self._serialized = (snapshot, body, etag)
+        return body, etag
+    
     def get_option(self, option_id: str) -> Optional[DeliveryOption]:
         """Get specific delivery option by ID"""
         if option_id not in self.options:
@@ -342,6 +657,8 @@ class DeliveryStatusService:
     Manages delivery status tracking and updates.
     """
     
+    _serialized_meta: Optional[Tuple[bytes, str]] = None
+    
     @staticmethod
     def calculate_eta(estimated_delivery_minutes: int, booked_at: datetime = None) -> datetime:
         """
@@ -361,31 +678,70 @@ class DeliveryStatusService:
         return eta
     
     @staticmethod
-    def get_status_badge(status: str) -> Dict[str, str]:
+    def get_status_badge(status: str) -> Mapping[str, str]:
         """
         Get badge styling for status display.
         
         Returns:
-            {color, label, icon}
-        """
-        badges = {
-            "pending": {"color": "gray", "label": "Pending", "icon": "⏱️"},
-            "booked": {"color": "blue", "label": "Booked", "icon": "✓"},
-            "in_progress": {"color": "orange", "label": "On the way", "icon": "🚚"},
-            "delivered": {"color": "green", "label": "Delivered", "icon": "✓✓"},
-            "cancelled": {"color": "red", "label": "Cancelled", "icon": "✗"},
-        }
-        return badges.get(status, badges["pending"])
+            {color, label, icon} (read-only)
+        """
+        return STATUS_BADGES.get(status, STATUS_BADGES["pending"])
     
     @staticmethod
-    def get_status_timeline():
-        """Get complete delivery status timeline for UI"""
-        return [
-            {"step": 1, "status": "pending", "label": "Pending"},
-            {"step": 2, "status": "booked", "label": "Booked"},
-            {"step": 3, "status": "in_progress", "label": "In Transit"},
-            {"step": 4, "status": "delivered", "label": "Delivered"},
-        ]
+    def get_status_timeline() -> Tuple[Mapping, ...]:
+        """Get complete delivery status timeline for UI (read-only)"""
+        return STATUS_TIMELINE
+    
+    @classmethod
+    def get_serialized_meta(cls) -> Tuple[bytes, str]:
+        """
+        The /status-meta response body (badges + timeline) and its ETag.
+        Both are static, so this is built on first use and reused forever;
+        /status responses carry only `metaVersion`.
+        
+        Returns:
+            (body: bytes, etag: str)
+        """
+        if cls._serialized_meta is None:
+            meta = {
+                "badges": {status: dict(badge) for status, badge in STATUS_BADGES.items()},
+                "timeline": [dict(step) for step in STATUS_TIMELINE],
+            }
+            version = hashlib.sha256(
+                json.dumps(meta, separators=(",", ":"), sort_keys=True).encode("utf-8")
+            ).hexdigest()[:16]
+            body = json.dumps(
+                {"success": True, "data": {**meta, "version": version}},
+                separators=(",", ":"),
+                sort_keys=True,
+            ).encode("utf-8") + b"\n"
+            cls._serialized_meta = (body, version)
+        return cls._serialized_meta
+    
+    @classmethod
+    def get_meta_version(cls) -> str:
+        return cls.get_serialized_meta()[1]
+    
+    @classmethod
+    def build_status_payload(cls, donation_id: str, donation_data: Dict) -> Dict:
+        """
+        Build the /status response data from a donation document.
+        Shared by the polling endpoint and the status stream.
+        
+        Badge styling and the timeline are static and served by
+        /status-meta; clients look them up by `status` and `metaVersion`.
+        """
+        delivery_data = donation_data.get('delivery', {})
+        return {
+            "donationId": donation_id,
+            "method": delivery_data.get('method'),
+            "status": delivery_data.get('status', 'pending'),
+            "estimatedPrice": delivery_data.get('estimatedPrice'),
+            "distance": delivery_data.get('distanceKm'),
+            "metaVersion": cls.get_meta_version(),
+            "bookedAt": delivery_data.get('bookedAt'),
+            "deliveredAt": delivery_data.get('deliveredAt')
+        }
 
 
 # ============================================================================
@@ -450,6 +806,14 @@ class DeliveryService:
         self.redirect = DeliveryRedirectService()
         self.status = DeliveryStatusService()
         self.clipboard = ClipboardService()
+        
+        # Pricing/options come from the config store (snapshot file, then Firestore)
+        self.config = DeliveryConfigStore.from_env()
+        self.config.subscribe(self._apply_config)
+    
+    def _apply_config(self, config: DeliveryConfig) -> None:
+        self.price_estimator.load_pricing(config.pricing, config.version)
+        self.options.load_options(config.options, config.version)
     
     def get_delivery_options(self) -> Dict:
         """Get all delivery options with their details"""
@@ -0,0 +1,170 @@
+# app/delivery/singleflight.py
+# Single-flight Request Coalescing
+
+import hashlib
+import os
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: in-process coalescing only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """One in-flight execution that followers wait on"""
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+# ============================================================================
+# SINGLE FLIGHT
+# ============================================================================
+
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key into one execution.
+
+    Within a worker, the first thread to ask for a key runs the function and
+    every other thread asking for that key meanwhile waits for its result.
+
+    With `lock_dir` set, leaders in different workers also serialize on a
+    per-key lock file, so the second worker's leader runs only after the
+    first has finished. The function should therefore re-check a shared
+    cache (e.g. the route cache disk tier) before doing the expensive work.
+    A leader waits at most `lock_wait_seconds` for another worker; after
+    that it runs fn() directly, so a hung call elsewhere cannot block it.
+    """
+
+    def __init__(self, lock_dir: Optional[str] = None, lock_wait_seconds: float = 2.5):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+        self.lock_dir = lock_dir
+        if self.lock_dir and fcntl is None:
+            logger.warning("fcntl unavailable, cross-worker single-flight disabled")
+            self.lock_dir = None
+        if self.lock_dir:
+            os.makedirs(self.lock_dir, exist_ok=True)
+
+        self.lock_wait_seconds = lock_wait_seconds
+
+        self.leaders = 0
+        self.shared = 0
+        self.lock_timeouts = 0
+
+    @classmethod
+    def from_env(cls) -> "SingleFlight":
+        """
+        Build from ROUTE_SINGLEFLIGHT_LOCK_DIR (unset = in-process only) and
+        ROUTE_SINGLEFLIGHT_LOCK_WAIT_SECONDS (default: a little over the
+        Distance Matrix deadline)
+        """
+        return cls(
+            lock_dir=os.getenv("ROUTE_SINGLEFLIGHT_LOCK_DIR") or None,
+            lock_wait_seconds=float(os.getenv("ROUTE_SINGLEFLIGHT_LOCK_WAIT_SECONDS", "2.5")),
+        )
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run fn() once for all concurrent callers with the same key"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.shared += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.leaders += 1
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            with self._worker_lock(key):
+                call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def stats(self) -> Dict:
+        """Counters for the /metrics endpoint"""
+        with self._lock:
+            return {
+                "leaders": self.leaders,
+                "shared": self.shared,
+                "inFlight": len(self._calls),
+                "crossWorker": bool(self.lock_dir),
+                "lockTimeouts": self.lock_timeouts,
+            }
+
+    @contextmanager
+    def _worker_lock(self, key: Hashable):
+        """Exclusive flock on the key's own lock file, if cross-worker mode is on"""
+        if not self.lock_dir:
+            yield
+            return
+
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        path = os.path.join(self.lock_dir, f"route-{digest}.lock")
+        fd = self._acquire(path)
+        if fd is None:
+            with self._lock:
+                self.lock_timeouts += 1
+            yield
+            return
+        try:
+            yield
+        finally:
+            # Unlink while still holding the lock; waiters notice the inode
+            # change and retry on a fresh file, so lock files do not pile up
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def _acquire(self, path: str) -> Optional[int]:
+        """Locked fd for `path`, or None after lock_wait_seconds"""
+        deadline = time.monotonic() + self.lock_wait_seconds
+        delay = 0.005
+        while True:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+            else:
+                try:
+                    if os.fstat(fd).st_ino == os.stat(path).st_ino:
+                        return fd
+                except FileNotFoundError:
+                    pass
+                # Locked a file the previous holder already unlinked
+                fcntl.flock(fd, fcntl.LOCK_UN)
+                os.close(fd)
+                continue
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(delay)
+            delay = min(delay * 2, 0.1)
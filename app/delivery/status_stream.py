@@ -0,0 +1,216 @@
+# app/delivery/status_stream.py
+# Push-based Delivery Status Streaming (Server-Sent Events)
+
+import json
+import queue
+import threading
+import logging
+from datetime import date, datetime
+from typing import Callable, Dict, Iterator, Optional, Set
+
+from werkzeug.http import http_date
+
+logger = logging.getLogger(__name__)
+
+
+def _json_default(value):
+    """Encode Firestore timestamps the same way Flask's jsonify does"""
+    if isinstance(value, (date, datetime)):
+        return http_date(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def format_sse(event: str, data: Dict) -> str:
+    """One Server-Sent Events frame"""
+    payload = json.dumps(data, default=_json_default, separators=(",", ":"))
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+class _Subscriber:
+    __slots__ = ("donation_id", "queue")
+
+    def __init__(self, donation_id: str, max_pending: int):
+        self.donation_id = donation_id
+        self.queue: "queue.Queue[Optional[str]]" = queue.Queue(maxsize=max_pending)
+
+
+class _Topic:
+    """Viewers of one donation plus the single listener feeding them"""
+    __slots__ = ("subscribers", "watch", "payload")
+
+    def __init__(self):
+        self.subscribers: Set[_Subscriber] = set()
+        self.watch = None
+        self.payload: Optional[Dict] = None
+
+
+# ============================================================================
+# STATUS BROADCASTER
+# ============================================================================
+
+class StatusBroadcaster:
+    """
+    Fans one Firestore on_snapshot listener per watched donation out to
+    every connected viewer.
+
+    The listener is attached when the first viewer of a donation connects
+    and detached when the last one leaves. Each viewer receives a full
+    `snapshot` event on connect, then `delta` events carrying only the
+    fields that changed — and nothing at all while the status is unchanged.
+    """
+
+    def __init__(self,
+                 db,
+                 build_payload: Callable[[str, Dict], Dict],
+                 heartbeat_seconds: float = 15,
+                 max_pending: int = 32):
+        self.db = db
+        self.build_payload = build_payload
+        self.heartbeat_seconds = heartbeat_seconds
+        self.max_pending = max_pending
+
+        self._lock = threading.Lock()
+        self._topics: Dict[str, _Topic] = {}
+
+    def stream(self, donation_id: str) -> Iterator[str]:
+        """SSE generator for one viewer; cleans up when the client disconnects"""
+        subscriber = self._subscribe(donation_id)
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    frame = subscriber.queue.get(timeout=self.heartbeat_seconds)
+                except queue.Empty:
+                    # Comment frame keeps proxies from closing the connection and
+                    # surfaces a disconnected client on the next write
+                    yield ": keep-alive\n\n"
+                    continue
+                if frame is None:
+                    return
+                yield frame
+        finally:
+            self._unsubscribe(subscriber)
+
+    def stats(self) -> Dict:
+        """Counters for the /metrics endpoint"""
+        with self._lock:
+            return {
+                "listeners": len(self._topics),
+                "viewers": sum(len(topic.subscribers) for topic in self._topics.values()),
+            }
+
+    # ------------------------------------------------------------------------
+    # Subscription management
+    # ------------------------------------------------------------------------
+
+    def _subscribe(self, donation_id: str) -> _Subscriber:
+        subscriber = _Subscriber(donation_id, self.max_pending)
+        with self._lock:
+            topic = self._topics.get(donation_id)
+            first = topic is None
+            if first:
+                # Published before the listener exists so its first callback finds it
+                topic = _Topic()
+                self._topics[donation_id] = topic
+            elif topic.payload is not None:
+                subscriber.queue.put_nowait(format_sse("snapshot", topic.payload))
+            topic.subscribers.add(subscriber)
+        if first:
+            self._attach(donation_id, topic, subscriber)
+        return subscriber
+
+    def _attach(self, donation_id: str, topic: _Topic, subscriber: _Subscriber) -> None:
+        """
+        Start the topic's listener outside the lock: on_snapshot does network
+        I/O and may deliver its first callback before returning.
+        """
+        try:
+            watch = self.db.collection('donations').document(donation_id).on_snapshot(
+                lambda docs, changes, read_time: self._on_snapshot(donation_id, docs)
+            )
+        except Exception as e:
+            logger.error(f"Status listener for {donation_id} failed to attach: {str(e)}")
+            with self._lock:
+                if self._topics.get(donation_id) is topic:
+                    del self._topics[donation_id]
+                waiting = [other for other in topic.subscribers if other is not subscriber]
+            # Viewers that joined while the listener was attaching would otherwise wait forever
+            for other in waiting:
+                self._drain(other.queue)
+                other.queue.put_nowait(format_sse("error", {"error": "Status stream unavailable"}))
+                other.queue.put_nowait(None)
+            raise
+
+        with self._lock:
+            live = self._topics.get(donation_id) is topic
+            if live:
+                topic.watch = watch
+        if not live:
+            # Every viewer left while the listener was attaching
+            watch.unsubscribe()
+
+    def _unsubscribe(self, subscriber: _Subscriber) -> None:
+        with self._lock:
+            topic = self._topics.get(subscriber.donation_id)
+            if topic is None:
+                return
+            topic.subscribers.discard(subscriber)
+            if topic.subscribers:
+                return
+            del self._topics[subscriber.donation_id]
+            watch = topic.watch
+        if watch is not None:
+            watch.unsubscribe()
+
+    # ------------------------------------------------------------------------
+    # Listener callback (Firestore watch thread)
+    # ------------------------------------------------------------------------
+
+    def _on_snapshot(self, donation_id: str, docs) -> None:
+        for doc in docs:
+            if not doc.exists:
+                self._broadcast(donation_id, format_sse("error", {"error": "Donation not found"}), close=True)
+                continue
+
+            payload = self.build_payload(donation_id, doc.to_dict() or {})
+            with self._lock:
+                topic = self._topics.get(donation_id)
+                if topic is None:
+                    return
+                previous, topic.payload = topic.payload, payload
+
+            if previous is None:
+                self._broadcast(donation_id, format_sse("snapshot", payload))
+                continue
+
+            delta = {key: value for key, value in payload.items() if previous.get(key) != value}
+            if delta:
+                self._broadcast(donation_id, format_sse("delta", delta), resync=payload)
+
+    def _broadcast(self, donation_id: str, frame: str,
+                   resync: Optional[Dict] = None, close: bool = False) -> None:
+        with self._lock:
+            topic = self._topics.get(donation_id)
+            subscribers = list(topic.subscribers) if topic else []
+
+        for subscriber in subscribers:
+            try:
+                subscriber.queue.put_nowait(frame)
+            except queue.Full:
+                # Slow viewer missed deltas: replace its backlog with a full snapshot
+                self._drain(subscriber.queue)
+                subscriber.queue.put_nowait(format_sse("snapshot", resync) if resync else frame)
+            if close:
+                try:
+                    subscriber.queue.put_nowait(None)
+                except queue.Full:
+                    self._drain(subscriber.queue)
+                    subscriber.queue.put_nowait(None)
+
+    @staticmethod
+    def _drain(q: "queue.Queue") -> None:
+        try:
+            while True:
+                q.get_nowait()
+        except queue.Empty:
+            pass
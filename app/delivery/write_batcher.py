@@ -0,0 +1,207 @@
+# app/delivery/write_batcher.py
+# Batched & Coalesced Firestore Writes
+
+import os
+import threading
+import time
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# Firestore's limit on writes per WriteBatch
+MAX_BATCH_WRITES = 500
+
+
+class WriteOp(NamedTuple):
+    """One document write inside a batch"""
+    kind: str                        # "set" | "update" | "delete"
+    ref: Any                         # firestore DocumentReference
+    data: Optional[Dict] = None
+    merge: bool = False
+
+
+def set_op(ref, data: Dict, merge: bool = False) -> WriteOp:
+    return WriteOp("set", ref, data, merge)
+
+
+def update_op(ref, data: Dict) -> WriteOp:
+    return WriteOp("update", ref, data)
+
+
+def delete_op(ref) -> WriteOp:
+    return WriteOp("delete", ref)
+
+
+def apply_ops(batch, ops: List[WriteOp]) -> None:
+    """Stage WriteOps on a Firestore WriteBatch"""
+    for op in ops:
+        if op.kind == "set":
+            batch.set(op.ref, op.data, merge=op.merge)
+        elif op.kind == "update":
+            batch.update(op.ref, op.data)
+        elif op.kind == "delete":
+            batch.delete(op.ref)
+        else:
+            raise ValueError(f"Unknown write kind: {op.kind}")
+
+
+class _PendingWrite:
+    __slots__ = ("ops", "done", "error")
+
+    def __init__(self, ops: List[WriteOp]):
+        self.ops = ops
+        self.done = threading.Event()
+        self.error: Optional[BaseException] = None
+
+
+# ============================================================================
+# WRITE COALESCER
+# ============================================================================
+
+class WriteCoalescer:
+    """
+    Commits each request's related writes in one WriteBatch, and groups
+    batches from concurrent requests into shared commits.
+
+    - A request's writes always commit together (atomically) or not at all.
+    - Requests submitted within `window_seconds` of the first pending one
+      share a commit, up to MAX_BATCH_WRITES writes.
+    - If a shared commit fails, the group is split and retried, so one bad
+      write (e.g. update on a missing doc) only fails the request it
+      belongs to.
+
+    With window_seconds=0 every request commits its own batch inline.
+    """
+
+    def __init__(self, db, window_seconds: float = 0.01, max_writes: int = MAX_BATCH_WRITES):
+        self.db = db
+        self.window_seconds = window_seconds
+        self.max_writes = max_writes
+
+        self._cond = threading.Condition()
+        self._queue: Deque[_PendingWrite] = deque()
+        self._pid: Optional[int] = None
+
+        self.commits = 0
+        self.writes = 0
+        self.requests = 0
+        self.splits = 0
+        self.timeouts = 0
+
+    @classmethod
+    def from_env(cls, db) -> "WriteCoalescer":
+        """Build from WRITE_COALESCE_WINDOW_MS (0 = no cross-request grouping)"""
+        return cls(db, window_seconds=float(os.getenv("WRITE_COALESCE_WINDOW_MS", "10")) / 1000)
+
+    def commit(self, ops: List[WriteOp], timeout: float = 10) -> None:
+        """
+        Commit one request's writes, blocking until they are durable.
+
+        If the writes are still queued after `timeout` they are withdrawn
+        and TimeoutError is raised, so a timed-out request is never written
+        later. Writes the flusher has already picked up are waited for, and
+        their real outcome is reported.
+
+        Raises:
+            TimeoutError: the writes were not picked up within `timeout` (nothing written)
+            Exception: whatever Firestore raised for this request's writes
+        """
+        if not ops:
+            return
+        if len(ops) > self.max_writes:
+            raise ValueError(f"At most {self.max_writes} writes per request")
+
+        pending = _PendingWrite(ops)
+        if self.window_seconds <= 0:
+            self._commit_group([pending])
+        else:
+            with self._cond:
+                self._ensure_flusher()
+                self._queue.append(pending)
+                self._cond.notify()
+            if not pending.done.wait(timeout):
+                with self._cond:
+                    try:
+                        self._queue.remove(pending)
+                        withdrawn = True
+                        self.timeouts += 1
+                    except ValueError:
+                        withdrawn = False
+                if withdrawn:
+                    raise TimeoutError("Firestore write not committed in time (withdrawn, nothing written)")
+                # Already part of an in-flight commit: its result is the real answer
+                pending.done.wait()
+
+        if pending.error is not None:
+            raise pending.error
+
+    def stats(self) -> Dict:
+        """Counters for the /metrics endpoint"""
+        with self._cond:
+            return {
+                "requests": self.requests,
+                "commits": self.commits,
+                "writes": self.writes,
+                "splits": self.splits,
+                "timeouts": self.timeouts,
+                "queued": len(self._queue),
+            }
+
+    # ------------------------------------------------------------------------
+    # Flusher
+    # ------------------------------------------------------------------------
+
+    def _ensure_flusher(self) -> None:
+        """Start the flusher thread (per PID, so forked workers get their own)"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        self._pid = pid
+        threading.Thread(target=self._run, name="firestore-write-coalescer", daemon=True).start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+
+            # Let concurrent requests join this commit
+            time.sleep(self.window_seconds)
+
+            with self._cond:
+                group, total = [], 0
+                while self._queue and total + len(self._queue[0].ops) <= self.max_writes:
+                    pending = self._queue.popleft()
+                    group.append(pending)
+                    total += len(pending.ops)
+
+            self._commit_group(group)
+
+    def _commit_group(self, group: List[_PendingWrite]) -> None:
+        try:
+            batch = self.db.batch()
+            for pending in group:
+                apply_ops(batch, pending.ops)
+            batch.commit()
+        except Exception as e:
+            if len(group) == 1:
+                group[0].error = e
+                group[0].done.set()
+                return
+            # Bisect so the failing request is isolated in O(log n) extra commits
+            logger.warning(f"Grouped commit of {len(group)} requests failed, splitting: {str(e)}")
+            with self._cond:
+                self.splits += 1
+            middle = len(group) // 2
+            self._commit_group(group[:middle])
+            self._commit_group(group[middle:])
+            return
+
+        with self._cond:
+            self.commits += 1
+            self.requests += len(group)
+            self.writes += sum(len(pending.ops) for pending in group)
+        for pending in group:
+            pending.done.set()
@@ -0,0 +1,283 @@
+# app/delivery/zone_grid.py
+# Precomputed Zone-to-Zone Road Distance Grid
+#
+# Build (needs GOOGLE_MAPS_API_KEY; one Distance Matrix element per zone pair):
+#     python -m app.delivery.zone_grid --bbox 12.83,77.46,13.14,77.78 --precision 5 --out zones-blr.bin
+# Serve: ZONE_GRID_PATH=zones-blr.bin
+
+import argparse
+import os
+import struct
+import tempfile
+import logging
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .geo import haversine_km
+
+logger = logging.getLogger(__name__)
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_BASE32_INDEX = {c: i for i, c in enumerate(_BASE32)}
+
+# magic, format version, geohash precision, zone count
+_HEADER = struct.Struct("<4sHHI")
+_MAGIC = b"ZGRD"
+_VERSION = 1
+
+# Fixed buffer _parse_matrix_element adds to every Distance Matrix duration
+MATRIX_BUFFER_MINUTES = 10
+
+# Below this center-to-center span the detour ratio is too noisy to use
+MIN_ZONE_SPAN_KM = 0.5
+
+
+def geohash_encode(lat: float, lng: float, precision: int) -> str:
+    """Standard base-32 geohash of a point"""
+    lat_lo, lat_hi, lng_lo, lng_hi = -90.0, 90.0, -180.0, 180.0
+    chars = []
+    bit, ch, even = 0, 0, True
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                ch = (ch << 1) | 1
+                lng_lo = mid
+            else:
+                ch <<= 1
+                lng_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                ch = (ch << 1) | 1
+                lat_lo = mid
+            else:
+                ch <<= 1
+                lat_hi = mid
+        even = not even
+        bit += 1
+        if bit == 5:
+            chars.append(_BASE32[ch])
+            bit, ch = 0, 0
+    return "".join(chars)
+
+
+def geohash_center(code: str) -> Tuple[float, float]:
+    """(lat, lng) at the center of a geohash cell"""
+    lat_lo, lat_hi, lng_lo, lng_hi = -90.0, 90.0, -180.0, 180.0
+    even = True
+    for c in code:
+        value = _BASE32_INDEX[c]
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            if even:
+                mid = (lng_lo + lng_hi) / 2
+                lng_lo, lng_hi = (mid, lng_hi) if bit else (lng_lo, mid)
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                lat_lo, lat_hi = (mid, lat_hi) if bit else (lat_lo, mid)
+            even = not even
+    return (lat_lo + lat_hi) / 2, (lng_lo + lng_hi) / 2
+
+
+def geohash_cell_size(precision: int) -> Tuple[float, float]:
+    """(lat_degrees, lng_degrees) covered by one cell"""
+    bits = 5 * precision
+    return 180.0 / (1 << (bits // 2)), 360.0 / (1 << ((bits + 1) // 2))
+
+
+def zones_in_bbox(min_lat: float, min_lng: float,
+                  max_lat: float, max_lng: float,
+                  precision: int) -> List[str]:
+    """Every geohash cell at `precision` overlapping the bounding box"""
+    lat_step, lng_step = geohash_cell_size(precision)
+    zones = set()
+    lat = min_lat
+    while lat <= max_lat + lat_step:
+        lng = min_lng
+        while lng <= max_lng + lng_step:
+            zones.add(geohash_encode(min(lat, max_lat), min(lng, max_lng), precision))
+            lng += lng_step
+        lat += lat_step
+    return sorted(zones)
+
+
+# ============================================================================
+# ZONE GRID
+# ============================================================================
+
+class ZoneGrid:
+    """
+    Read-only zone × zone road distance/duration matrix backed by a
+    memory-mapped file, so every worker on the host shares one copy in the
+    page cache.
+
+    A lookup maps both points to their geohash zones and scales the
+    zone-center road distance by the trip's own straight-line distance
+    (keeping the zone pair's detour ratio and speed). Returns None when a
+    point is outside the grid, both points share a zone, or the pair was
+    never resolved; callers then fall back to Haversine.
+
+    File layout: header, zone codes (precision bytes each, sorted), padding
+    to 4 bytes, float32 distance_km[n][n], float32 duration_minutes[n][n]
+    (NaN = unresolved).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            magic, version, precision, count = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != _MAGIC or version != _VERSION:
+                raise ValueError(f"{path} is not a zone grid (version {_VERSION})")
+            codes = f.read(precision * count).decode("ascii")
+
+        self.precision = precision
+        self.zones = [codes[i * precision:(i + 1) * precision] for i in range(count)]
+        self._index: Dict[str, int] = {code: i for i, code in enumerate(self.zones)}
+        self._centers = [geohash_center(code) for code in self.zones]
+
+        offset = _matrix_offset(precision, count)
+        self.distance_km = np.memmap(path, dtype="<f4", mode="r", offset=offset, shape=(count, count))
+        self.duration_minutes = np.memmap(
+            path, dtype="<f4", mode="r", offset=offset + 4 * count * count, shape=(count, count)
+        )
+
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["ZoneGrid"]:
+        """Load ZONE_GRID_PATH if set; None (no grid tier) otherwise"""
+        path = os.getenv("ZONE_GRID_PATH")
+        if not path:
+            return None
+        try:
+            grid = cls(path)
+        except (OSError, ValueError, struct.error) as e:
+            logger.error(f"Zone grid disabled, could not load {path}: {str(e)}")
+            return None
+        logger.info(f"Loaded zone grid {path}: {len(grid.zones)} zones at precision {grid.precision}")
+        return grid
+
+    def lookup(self, pickup_lat: float, pickup_lng: float,
+               drop_lat: float, drop_lng: float) -> Optional[Tuple[float, int]]:
+        """(distance_km, duration_minutes) or None if the grid cannot answer"""
+        i = self._index.get(geohash_encode(pickup_lat, pickup_lng, self.precision))
+        j = self._index.get(geohash_encode(drop_lat, drop_lng, self.precision))
+        if i is None or j is None or i == j:
+            self.misses += 1
+            return None
+
+        road_km = float(self.distance_km[i, j])
+        minutes = float(self.duration_minutes[i, j])
+        span_km = haversine_km(*self._centers[i], *self._centers[j])
+        if road_km != road_km or minutes != minutes or span_km < MIN_ZONE_SPAN_KM or road_km <= 0:
+            self.misses += 1
+            return None
+
+        straight_km = haversine_km(pickup_lat, pickup_lng, drop_lat, drop_lng)
+        distance_km = straight_km * (road_km / span_km)
+        driving_minutes = max(minutes - MATRIX_BUFFER_MINUTES, 0) * (distance_km / road_km)
+        self.hits += 1
+        return round(distance_km, 2), int(driving_minutes) + MATRIX_BUFFER_MINUTES
+
+    def stats(self) -> Dict:
+        """Counters for the /metrics endpoint"""
+        total = self.hits + self.misses
+        return {
+            "zones": len(self.zones),
+            "precision": self.precision,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+def _matrix_offset(precision: int, count: int) -> int:
+    offset = _HEADER.size + precision * count
+    return (offset + 3) // 4 * 4
+
+
+def write_zone_grid(path: str,
+                    zones: Sequence[str],
+                    distance_km: np.ndarray,
+                    duration_minutes: np.ndarray) -> None:
+    """Write a grid file atomically (temp file + rename) so serving workers never see a partial file"""
+    precision = len(zones[0])
+    count = len(zones)
+    header = _HEADER.pack(_MAGIC, _VERSION, precision, count) + "".join(zones).encode("ascii")
+    header += b"\0" * (_matrix_offset(precision, count) - len(header))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            f.write(np.ascontiguousarray(distance_km, dtype="<f4").tobytes())
+            f.write(np.ascontiguousarray(duration_minutes, dtype="<f4").tobytes())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def build_zone_grid(zones: Sequence[str],
+                    distance_matrix: Callable[[List[Tuple[float, float]], List[Tuple[float, float]]], List[List[Tuple]]],
+                    path: str) -> int:
+    """
+    Resolve every zone-center pair with `distance_matrix` (e.g.
+    PriceEstimationService.estimate_distance_matrix) and write the grid.
+    Pairs that only got a straight-line fallback are stored as NaN.
+
+    Returns:
+        Number of resolved pairs
+    """
+    zones = sorted(zones)
+    centers = [geohash_center(code) for code in zones]
+    count = len(zones)
+    distance_km = np.full((count, count), np.nan, dtype="<f4")
+    duration_minutes = np.full((count, count), np.nan, dtype="<f4")
+
+    rows = distance_matrix(centers, centers)
+    resolved = 0
+    for i, row in enumerate(rows):
+        for j, (km, minutes, source) in enumerate(row):
+            if i != j and getattr(source, "value", source) in ("google", "cache"):
+                distance_km[i, j] = km
+                duration_minutes[i, j] = minutes
+                resolved += 1
+
+    write_zone_grid(path, zones, distance_km, duration_minutes)
+    return resolved
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Precompute a zone x zone road distance grid")
+    parser.add_argument("--bbox", required=True, help="min_lat,min_lng,max_lat,max_lng")
+    parser.add_argument("--precision", type=int, default=5, help="geohash precision (5 = ~4.9 km cells)")
+    parser.add_argument("--out", required=True, help="output grid file")
+    args = parser.parse_args(argv)
+
+    min_lat, min_lng, max_lat, max_lng = (float(v) for v in args.bbox.split(","))
+    zones = zones_in_bbox(min_lat, min_lng, max_lat, max_lng, args.precision)
+    print(f"{len(zones)} zones, {len(zones) * (len(zones) - 1)} pairs to resolve")
+
+    # Only the estimator is needed: importing services has no app/Firebase
+    # side effects (app/__init__.py builds the Flask app lazily)
+    from .distance_backends import build_chain
+    from .services import PriceEstimationService
+    estimator = PriceEstimationService()
+    if estimator.gmaps is None:
+        parser.error("GOOGLE_MAPS_API_KEY is required to build a zone grid")
+    # Grid cells must be real road answers; with ROAD_GRAPH_PATH or
+    # DISTANCE_LOCAL_FIRST set the default chain would answer locally first
+    estimator.distance_backends = build_chain(estimator, ("google",))
+
+    resolved = build_zone_grid(zones, estimator.estimate_distance_matrix, args.out)
+    print(f"Wrote {args.out}: {resolved} pairs resolved")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# benchmarks/bench_json.py
+# Microbenchmark: per-response serialization CPU for /quote and /options
+#
+# Run from the repository root (needs the same environment as the app):
+#     python -m benchmarks.bench_json [iterations]
+
+import os
+import sys
+import timeit
+
+os.environ.setdefault("DELIVERY_CONFIG_LISTENER", "0")
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from app.delivery import json_provider
+from app.delivery.json_provider import DeliveryJSONProvider
+from app.delivery.services import DeliveryOptionService, PriceEstimationService
+
+
+def _quote_response(service: PriceEstimationService):
+    return service.estimate_all_providers(12.9716, 77.5946, 12.9352, 77.6245, serving_capacity=40)
+
+
+def _time(app: Flask, build, iterations: int) -> float:
+    """Microseconds per response"""
+    with app.app_context():
+        seconds = min(timeit.repeat(lambda: app.json.response(build()), number=iterations, repeat=5))
+    return seconds / iterations * 1e6
+
+
+def main(iterations: int = 20000) -> None:
+    price_service = PriceEstimationService()
+    option_service = DeliveryOptionService()
+    estimates = _quote_response(price_service)
+
+    stdlib_app = Flask("bench_stdlib")
+    stdlib_app.json = DefaultJSONProvider(stdlib_app)
+    fast_app = Flask("bench_fast")
+    fast_app.json = DeliveryJSONProvider(fast_app)
+
+    cases = {
+        "/quote": (
+            lambda: {"success": True, "data": estimates.to_dict()},
+            lambda: {"success": True, "data": estimates},
+        ),
+        "/options": (
+            lambda: {"success": True, "data": {k: o.to_dict() for k, o in option_service.get_all_options().items()}},
+            lambda: {"success": True, "data": option_service.get_all_options()},
+        ),
+    }
+
+    print(f"orjson: {'yes' if json_provider.orjson is not None else 'not installed (stdlib fallback)'}")
+    print(f"{'endpoint':<10} {'stdlib jsonify':>15} {'DeliveryJSON':>14} {'speedup':>8}")
+    for endpoint, (legacy, direct) in cases.items():
+        before = _time(stdlib_app, legacy, iterations)
+        after = _time(fast_app, direct, iterations)
+        print(f"{endpoint:<10} {before:>12.2f} us {after:>11.2f} us {before / after:>7.1f}x")
+
+    # /options is normally served from pre-serialized bytes (one lookup per request)
+    cached = min(timeit.repeat(option_service.get_serialized_options, number=iterations, repeat=5))
+    cached = cached / iterations * 1e6
+    print(f"{'/options':<10} {'cached bytes':>15} {cached:>11.2f} us (lookup only)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,125 @@
+# benchmarks/bench_routing.py
+# Benchmark: local road graph (contraction hierarchies vs plain Dijkstra)
+# against a per-quote Distance Matrix call
+#
+# Run from the repository root (needs the same environment as the app):
+#     python -m benchmarks.bench_routing [queries]
+#
+# Uses ROAD_GRAPH_PATH if set, else a synthetic perturbed-grid city. The
+# Distance Matrix row uses a stand-in client with GOOGLE_LATENCY_MS of
+# simulated latency (default 120), not the real API.
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DELIVERY_CONFIG_LISTENER", "0")
+
+import numpy as np
+
+from app.delivery.distance_backends import build_chain
+from app.delivery.road_graph import RoadGraph, write_road_graph
+from app.delivery.services import PriceEstimationService
+
+GRID_SIZE = 60
+GRID_SPACING_DEGREES = 0.0018
+ORIGIN = (12.90, 77.55)
+
+
+def _synthetic_city(directory: str):
+    """Write contracted and uncontracted copies of a GRID_SIZE² street grid"""
+    rng = np.random.default_rng(7)
+    rows, cols = np.divmod(np.arange(GRID_SIZE * GRID_SIZE), GRID_SIZE)
+    lat = ORIGIN[0] + rows * GRID_SPACING_DEGREES + rng.normal(0, 0.0002, rows.size)
+    lng = ORIGIN[1] + cols * GRID_SPACING_DEGREES + rng.normal(0, 0.0002, cols.size)
+
+    ids = np.arange(rows.size).reshape(GRID_SIZE, GRID_SIZE)
+    pairs = np.concatenate([
+        np.stack([ids[:, :-1].ravel(), ids[:, 1:].ravel()], axis=1),
+        np.stack([ids[:-1, :].ravel(), ids[1:, :].ravel()], axis=1),
+    ])
+    src = np.concatenate([pairs[:, 0], pairs[:, 1]])
+    dst = np.concatenate([pairs[:, 1], pairs[:, 0]])
+    length_m = np.hypot((lat[src] - lat[dst]) * 111_320, (lng[src] - lng[dst]) * 108_500)
+    # Every fifth street is an arterial
+    arterial = (rows[src] % 5 == 0) & (rows[src] == rows[dst]) | (cols[src] % 5 == 0) & (cols[src] == cols[dst])
+    time_s = length_m / np.where(arterial, 40 / 3.6, 20 / 3.6)
+
+    paths = {}
+    for name, contract in (("ch", True), ("dijkstra", False)):
+        paths[name] = os.path.join(directory, f"{name}.bin")
+        started = time.perf_counter()
+        write_road_graph(paths[name], lat, lng, src, dst, time_s, length_m, contract=contract)
+        print(f"built {name:<9} {time.perf_counter() - started:7.2f} s")
+    return paths, (lat.min(), lat.max(), lng.min(), lng.max())
+
+
+class _SimulatedDistanceMatrix:
+    """Stand-in googlemaps client: fixed latency, straight-line answer"""
+
+    def __init__(self, latency_s: float):
+        self.latency_s = latency_s
+
+    def distance_matrix(self, origins, destinations, **kwargs):
+        time.sleep(self.latency_s)
+        (o_lat, o_lng), (d_lat, d_lng) = (map(float, p.split(",")) for p in (origins, destinations))
+        metres = int(PriceEstimationService._haversine_distance(o_lat, o_lng, d_lat, d_lng) * 1300)
+        element = {"status": "OK", "distance": {"value": metres}, "duration": {"value": metres // 6}}
+        return {"rows": [{"elements": [element]}]}
+
+
+def _pairs(bounds, count: int):
+    lat_lo, lat_hi, lng_lo, lng_hi = bounds
+    rng = random.Random(1)
+    return [(rng.uniform(lat_lo, lat_hi), rng.uniform(lng_lo, lng_hi),
+             rng.uniform(lat_lo, lat_hi), rng.uniform(lng_lo, lng_hi)) for _ in range(count)]
+
+
+def _per_query_us(route, pairs) -> float:
+    started = time.perf_counter()
+    for pair in pairs:
+        route(*pair)
+    return (time.perf_counter() - started) / len(pairs) * 1e6
+
+
+def main(queries: int = 500) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        if os.getenv("ROAD_GRAPH_PATH"):
+            graph = RoadGraph(os.environ["ROAD_GRAPH_PATH"])
+            graphs = {"ch" if graph.contracted else "dijkstra": graph}
+            bounds = (float(graph.lat.min()), float(graph.lat.max()),
+                      float(graph.lng.min()), float(graph.lng.max()))
+        else:
+            paths, bounds = _synthetic_city(directory)
+            graphs = {name: RoadGraph(path) for name, path in paths.items()}
+
+        pairs = _pairs(bounds, queries)
+        any_graph = next(iter(graphs.values()))
+        print(f"graph: {any_graph.node_count} nodes, {any_graph.edge_count} edges, "
+              f"{graphs['ch'].shortcut_count if 'ch' in graphs else 0} shortcuts")
+        print(f"{'path':<28} {'per quote':>12}")
+        for name, graph in graphs.items():
+            print(f"{'road graph (' + name + ')':<28} {_per_query_us(graph.route, pairs):>9.0f} us")
+
+        origins = [(p[0], p[1]) for p in pairs[:5]]
+        destinations = [(p[2], p[3]) for p in pairs[:25]]
+        for name, graph in graphs.items():
+            started = time.perf_counter()
+            graph.route_matrix(origins, destinations)
+            elapsed = (time.perf_counter() - started) * 1e3
+            print(f"{'5x25 matrix (' + name + ')':<28} {elapsed:>9.1f} ms")
+
+        latency_s = float(os.getenv("GOOGLE_LATENCY_MS", "120")) / 1000
+        service = PriceEstimationService()
+        service.gmaps = _SimulatedDistanceMatrix(latency_s)
+        service.distance_backends = build_chain(service, ("google", "haversine"))
+        service.uses_google = True
+        google_pairs = pairs[:max(1, min(queries, 20))]
+        google_us = _per_query_us(service.estimate_distance_with_source, google_pairs)
+        print(f"{'distance matrix (simulated)':<28} {google_us:>9.0f} us")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
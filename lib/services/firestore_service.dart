@@ -397,6 +397,7 @@ class FirestoreService {
       'deliveryStatus': 'confirmed',
       'deliveryConfirmedAt': FieldValue.serverTimestamp(),
       'deliveryCompany': deliveryCompany,
+      'updatedAt': FieldValue.serverTimestamp(),
     });
   }
 
@@ -430,6 +431,8 @@ class FirestoreService {
     await _db.collection('deliveries').doc(donationId).update(updateData);
     await _db.collection('donations').doc(donationId).update({
       'deliveryStatus': status,
+      'updatedAt': FieldValue.serverTimestamp(),
+      if (status == 'delivered') 'deliveryCompletedAt': FieldValue.serverTimestamp(),
     });
   }
 
@@ -5,6 +5,8 @@ import firebase_admin
 from firebase_admin import credentials, firestore
 import os
 
+from app.delivery.doc_cache import DocumentCache
+
 # Initialize Flask app
 app = Flask(
     __name__,
@@ -22,6 +24,20 @@ if not firebase_admin._apps:
     firebase_admin.initialize_app(cred)
 db = firestore.client()
 
+# ======================
+# Tracking cache
+# ======================
+
+# Per-worker read-through cache for deliveries/{id}, used by /track; hot
+# deliveries get an on_snapshot listener that keeps them fresh
+tracking_cache = DocumentCache(
+    db,
+    'deliveries',
+    max_entries=int(os.getenv('TRACK_CACHE_SIZE', '2000')),
+    ttl_seconds=float(os.getenv('TRACK_CACHE_TTL_SECONDS', '5')),
+    max_watches=int(os.getenv('TRACK_CACHE_MAX_WATCHES', '100')),
+)
+
 # ======================
 # Routes
 # ======================
@@ -132,14 +148,18 @@ def assign_delivery():
             })
             # TODO: Integrate actual delivery APIs here (Swiggy, Porter, etc.)
 
-        delivery_ref.update(update_data)
-
+        # Delivery + donation updates commit together in one round trip
         donation_ref = db.collection('donations').document(donation_id)
-        donation_ref.update({
+        batch = db.batch()
+        batch.update(delivery_ref, update_data)
+        batch.update(donation_ref, {
             'deliveryStatus': 'confirmed',
             'deliveryConfirmedAt': firestore.SERVER_TIMESTAMP,
             'deliveryCompany': delivery_company,
+            'updatedAt': firestore.SERVER_TIMESTAMP,
         })
+        batch.commit()
+        tracking_cache.invalidate(donation_id)
 
         return jsonify({
             'success': True,
@@ -163,12 +183,23 @@ def update_delivery_status():
         driver_lng = data.get('driver_lng')
 
         delivery_ref = db.collection('deliveries').document(donation_id)
-        update_data = {'status': status}
+        update_data = {}
 
         if driver_lat and driver_lng:
             update_data['driver_lat'] = driver_lat
             update_data['driver_lng'] = driver_lng
 
+        # Location-only ping: one write to the delivery, donation untouched.
+        # High-frequency GPS should go to /api/delivery/location instead.
+        if not status:
+            if not update_data:
+                return jsonify({'success': False, 'error': 'status or driver location required'}), 400
+            delivery_ref.update(update_data)
+            tracking_cache.invalidate(donation_id)
+            return jsonify({'success': True, 'message': 'Driver location updated'})
+
+        update_data['status'] = status
+
         if status == 'picked_up':
             update_data['picked_up_at'] = firestore.SERVER_TIMESTAMP
         elif status == 'in_transit':
@@ -176,11 +207,19 @@ def update_delivery_status():
         elif status == 'delivered':
             update_data['delivered_at'] = firestore.SERVER_TIMESTAMP
 
-        delivery_ref.update(update_data)
-
-        db.collection('donations').document(donation_id).update({
+        # updatedAt moves the donation past the analytics snapshot watermark
+        donation_update = {
             'deliveryStatus': status,
-        })
+            'updatedAt': firestore.SERVER_TIMESTAMP,
+        }
+        if status == 'delivered':
+            donation_update['deliveryCompletedAt'] = firestore.SERVER_TIMESTAMP
+
+        batch = db.batch()
+        batch.update(delivery_ref, update_data)
+        batch.update(db.collection('donations').document(donation_id), donation_update)
+        batch.commit()
+        tracking_cache.invalidate(donation_id)
 
         return jsonify({
             'success': True,
@@ -196,10 +235,10 @@ def update_delivery_status():
 def track_delivery(donation_id):
     """Get delivery tracking information"""
     try:
-        doc = db.collection('deliveries').document(donation_id).get()
-        if not doc.exists:
+        delivery_data = tracking_cache.get(donation_id)
+        if delivery_data is None:
             return jsonify({'success': False, 'error': 'Delivery not found'}), 404
-        return jsonify({'success': True, 'data': doc.to_dict()})
+        return jsonify({'success': True, 'data': delivery_data})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 400
 
@@ -243,14 +282,16 @@ def webhook_driver_assigned():
             update_data['driver_lat'] = data['driver_lat']
             update_data['driver_lng'] = data['driver_lng']
         
-        # Update delivery record
-        db.collection('deliveries').document(donation_id).update(update_data)
-
-        # Update donation record
-        db.collection('donations').document(donation_id).update({
+        # Delivery + donation updates commit together in one round trip
+        batch = db.batch()
+        batch.update(db.collection('deliveries').document(donation_id), update_data)
+        batch.update(db.collection('donations').document(donation_id), {
             'deliveryStatus': 'confirmed',
             'driverAssigned': True,
+            'updatedAt': firestore.SERVER_TIMESTAMP,
         })
+        batch.commit()
+        tracking_cache.invalidate(donation_id)
 
         return jsonify({
             'success': True,
@@ -265,7 +306,11 @@ def webhook_driver_assigned():
 # Optional: Health check endpoint
 @app.route('/health')
 def health():
-    return jsonify({"status": "healthy", "service": "Food Donation Backend"}), 200
+    return jsonify({
+        "status": "healthy",
+        "service": "Food Donation Backend",
+        "trackCache": tracking_cache.stats(),
+    }), 200
 
 # ======================
 # Run
@@ -0,0 +1,292 @@
+# tests/conftest.py
+# Shared fixtures: one in-memory stand-in for the Firestore client
+#
+# Covers the client surface the delivery package uses: document refs
+# (get / set / update / delete / on_snapshot), write batches, get_all and
+# collection queries (where / order_by / start_after / limit / stream).
+# Listeners fire from the writing thread, never while the caller's own
+# locks are held; `notify(path)` delivers the initial snapshot by hand.
+
+import copy
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+import pytest
+from firebase_admin import firestore
+
+_EPOCH = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+_OPERATORS: Dict[str, Callable] = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "in": lambda a, b: a in b,
+}
+
+
+class NotFound(Exception):
+    """update() on a document that does not exist"""
+
+
+def _deep_merge(target: Dict, data: Dict) -> None:
+    for key, value in data.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _deep_merge(target[key], value)
+        else:
+            target[key] = copy.deepcopy(value)
+
+
+def _field(data: Optional[Dict], path: str):
+    value = data
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+class FakeSnapshot:
+    def __init__(self, reference: "FakeDocument", data: Optional[Dict], update_time):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self.update_time = update_time
+        self._data = copy.deepcopy(data)
+
+    def to_dict(self) -> Optional[Dict]:
+        return copy.deepcopy(self._data)
+
+    def get(self, field: str):
+        return _field(self._data, field)
+
+
+class FakeWatch:
+    def __init__(self, db: "FakeFirestore", path: str, callback):
+        self.db, self.path, self.callback = db, path, callback
+        self.active = True
+
+    def unsubscribe(self) -> None:
+        with self.db.lock:
+            self.active = False
+            if self in self.db.watches.get(self.path, []):
+                self.db.watches[self.path].remove(self)
+
+
+class FakeDocument:
+    def __init__(self, db: "FakeFirestore", path: str):
+        self.db = db
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def __eq__(self, other):
+        return isinstance(other, FakeDocument) and other.path == self.path
+
+    def __hash__(self):
+        return hash(self.path)
+
+    def get(self) -> FakeSnapshot:
+        return self.db.snapshot(self.path, count_read=True)
+
+    def set(self, data: Dict, merge: bool = False) -> None:
+        self.db.commit_writes([("set", self, data, merge)])
+
+    def update(self, data: Dict) -> None:
+        self.db.commit_writes([("update", self, data, False)])
+
+    def delete(self) -> None:
+        self.db.commit_writes([("delete", self, None, False)])
+
+    def on_snapshot(self, callback) -> FakeWatch:
+        if self.db.watch_error is not None:
+            raise self.db.watch_error
+        watch = FakeWatch(self.db, self.path, callback)
+        with self.db.lock:
+            self.db.watches.setdefault(self.path, []).append(watch)
+        return watch
+
+
+class FakeBatch:
+    def __init__(self, db: "FakeFirestore"):
+        self.db = db
+        self.staged: List = []
+
+    def set(self, ref: FakeDocument, data: Dict, merge: bool = False) -> None:
+        self.staged.append(("set", ref, data, merge))
+
+    def update(self, ref: FakeDocument, data: Dict) -> None:
+        self.staged.append(("update", ref, data, False))
+
+    def delete(self, ref: FakeDocument) -> None:
+        self.staged.append(("delete", ref, None, False))
+
+    def commit(self) -> None:
+        time.sleep(self.db.commit_delay)
+        self.db.commit_writes(self.staged)
+
+
+class FakeQuery:
+    def __init__(self, db: "FakeFirestore", collection: str, filters=(), orders=(), cursor=None, size=None):
+        self.db, self.collection_name = db, collection
+        self.filters, self.orders, self.cursor, self.size = tuple(filters), tuple(orders), cursor, size
+
+    def _copy(self, **changes) -> "FakeQuery":
+        state = dict(filters=self.filters, orders=self.orders, cursor=self.cursor, size=self.size)
+        state.update(changes)
+        return FakeQuery(self.db, self.collection_name, **state)
+
+    def document(self, doc_id: str) -> FakeDocument:
+        return FakeDocument(self.db, f"{self.collection_name}/{doc_id}")
+
+    def where(self, field: str, op: str, value) -> "FakeQuery":
+        return self._copy(filters=self.filters + ((field, op, value),))
+
+    def order_by(self, field: str) -> "FakeQuery":
+        return self._copy(orders=self.orders + (field,))
+
+    def limit(self, size: int) -> "FakeQuery":
+        return self._copy(size=size)
+
+    def start_after(self, values: Dict) -> "FakeQuery":
+        return self._copy(cursor=values)
+
+    def _key(self, doc_id: str, data: Dict, fields) -> tuple:
+        return tuple(doc_id if field == "__name__" else _field(data, field) for field in fields)
+
+    def stream(self) -> List[FakeSnapshot]:
+        orders = self.orders or ("__name__",)
+        with self.db.lock:
+            self.db.queries += 1
+            rows = []
+            for path, data in self.db.docs.items():
+                collection, _, doc_id = path.rpartition("/")
+                if collection != self.collection_name:
+                    continue
+                if not all(_field(data, field) is not None and _OPERATORS[op](_field(data, field), value)
+                           for field, op, value in self.filters):
+                    continue
+                rows.append((self._key(doc_id, data, orders), path))
+            rows.sort()
+            if self.cursor is not None:
+                after = tuple(self.cursor[field] for field in orders)
+                rows = [row for row in rows if row[0] > after]
+            if self.size is not None:
+                rows = rows[:self.size]
+        return [self.db.snapshot(path, count_read=True) for _, path in rows]
+
+
+class FakeFirestore:
+    """
+    In-memory Firestore client. Paths are "collection/doc_id"; every
+    write advances a logical clock used as update_time.
+
+    Knobs: `commit_delay` (seconds per batch commit), `watch_error`
+    (raised by on_snapshot). Counters: `reads`, `queries`, `get_all_calls`,
+    and `commits` (paths written per commit, failed ones included).
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.docs: Dict[str, Dict] = {}
+        self.update_times: Dict[str, datetime] = {}
+        self.watches: Dict[str, List[FakeWatch]] = {}
+        self.clock = 0
+
+        self.commit_delay = 0.0
+        self.watch_error: Optional[Exception] = None
+
+        self.reads = 0
+        self.queries = 0
+        self.get_all_calls: List[int] = []
+        self.commits: List[List[str]] = []
+
+    # Client surface ---------------------------------------------------------
+
+    def collection(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def document(self, path: str) -> FakeDocument:
+        return FakeDocument(self, path)
+
+    def batch(self) -> FakeBatch:
+        return FakeBatch(self)
+
+    def get_all(self, refs) -> List[FakeSnapshot]:
+        refs = list(refs)
+        with self.lock:
+            self.get_all_calls.append(len(refs))
+        return [self.snapshot(ref.path, count_read=True) for ref in refs]
+
+    # Test helpers -----------------------------------------------------------
+
+    def put(self, path: str, data: Optional[Dict]) -> None:
+        """Write (or with None, delete) a document and fire its listeners"""
+        if data is None:
+            self.commit_writes([("delete", self.document(path), None, False)])
+        else:
+            self.commit_writes([("set", self.document(path), data, False)])
+
+    def data(self, path: str) -> Optional[Dict]:
+        with self.lock:
+            return copy.deepcopy(self.docs.get(path))
+
+    def snapshot(self, path: str, count_read: bool = False) -> FakeSnapshot:
+        with self.lock:
+            if count_read:
+                self.reads += 1
+            return FakeSnapshot(self.document(path), self.docs.get(path), self.update_times.get(path))
+
+    def notify(self, path: str) -> None:
+        """Deliver the current snapshot to the document's listeners"""
+        with self.lock:
+            watches = [watch for watch in self.watches.get(path, []) if watch.active]
+        for watch in watches:
+            watch.callback([self.snapshot(path)], [], None)
+
+    def active_watches(self) -> int:
+        with self.lock:
+            return sum(len(watches) for watches in self.watches.values())
+
+    def commit_writes(self, writes: List) -> None:
+        """Apply set/update/delete writes atomically, then fire listeners"""
+        with self.lock:
+            self.commits.append([ref.path for _, ref, _, _ in writes])
+            for kind, ref, _, _ in writes:
+                if kind == "update" and ref.path not in self.docs:
+                    raise NotFound(f"No document to update: {ref.path}")
+            self.clock += 1
+            stamp = _EPOCH + timedelta(microseconds=self.clock)
+            for kind, ref, data, merge in writes:
+                if kind == "delete":
+                    self.docs.pop(ref.path, None)
+                elif kind == "update":
+                    document = self.docs[ref.path]
+                    for key, value in data.items():
+                        self._set_path(document, key, value, stamp)
+                else:
+                    document = self.docs.setdefault(ref.path, {}) if merge else {}
+                    resolved = {key: self._resolve(value, stamp) for key, value in data.items()}
+                    _deep_merge(document, resolved)
+                    self.docs[ref.path] = document
+                self.update_times[ref.path] = stamp
+        for path in dict.fromkeys(ref.path for _, ref, _, _ in writes):
+            self.notify(path)
+
+    @staticmethod
+    def _resolve(value, stamp):
+        return stamp if value is firestore.SERVER_TIMESTAMP else value
+
+    def _set_path(self, document: Dict, dotted: str, value, stamp) -> None:
+        parts = dotted.split(".")
+        for part in parts[:-1]:
+            document = document.setdefault(part, {})
+        document[parts[-1]] = copy.deepcopy(self._resolve(value, stamp))
+
+
+@pytest.fixture
+def fake_db() -> FakeFirestore:
+    return FakeFirestore()
@@ -0,0 +1,136 @@
+# tests/test_analytics.py
+# Columnar delivery snapshot: incremental refresh and aggregates
+#
+# Donations are shaped the way the app writes them: /order sets
+# deliveryStatus "pending", /book adds the `delivery` map, and the status
+# endpoints move deliveryStatus while stamping deliveries/{id}.
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.delivery.analytics import DeliverySnapshot, SnapshotReader, refresh_snapshot
+
+T0 = datetime(2026, 5, 1, 8, 0, tzinfo=timezone.utc)
+
+
+def _at(minutes):
+    return T0 + timedelta(minutes=minutes)
+
+
+def _order(db, doc_id, minutes):
+    db.put(f"donations/{doc_id}", {"status": "available", "deliveryStatus": "pending", "updatedAt": _at(minutes)})
+    db.put(f"deliveries/{doc_id}", {"donation_id": doc_id, "status": "pending"})
+
+
+def _book(db, doc_id, minutes, method, km, price):
+    _order(db, doc_id, minutes)
+    db.document(f"donations/{doc_id}").update({
+        "delivery": {
+            "method": method,
+            "status": "booked",
+            "estimatedPrice": price,
+            "distanceKm": km,
+            "bookedAt": _at(minutes),
+        },
+        "status": "in_delivery",
+        "updatedAt": _at(minutes),
+    })
+
+
+def _update_status(db, doc_id, status, minutes, stamp_donation=True):
+    """run.py update-status; stamp_donation=False is a donation delivered before it bumped updatedAt"""
+    batch = db.batch()
+    batch.update(db.document(f"deliveries/{doc_id}"), {"status": status, f"{status}_at": _at(minutes)})
+    donation = {"deliveryStatus": status}
+    if stamp_donation:
+        donation["updatedAt"] = _at(minutes)
+        if status == "delivered":
+            donation["deliveryCompletedAt"] = _at(minutes)
+    batch.update(db.document(f"donations/{doc_id}"), donation)
+    batch.commit()
+
+
+@pytest.fixture
+def db(fake_db):
+    db = fake_db
+    _book(db, "a", 1, "porter", 4.0, 120)
+    _update_status(db, "a", "picked_up", 10)
+    _update_status(db, "a", "delivered", 31)
+    _book(db, "b", 2, "dunzo", 6.5, 90)
+    _update_status(db, "b", "delivered", 52, stamp_donation=False)
+    _book(db, "c", 3, "rapido", 2.0, 70)
+    _order(db, "d", 4)                                        # no delivery booked yet
+    return db
+
+
+def test_first_refresh_builds_the_snapshot(tmp_path, db):
+    result = refresh_snapshot(db, str(tmp_path), page_size=2)
+    assert result["changed"] == 3 and result["rows"] == 3
+
+    summary = DeliverySnapshot(str(tmp_path)).summary()
+    assert summary["deliveries"] == 3
+    assert summary["statusCounts"]["delivered"] == 2
+    assert summary["statusCounts"]["booked"] == 1
+    assert summary["totalKmDelivered"] == 10.5
+    assert summary["spendByProvider"] == {"porter": 120.0, "dunzo": 90.0, "rapido": 70.0}
+    # a from deliveryCompletedAt, b from deliveries/b.delivered_at
+    assert summary["medianDeliveryMinutes"] == 40.0
+    assert summary["snapshotWatermark"] == _at(31).isoformat()
+    assert db.get_all_calls == [1]
+
+
+def test_refresh_picks_up_status_transitions(tmp_path, db):
+    refresh_snapshot(db, str(tmp_path), page_size=2)
+    db.reads = 0
+    assert refresh_snapshot(db, str(tmp_path))["changed"] == 0
+    assert db.reads == 0
+
+    _update_status(db, "c", "in_transit", 40)
+    assert refresh_snapshot(db, str(tmp_path))["changed"] == 1
+    assert DeliverySnapshot(str(tmp_path)).status_counts()["in_progress"] == 1
+
+    # c is delivered, e is booked
+    _update_status(db, "c", "delivered", 60)
+    _book(db, "e", 61, "porter", 1.5, 50)
+    db.reads = 0
+    result = refresh_snapshot(db, str(tmp_path), page_size=2)
+
+    assert result["changed"] == 2 and db.reads == 2
+    assert result["rows"] == 4
+    snapshot = DeliverySnapshot(str(tmp_path))
+    assert sorted(snapshot.donation_ids.tolist()) == ["a", "b", "c", "e"]
+    assert snapshot.total_km_delivered() == 12.5
+    assert snapshot.median_delivery_minutes() == 50.0
+    # Old generation files are removed after the manifest swap
+    assert len(list(tmp_path.glob("*.npy"))) == 9
+
+
+def test_dropped_delivery_leaves_the_snapshot(tmp_path, db):
+    refresh_snapshot(db, str(tmp_path))
+    db.put("donations/a", {"status": "available", "updatedAt": _at(70)})
+    assert refresh_snapshot(db, str(tmp_path))["rows"] == 2
+    assert DeliverySnapshot(str(tmp_path)).total_km_delivered() == 6.5
+
+
+def test_booking_time_filter(tmp_path, db):
+    refresh_snapshot(db, str(tmp_path))
+    snapshot = DeliverySnapshot(str(tmp_path))
+    since = _at(2).timestamp()
+    assert snapshot.status_counts(since=since) == {
+        "pending": 0, "booked": 1, "in_progress": 0, "delivered": 1, "cancelled": 0,
+    }
+    assert snapshot.total_km_delivered(until=since) == 4.0
+
+
+def test_reader_picks_up_new_generations(tmp_path, db):
+    reader = SnapshotReader(str(tmp_path))
+    assert reader.get() is None
+    refresh_snapshot(db, str(tmp_path))
+    first = reader.get()
+    assert len(first) == 3 and reader.get() is first
+
+    _book(db, "e", 70, "porter", 1.5, 50)
+    refresh_snapshot(db, str(tmp_path))
+    assert len(reader.get()) == 4
+    assert SnapshotReader(None).get() is None
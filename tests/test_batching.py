@@ -0,0 +1,131 @@
+# tests/test_batching.py
+# Trip batching: pickup sequencing, grouping and the pending-order query
+
+import itertools
+import math
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.delivery.batching import PendingOrder, TripBatcher, load_pending_orders, plan_pickup_sequence
+from app.delivery.distance_backends import build_chain
+from app.delivery.doc_cache import DocumentCache
+from app.delivery.services import PriceEstimationService
+
+NOW = datetime.now(timezone.utc)
+DROP = (12.9716, 77.5946)
+
+
+def _cost_matrix(rng, n):
+    """n pickups plus a drop as the last point, Euclidean with a one-way detour"""
+    points = [(rng.uniform(0, 10), rng.uniform(0, 10)) for _ in range(n + 1)]
+    cost = [[math.dist(points[i], points[j]) for j in range(n + 1)] for i in range(n)]
+    # Asymmetric like real road times
+    for i in range(n):
+        cost[i][(i + 1) % n] *= 1.3
+    return cost
+
+
+def _brute_force(cost):
+    n = len(cost)
+    best = min(itertools.permutations(range(n)),
+               key=lambda seq: sum(cost[a][b] for a, b in zip(seq, seq[1:])) + cost[seq[-1]][n])
+    return sum(cost[a][b] for a, b in zip(best, best[1:])) + cost[best[-1]][n]
+
+
+def test_single_pickup_goes_straight_to_drop():
+    assert plan_pickup_sequence([[0.0, 4.0]]) == ([0], 4.0)
+
+
+def test_planner_against_brute_force():
+    rng = random.Random(11)
+    optimal = total = 0
+    for n in range(2, 8):
+        for _ in range(40):
+            cost = _cost_matrix(rng, n)
+            sequence, sequence_cost = plan_pickup_sequence(cost)
+
+            assert sorted(sequence) == list(range(n))
+            path = sum(cost[a][b] for a, b in zip(sequence, sequence[1:])) + cost[sequence[-1]][n]
+            assert sequence_cost == pytest.approx(path)
+
+            best = _brute_force(cost)
+            assert sequence_cost >= best - 1e-9
+            assert sequence_cost <= best * 1.05
+            if n <= 3:
+                assert sequence_cost == pytest.approx(best)
+            optimal += sequence_cost <= best + 1e-9
+            total += 1
+    assert optimal >= 0.95 * total
+
+
+def _order(order_id, pickup, minutes_ago=5, ngo_id="ngo1", serving_capacity=10):
+    return PendingOrder(order_id=order_id, donation_id=f"don-{order_id}", ngo_id=ngo_id,
+                        pickup=pickup, dropoff=DROP, serving_capacity=serving_capacity,
+                        created_at=NOW - timedelta(minutes=minutes_ago))
+
+
+@pytest.fixture
+def batcher():
+    estimator = PriceEstimationService()
+    # Straight-line distances only, whatever the environment configures
+    estimator.calibration = None
+    estimator.distance_backends = build_chain(estimator, ("haversine",))
+    estimator.uses_google = False
+    return TripBatcher(estimator, window_minutes=30, max_stops=3, pickup_radius_km=2.0)
+
+
+def test_group_by_drop_window_and_radius(batcher):
+    orders = [
+        _order("a", (13.0300, 77.6200), minutes_ago=20),
+        _order("b", (13.0310, 77.6210), minutes_ago=15),
+        _order("c", (13.0320, 77.6190), minutes_ago=10),
+        _order("d", (13.0330, 77.6200), minutes_ago=8),     # over max_stops: starts the next trip
+        _order("far", (13.2000, 77.8000), minutes_ago=12),  # outside the pickup radius
+        _order("old", (13.0300, 77.6200), minutes_ago=45),  # outside the window
+        _order("other", (13.0300, 77.6200), ngo_id="ngo2"),
+    ]
+    groups = [[o.order_id for o in group] for group in batcher.group(orders)]
+    assert groups == [["a", "b", "c"]]
+
+
+def test_plan_proposes_a_cheaper_combined_trip(batcher):
+    group = [_order("a", (13.0300, 77.6200)), _order("b", (13.0310, 77.6210)), _order("c", (13.0320, 77.6190))]
+    proposal = batcher.plan(group)
+
+    assert proposal is not None
+    assert {o.order_id for o in proposal.orders} == {"a", "b", "c"}
+    assert proposal.combined_price < proposal.separate_price
+    body = proposal.to_dict()
+    assert body["bookingsSaved"] == 2 and body["savings"] > 0
+    assert [stop["orderId"] for stop in body["stops"]] == [o.order_id for o in proposal.orders]
+
+
+def test_plan_drops_stops_that_make_the_trip_too_long(batcher):
+    batcher.max_trip_minutes = 0
+    assert batcher.plan([_order("a", (13.03, 77.62)), _order("b", (13.031, 77.621))]) is None
+
+
+def test_load_pending_orders_filters_window_status_and_booked_donations(fake_db):
+    def doc(minutes_ago, status="pending", donation_id="don1", **extra):
+        return {"created_at": NOW - timedelta(minutes=minutes_ago), "status": status, "donation_id": donation_id,
+                "pickup_lat": 13.03, "pickup_lng": 77.62, "dropoff_lat": DROP[0], "dropoff_lng": DROP[1], **extra}
+
+    orders = {
+        "ok": doc(5),
+        "old": doc(90),
+        "booked": doc(5, status="booked"),
+        "no-coords": {**doc(5), "pickup_lat": None},
+        "booked-donation": doc(5, donation_id="don2"),
+        "gone-donation": doc(5, donation_id="don3"),
+    }
+    for order_id, data in orders.items():
+        fake_db.put(f"delivery_orders/{order_id}", data)
+    fake_db.put("donations/don1", {"status": "available"})
+    fake_db.put("donations/don2", {"delivery": {"status": "booked"}})
+    donations = DocumentCache(fake_db, "donations")
+
+    since = NOW - timedelta(minutes=30)
+    assert sorted(o.order_id for o in load_pending_orders(fake_db, since)) == ["booked-donation", "gone-donation", "ok"]
+    assert [o.order_id for o in load_pending_orders(fake_db, since, donations)] == ["ok"]
@@ -0,0 +1,28 @@
+# tests/test_calibration.py
+# Calibration table writes and the traffic-aware durations it is fitted on
+
+import json
+
+import pytest
+
+from app.delivery.calibration import save_calibration
+from app.delivery.services import PriceEstimationService
+
+
+def test_failed_save_keeps_the_old_table_and_no_temp_file(tmp_path):
+    path = tmp_path / "calibration.json"
+    save_calibration({"version": 1}, str(path))
+
+    with pytest.raises(TypeError):
+        save_calibration({"version": 2, "zones": {object()}}, str(path))
+    assert json.loads(path.read_text()) == {"version": 1}
+    assert [p.name for p in tmp_path.iterdir()] == ["calibration.json"]
+
+
+def test_matrix_element_prefers_duration_in_traffic():
+    element = {"status": "OK", "distance": {"value": 12000}, "duration": {"value": 1200}}
+    assert PriceEstimationService._parse_matrix_element(element) == (12.0, 30)
+
+    element["duration_in_traffic"] = {"value": 2400}
+    assert PriceEstimationService._parse_matrix_element(element) == (12.0, 50)
+    assert PriceEstimationService._parse_matrix_element({"status": "ZERO_RESULTS"}) is None
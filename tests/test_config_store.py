@@ -0,0 +1,102 @@
+# tests/test_config_store.py
+# Delivery config validation, change detection and the local snapshot
+
+import copy
+import json
+from datetime import datetime
+
+import pytest
+
+from app.delivery.config_store import (
+    BUILTIN_CONFIG_VERSION, DeliveryConfigStore, config_digest, validate_config
+)
+from app.delivery.models import DELIVERY_OPTIONS_SCHEMA, DELIVERY_PRICING_CONFIG
+
+
+@pytest.fixture
+def pricing():
+    return copy.deepcopy(DELIVERY_PRICING_CONFIG)
+
+
+@pytest.fixture
+def options():
+    return copy.deepcopy(DELIVERY_OPTIONS_SCHEMA)
+
+
+def test_builtin_config_is_valid():
+    validate_config(DELIVERY_PRICING_CONFIG, DELIVERY_OPTIONS_SCHEMA)
+
+
+@pytest.mark.parametrize("mutate, message", [
+    (lambda p, o: p.clear(), "pricing must be a non-empty map"),
+    (lambda p, o: o.clear(), "options must be a non-empty map"),
+    (lambda p, o: p[next(iter(p))].update(baseFare="40"), "baseFare must be a number"),
+    (lambda p, o: p[next(iter(p))].update(maxFare=True), "maxFare must be a number"),
+    (lambda p, o: p[next(iter(p))].pop("perKmRate"), "perKmRate must be a number"),
+    (lambda p, o: o[next(iter(o))].pop("name"), "name must be a string"),
+])
+def test_invalid_payloads_are_rejected(pricing, options, mutate, message):
+    mutate(pricing, options)
+    with pytest.raises(ValueError, match=message):
+        validate_config(pricing, options)
+
+
+def test_digest_ignores_key_order(pricing, options):
+    reordered = dict(reversed(list(pricing.items())))
+    assert config_digest(pricing, options) == config_digest(reordered, options)
+
+
+def test_apply_swaps_and_notifies(tmp_path, pricing, options):
+    store = DeliveryConfigStore(snapshot_path=str(tmp_path / "config.json"))
+    seen = []
+    store.subscribe(seen.append)
+    assert store.current.version == BUILTIN_CONFIG_VERSION
+
+    assert store.apply("v1", pricing, options)
+    assert not store.apply("v1", pricing, options)
+    assert [config.version for config in seen] == [BUILTIN_CONFIG_VERSION, "v1"]
+
+
+def test_invalid_payload_keeps_current(tmp_path, pricing, options):
+    store = DeliveryConfigStore(snapshot_path=str(tmp_path / "config.json"))
+    pricing[next(iter(pricing))]["baseFare"] = None
+    assert not store.apply("bad", pricing, options)
+    assert store.current.version == BUILTIN_CONFIG_VERSION
+
+
+def test_content_change_without_version_bump_is_applied(tmp_path, pricing, options):
+    store = DeliveryConfigStore(snapshot_path=str(tmp_path / "config.json"))
+    assert store.apply("v1", pricing, options)
+
+    edited = copy.deepcopy(pricing)
+    provider = next(iter(edited))
+    edited[provider]["baseFare"] += 5
+    assert store.apply("v1", edited, options)
+    assert store.current.pricing[provider]["baseFare"] == pricing[provider]["baseFare"] + 5
+
+
+def test_snapshot_round_trip(tmp_path, pricing, options):
+    path = tmp_path / "config.json"
+    DeliveryConfigStore(snapshot_path=str(path)).apply("v7", pricing, options)
+
+    restarted = DeliveryConfigStore(snapshot_path=str(path))
+    assert restarted.current.version == "v7"
+    assert restarted.current.pricing == pricing
+    # Re-delivering the same document after a restart is not a change
+    assert not restarted.apply("v7", pricing, options)
+
+
+def test_corrupt_snapshot_falls_back_to_builtin(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"version": "v1", "pricing": {}, "options": {}}))
+    assert DeliveryConfigStore(snapshot_path=str(path)).current.version == BUILTIN_CONFIG_VERSION
+
+
+def test_unserializable_snapshot_is_skipped(tmp_path, pricing, options):
+    path = tmp_path / "config.json"
+    pricing[next(iter(pricing))]["lastUpdated"] = datetime(2026, 1, 1)
+    store = DeliveryConfigStore(snapshot_path=str(path))
+
+    assert store.apply("v1", pricing, options)
+    assert store.current.version == "v1"
+    assert list(tmp_path.iterdir()) == []
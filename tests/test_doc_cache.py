@@ -0,0 +1,150 @@
+# tests/test_doc_cache.py
+# Read-through document cache: TTLs, LRU, listener lifecycle, batched misses
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.delivery import doc_cache
+from app.delivery.doc_cache import DocumentCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(doc_cache, "time", SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+@pytest.fixture
+def db(fake_db):
+    for i in range(250):
+        fake_db.put(f"deliveries/d{i:03d}", {"status": "pending", "n": i})
+    fake_db.reads = 0
+    return fake_db
+
+
+def _watched(db, doc_id, **kwargs):
+    """A cache whose entry for doc_id has a listener (one miss, one hit)"""
+    cache = DocumentCache(db, "deliveries", watch_after_hits=1, **kwargs)
+    cache.get(doc_id)
+    cache.get(doc_id)
+    assert cache.stats()["watches"] == 1 and db.active_watches() == 1
+    return cache
+
+
+def test_entries_expire_after_ttl(db, clock):
+    cache = DocumentCache(db, "deliveries", ttl_seconds=5, watch_after_hits=100)
+    assert cache.get("d001")["n"] == 1
+    assert cache.get("missing") is None
+    clock.value += 4.9
+    cache.get("d001"), cache.get("missing")
+    assert db.reads == 2
+
+    db.document("deliveries/d001").update({"n": 99})
+    clock.value += 0.2
+    assert cache.get("d001")["n"] == 99
+    assert db.reads == 3
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 3
+
+
+def test_lru_eviction_detaches_the_listener(db, clock):
+    cache = _watched(db, "d000", max_entries=3)
+    cache.get("d001")
+    cache.get("d002")
+    cache.get("d000")                 # most recently used again
+    cache.get("d003")                 # evicts d001, not the watched d000
+    assert db.active_watches() == 1
+
+    cache.get("d004")
+    cache.get("d005")                 # d000 falls off the end
+    cache.get("d006")
+    stats = cache.stats()
+    assert stats["size"] == 3 and stats["evictions"] == 4
+    assert stats["watches"] == 0 and db.active_watches() == 0
+
+
+def test_invalidate_while_the_listener_is_attaching(db, clock, monkeypatch):
+    cache = DocumentCache(db, "deliveries", watch_after_hits=1)
+    document_type = type(db.document("deliveries/d001"))
+    on_snapshot = document_type.on_snapshot
+
+    def attach_after_invalidate(ref, callback):
+        # A local write invalidates the entry before on_snapshot returns
+        cache.invalidate(ref.id)
+        return on_snapshot(ref, callback)
+
+    monkeypatch.setattr(document_type, "on_snapshot", attach_after_invalidate)
+    cache.get("d001")
+    cache.get("d001")
+    assert cache.stats()["watches"] == 0 and cache.stats()["invalidations"] == 1
+    assert db.active_watches() == 0
+
+    # The next read goes to Firestore again
+    reads = db.reads
+    cache.get("d001")
+    assert db.reads == reads + 1
+
+
+def test_listener_update_beats_a_stale_read(db, clock, monkeypatch):
+    cache = _watched(db, "d001", watched_ttl_seconds=60)
+    clock.value += 61
+    document_type = type(db.document("deliveries/d001"))
+    get = document_type.get
+
+    def racing_get(ref):
+        stale = get(ref)
+        # The listener delivers a newer version before the read returns
+        db.document(ref.path).update({"status": "delivered"})
+        return stale
+
+    monkeypatch.setattr(document_type, "get", racing_get)
+    assert cache.get("d001")["status"] == "pending"
+    monkeypatch.setattr(document_type, "get", get)
+
+    reads = db.reads
+    assert cache.get("d001")["status"] == "delivered"
+    assert db.reads == reads
+
+
+def test_get_many_chunks_misses_into_parallel_get_all(db, clock):
+    cache = DocumentCache(db, "deliveries")
+    cache.get("d000")
+    ids = [f"d{i:03d}" for i in range(250)] + ["d000", "missing"]
+    found = cache.get_many(ids)
+
+    assert len(found) == 251 and found["missing"] is None
+    assert all(found[f"d{i:03d}"]["n"] == i for i in range(250))
+    # d000 was already cached; duplicates are looked up once
+    assert sorted(db.get_all_calls) == [50, 100, 100]
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 251
+
+    # Everything is cached now
+    cache.get_many(ids)
+    assert len(db.get_all_calls) == 3
+
+
+def test_get_many_caps_concurrent_get_all_calls(db, clock, monkeypatch):
+    cache = DocumentCache(db, "deliveries")
+    cache.GET_ALL_CHUNK = 10
+    get_all = db.get_all
+    lock = threading.Lock()
+    running = SimpleNamespace(now=0, peak=0)
+
+    def slow_get_all(refs):
+        with lock:
+            running.now += 1
+            running.peak = max(running.peak, running.now)
+        time.sleep(0.05)
+        try:
+            return get_all(refs)
+        finally:
+            with lock:
+                running.now -= 1
+
+    monkeypatch.setattr(db, "get_all", slow_get_all)
+    found = cache.get_many([f"d{i:03d}" for i in range(100)])
+    assert len(found) == 100 and len(db.get_all_calls) == 10
+    assert 2 <= running.peak <= DocumentCache.GET_ALL_PARALLELISM
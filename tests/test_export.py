@@ -0,0 +1,113 @@
+# tests/test_export.py
+# Streaming export: cursors, paging, NDJSON/CSV rendering, resume
+
+import csv
+import io
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from app.delivery.export import (
+    decode_cursor, encode_cursor, export_lines, iter_documents, last_exported_id
+)
+
+
+IDS = [f"d{i:03d}" for i in range(25)]
+
+
+def _seed(fake_db, docs):
+    for doc_id, data in docs.items():
+        fake_db.put(f"deliveries/{doc_id}", data)
+    return fake_db
+
+
+@pytest.fixture
+def db(fake_db):
+    return _seed(fake_db, {doc_id: {"n": i, "status": "delivered"} for i, doc_id in enumerate(IDS)})
+
+
+@pytest.mark.parametrize("doc_id", ["d001", "abc/def", "üñí-códe", "x" * 300, "a+b=c?"])
+def test_cursor_round_trip(doc_id):
+    token = encode_cursor(doc_id)
+    assert "=" not in token and "/" not in token and "+" not in token
+    assert decode_cursor(token) == doc_id
+
+
+@pytest.mark.parametrize("token", ["***", "a", "_w"])
+def test_invalid_cursor(token):
+    with pytest.raises(ValueError):
+        decode_cursor(token)
+
+
+def test_iter_documents_pages_in_id_order(db):
+    rows = list(iter_documents(db, "deliveries", page_size=10))
+    assert [row["_id"] for row in rows] == IDS
+    # Three pages; the short last page ends the scan without a fourth query
+    assert db.queries == 3
+
+
+def test_iter_documents_resumes_after_cursor(db):
+    rows = list(iter_documents(db, "deliveries", after=decode_cursor(encode_cursor("d019")), page_size=4))
+    assert [row["_id"] for row in rows] == [f"d{i:03d}" for i in range(20, 25)]
+
+
+def test_ndjson_trailer_pages_through_everything(db):
+    seen, cursor = [], None
+    while True:
+        after = decode_cursor(cursor) if cursor else None
+        lines = list(export_lines(db, "deliveries", after=after, page_size=4, limit=10, cursor_trailer=True))
+        records = [json.loads(line) for line in lines]
+        seen += [record["_id"] for record in records[:-1]]
+        cursor = records[-1]["_nextCursor"]
+        if cursor is None:
+            break
+    assert seen == IDS
+
+
+def test_ndjson_without_trailer_is_rows_only(db):
+    lines = list(export_lines(db, "deliveries", limit=3))
+    assert [json.loads(line)["_id"] for line in lines] == ["d000", "d001", "d002"]
+
+
+def test_ndjson_encodes_firestore_types(fake_db):
+    stamp = datetime(2026, 3, 1, 9, 30, 0, 123456, tzinfo=timezone.utc)
+    db = _seed(fake_db, {"a": {"booked_at": stamp, "blob": b"\x00\x01"}})
+    (line,) = export_lines(db, "deliveries")
+    assert json.loads(line) == {"_id": "a", "booked_at": stamp.isoformat(), "blob": "AAE="}
+
+
+def test_csv_columns_and_nested_values(fake_db):
+    db = _seed(fake_db, {"a": {"status": "booked", "cost": 42.5, "route": {"km": 3}}, "b": {"status": "pending"}})
+    text = "".join(export_lines(db, "deliveries", fmt="csv"))
+    rows = list(csv.reader(io.StringIO(text)))
+    assert rows[0] == ["_id", "cost", "route", "status"]
+    assert rows[1] == ["a", "42.5", '{"km":3}', "booked"]
+    assert rows[2] == ["b", "", "", "pending"]
+
+
+def test_csv_empty_collection_keeps_pinned_header(fake_db):
+    text = "".join(export_lines(fake_db, "deliveries", fmt="csv", fields=["status"]))
+    assert text.strip() == "_id,status"
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"collection": "users"},
+    {"collection": "deliveries", "fmt": "xml"},
+    {"collection": "deliveries", "page_size": 0},
+    {"collection": "deliveries", "limit": 0},
+    {"collection": "deliveries", "limit": -5},
+])
+def test_export_lines_validates_arguments(db, kwargs):
+    with pytest.raises(ValueError):
+        export_lines(db, **kwargs)
+
+
+def test_last_exported_id_truncates_partial_row(tmp_path, db):
+    path = tmp_path / "deliveries.ndjson"
+    lines = list(export_lines(db, "deliveries", limit=5))
+    path.write_text("".join(lines) + '{"_id":"d005","n"', encoding="utf-8")
+
+    assert last_exported_id(str(path)) == "d004"
+    assert path.read_text(encoding="utf-8") == "".join(lines)
+    assert last_exported_id(str(tmp_path / "missing.ndjson")) is None
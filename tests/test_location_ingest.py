@@ -0,0 +1,90 @@
+# tests/test_location_ingest.py
+# Driver location buffer: timestamp normalization, flush cadence, bad documents
+
+import os
+import time
+
+import pytest
+
+from app.delivery.location_ingest import (
+    MAX_FLUSH_FAILURES, DriverFix, LocationIngestBuffer, distance_m, normalize_recorded_at
+)
+
+
+def _deliveries(fake_db, *delivery_ids):
+    for delivery_id in delivery_ids:
+        fake_db.put(f"deliveries/{delivery_id}", {"status": "booked"})
+    return fake_db
+
+
+def _buffer(db, **kwargs):
+    buffer = LocationIngestBuffer(db, **kwargs)
+    # Flush by hand only: pretend this process's flusher is already running
+    buffer._pid = os.getpid()
+    return buffer
+
+
+def test_normalize_recorded_at():
+    now = 1_760_000_000.0
+    assert normalize_recorded_at(None, now) == now
+    assert normalize_recorded_at(now - 5, now) == now - 5
+    assert normalize_recorded_at((now - 5) * 1000, now) == pytest.approx(now - 5)
+    assert normalize_recorded_at(now + 3600, now) == now
+
+
+def test_distance_m():
+    a = DriverFix(12.9716, 77.5946, 0)
+    assert distance_m(a, a) == 0
+    # 0.001° of latitude is ~111 m
+    assert distance_m(a, DriverFix(12.9726, 77.5946, 0)) == pytest.approx(111.2, abs=0.5)
+
+
+def test_only_latest_fix_is_written(fake_db):
+    db = _deliveries(fake_db, "d1")
+    buffer = _buffer(db)
+    now = time.time()
+    buffer.ingest("d1", 12.0, 77.0, now - 3)
+    buffer.ingest("d1", 12.1, 77.1, (now - 1) * 1000)
+    buffer.ingest("d1", 12.2, 77.2, now - 2)          # out of order: dropped
+
+    assert buffer.flush(force=True) == 1
+    assert db.data("deliveries/d1")["driver_lat"] == 12.1
+    assert buffer.stats()["stalePings"] == 1
+    # Nothing new since the last write
+    assert buffer.flush(force=True) == 0
+
+
+def test_cadence_and_move_threshold(fake_db):
+    db = _deliveries(fake_db, "d1")
+    buffer = _buffer(db, flush_interval_seconds=60, move_threshold_m=150, min_write_interval=0)
+    buffer.ingest("d1", 12.9716, 77.5946)
+    assert buffer.flush() == 1
+
+    buffer.ingest("d1", 12.9717, 77.5946)              # ~11 m: waits for the cadence
+    assert buffer.flush() == 0
+    buffer.ingest("d1", 12.9736, 77.5946)              # ~220 m: due now
+    assert buffer.flush() == 1
+
+
+def test_bad_document_only_fails_its_own_track(fake_db):
+    good = [f"d{i}" for i in range(20)]
+    db = _deliveries(fake_db, *good)
+    buffer = _buffer(db)
+    for delivery_id in good + ["ghost"]:
+        buffer.ingest(delivery_id, 12.9, 77.6)
+
+    assert buffer.flush(force=True) == 20
+    assert all("driver_lat" in db.data(f"deliveries/{d}") for d in good)
+    assert buffer.stats()["failedWrites"] == 1
+    assert buffer.latest("ghost") is not None
+
+
+def test_track_is_dropped_after_repeated_failures(fake_db):
+    buffer = _buffer(fake_db)
+    buffer.ingest("ghost", 12.9, 77.6)
+    for _ in range(MAX_FLUSH_FAILURES):
+        assert buffer.flush(force=True) == 0
+
+    assert buffer.latest("ghost") is None
+    assert buffer.stats()["dropped"] == 1
+    assert buffer.flush(force=True) == 0
@@ -0,0 +1,44 @@
+# tests/test_ngo_index.py
+# NGO grid index: ring search and the sparse-grid linear scan agree with brute force
+
+import random
+
+import pytest
+
+from app.delivery.geo import haversine_km
+from app.delivery.ngo_index import NgoIndex, NgoPoint
+
+
+def _brute_force(points, lat, lng, k, max_distance_km=None):
+    found = sorted((haversine_km(lat, lng, p.lat, p.lng), p) for p in points)
+    if max_distance_km is not None:
+        found = [item for item in found if item[0] <= max_distance_km]
+    return found[:k]
+
+
+@pytest.fixture
+def points():
+    rng = random.Random(7)
+    # Dense around Bengaluru plus a few outliers across India
+    dense = [NgoPoint(f"b{i}", "", 12.9 + rng.random() * 0.3, 77.5 + rng.random() * 0.3) for i in range(400)]
+    far = [NgoPoint(f"f{i}", "", 8 + rng.random() * 20, 70 + rng.random() * 20) for i in range(10)]
+    return dense + far
+
+
+@pytest.mark.parametrize("max_distance_km", [None, 3.0, 100.0])
+def test_nearest_matches_brute_force(points, max_distance_km):
+    index = NgoIndex(cell_degrees=0.01)
+    for point in points:
+        index.upsert(point)
+    for lat, lng in [(13.0, 77.6), (12.95, 77.52), (20.0, 80.0)]:
+        expected = _brute_force(points, lat, lng, 8, max_distance_km)
+        assert index.nearest(lat, lng, 8, max_distance_km) == expected
+
+
+def test_sparse_grid_scans_points_instead_of_rings(points, monkeypatch):
+    index = NgoIndex(cell_degrees=0.01)
+    for point in points[-10:]:
+        index.upsert(point)
+    # Ten outliers hundreds of km apart: ring search would walk ~10^6 empty cells
+    monkeypatch.setattr(NgoIndex, "_ring", lambda *args: pytest.fail("ring search on a sparse grid"))
+    assert index.nearest(13.0, 77.6, 3) == _brute_force(points[-10:], 13.0, 77.6, 3)
@@ -0,0 +1,82 @@
+# tests/test_pricing.py
+# Compiled pricing table and bulk engine vs the per-provider dict formula
+
+import itertools
+
+import numpy as np
+import pytest
+
+from app.delivery.bulk_pricing import BulkPricingEngine, food_multiplier
+from app.delivery.models import DELIVERY_PRICING_CONFIG
+from app.delivery.pricing import compile_pricing_table
+from app.delivery.services import PriceEstimationService
+
+DISTANCES_KM = [0, 0.4, 1, 2.35, 5, 7.77, 12.5, 30, 120, 1000]
+SERVING_CAPACITIES = [0, 1, 20, 21, 30, 31, 50, 51, 400]
+
+# Only the optional fields' defaults are exercised here
+SPARSE_CONFIG = {
+    "cheap": {"baseFare": 10, "perKmRate": 3},
+    "capped": {"baseFare": 40, "perKmRate": 25, "minFare": 60, "maxFare": 200},
+}
+
+
+def reference_price(config, distance_km, serving_capacity):
+    """The original dict-walking formula from calculate_estimated_price"""
+    base_fare = config.get("baseFare", 0)
+    per_km_rate = config.get("perKmRate", 0)
+    min_fare = config.get("minFare", base_fare)
+    max_fare = config.get("maxFare", 10000)
+    price = base_fare + (distance_km * per_km_rate)
+    if serving_capacity > 0:
+        price *= PriceEstimationService.calculate_food_multiplier(serving_capacity)
+    return round(max(min_fare, min(price, max_fare)), 2)
+
+
+@pytest.mark.parametrize("pricing_config", [DELIVERY_PRICING_CONFIG, SPARSE_CONFIG])
+def test_compiled_table_matches_dict_formula(pricing_config):
+    table = compile_pricing_table(pricing_config, "v1")
+    assert [rate.provider for rate in table.rates] == list(pricing_config)
+
+    for provider, config in pricing_config.items():
+        rate = table.by_provider[provider]
+        for distance_km, capacity in itertools.product(DISTANCES_KM, SERVING_CAPACITIES):
+            multiplier = PriceEstimationService.calculate_food_multiplier(capacity) if capacity > 0 else None
+            assert rate.price(distance_km, multiplier) == reference_price(config, distance_km, capacity)
+
+
+def test_service_quotes_through_the_table():
+    service = PriceEstimationService()
+    service.load_pricing(SPARSE_CONFIG, "v2")
+    assert service.pricing_table.version == "v2"
+    assert service.calculate_estimated_price("capped", 3.2, 35) == reference_price(SPARSE_CONFIG["capped"], 3.2, 35)
+    assert service.calculate_estimated_price("missing", 3.2) == 0
+
+
+def test_food_multiplier_vectorized_matches_scalar():
+    capacities = np.array(SERVING_CAPACITIES)
+    expected = [PriceEstimationService.calculate_food_multiplier(c) for c in SERVING_CAPACITIES]
+    assert food_multiplier(capacities).tolist() == expected
+
+
+@pytest.mark.parametrize("pricing_config", [DELIVERY_PRICING_CONFIG, SPARSE_CONFIG])
+def test_bulk_engine_matches_dict_formula(pricing_config):
+    engine = BulkPricingEngine(compile_pricing_table(pricing_config, "v1"))
+    pairs = list(itertools.product(DISTANCES_KM, SERVING_CAPACITIES))
+    distances = np.array([d for d, _ in pairs])
+    capacities = np.array([c for _, c in pairs])
+
+    prices = engine.price_matrix(distances, capacities)
+    assert prices.shape == (len(engine.providers), len(pairs))
+    for row, provider in zip(prices, engine.providers):
+        expected = [reference_price(pricing_config[provider], d, c) for d, c in pairs]
+        np.testing.assert_allclose(row, expected, atol=0.01)
+
+
+def test_bulk_engine_follows_a_reload():
+    service = PriceEstimationService()
+    first = service.bulk_engine
+    assert service.bulk_engine is first
+    service.load_pricing(SPARSE_CONFIG, "v2")
+    assert service.bulk_engine is not first
+    assert service.bulk_engine.providers == list(SPARSE_CONFIG)
@@ -0,0 +1,128 @@
+# tests/test_road_graph.py
+# Local road graph: contraction-hierarchy queries vs plain Dijkstra
+
+import random
+
+import numpy as np
+import pytest
+
+from app.delivery.road_graph import RoadGraph, build_road_graph, write_road_graph
+
+GRID = 12
+SPACING = 0.002
+ORIGIN = (12.90, 77.55)
+
+
+def _city(seed=3):
+    """Perturbed street grid with arterials, one-way streets and a few missing blocks"""
+    rng = np.random.default_rng(seed)
+    rows, cols = np.divmod(np.arange(GRID * GRID), GRID)
+    lat = ORIGIN[0] + rows * SPACING + rng.normal(0, 0.0002, rows.size)
+    lng = ORIGIN[1] + cols * SPACING + rng.normal(0, 0.0002, cols.size)
+
+    ids = np.arange(GRID * GRID).reshape(GRID, GRID)
+    pairs = np.concatenate([
+        np.stack([ids[:, :-1].ravel(), ids[:, 1:].ravel()], axis=1),
+        np.stack([ids[:-1, :].ravel(), ids[1:, :].ravel()], axis=1),
+    ])
+    pairs = pairs[rng.random(len(pairs)) > 0.08]
+    src = np.concatenate([pairs[:, 0], pairs[:, 1]])
+    dst = np.concatenate([pairs[:, 1], pairs[:, 0]])
+    # Drop one direction of ~15% of streets to make them one-way
+    keep = rng.random(len(src)) > 0.15
+    src, dst = src[keep], dst[keep]
+
+    length_m = np.hypot((lat[src] - lat[dst]) * 111_320, (lng[src] - lng[dst]) * 108_500)
+    arterial = (rows[src] % 4 == 0) & (rows[src] == rows[dst])
+    time_s = length_m / np.where(arterial, 40 / 3.6, 20 / 3.6)
+    return lat, lng, src, dst, time_s, length_m
+
+
+@pytest.fixture(scope="module")
+def graphs(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("road_graph")
+    city = _city()
+    loaded = {}
+    for name, contract in (("ch", True), ("dijkstra", False)):
+        path = str(directory / f"{name}.bin")
+        write_road_graph(path, *city, contract=contract)
+        loaded[name] = RoadGraph(path)
+    return loaded
+
+
+def test_files_share_node_numbering(graphs):
+    ch, plain = graphs["ch"], graphs["dijkstra"]
+    assert ch.contracted and not plain.contracted
+    assert ch.node_count == plain.node_count == GRID * GRID
+    assert ch.edge_count == plain.edge_count
+    np.testing.assert_array_equal(ch.lat, plain.lat)
+
+
+def test_ch_query_matches_dijkstra_on_every_pair(graphs):
+    ch, plain = graphs["ch"], graphs["dijkstra"]
+    nodes = range(ch.node_count)
+    reachable = 0
+    for source in nodes:
+        expected = plain._shortest_paths(source, set(nodes))
+        for target in nodes:
+            found = ch._ch_query(source, target)
+            if target not in expected:
+                assert found is None
+                continue
+            reachable += 1
+            assert found is not None, (source, target)
+            # Edge weights are float32; shortcuts sum them in a different order
+            assert found[0] == pytest.approx(expected[target][0], rel=1e-5)
+            assert found[1] == pytest.approx(expected[target][1], rel=1e-5)
+    assert reachable > 0.9 * ch.node_count ** 2
+
+
+def test_route_and_matrix_agree_across_backends(graphs):
+    rng = random.Random(5)
+    lat_hi, lng_hi = ORIGIN[0] + GRID * SPACING, ORIGIN[1] + GRID * SPACING
+    points = [(rng.uniform(ORIGIN[0], lat_hi), rng.uniform(ORIGIN[1], lng_hi)) for _ in range(12)]
+    origins, destinations = points[:4], points[4:]
+
+    matrices = {name: graph.route_matrix(origins, destinations) for name, graph in graphs.items()}
+    assert matrices["ch"] == matrices["dijkstra"]
+    for i, origin in enumerate(origins):
+        for j, destination in enumerate(destinations):
+            assert graphs["ch"].route(*origin, *destination) == matrices["ch"][i][j]
+
+
+def test_points_off_the_graph_do_not_route(graphs):
+    graph = graphs["ch"]
+    assert graph.snap(0.0, 0.0) is None
+    assert graph.route(0.0, 0.0, *ORIGIN) is None
+    assert graph.route_matrix([(0.0, 0.0)], [ORIGIN]) == [[None]]
+    assert graph.stats()["unsnapped"] >= 2
+
+
+OSM = """<?xml version="1.0" encoding="UTF-8"?>
+<osm version="0.6">
+  <node id="1" lat="12.9000" lon="77.5500"/>
+  <node id="2" lat="12.9000" lon="77.5550"/>
+  <node id="3" lat="12.9050" lon="77.5550"/>
+  <node id="4" lat="12.9050" lon="77.5500"/>
+  <way id="10"><nd ref="1"/><nd ref="2"/><nd ref="3"/><tag k="highway" v="residential"/><tag k="oneway" v="yes"/></way>
+  <way id="11"><nd ref="3"/><nd ref="4"/><nd ref="1"/><tag k="highway" v="primary"/></way>
+  <way id="12"><nd ref="1"/><nd ref="3"/><tag k="highway" v="footway"/></way>
+</osm>
+"""
+
+
+@pytest.mark.parametrize("contract", [True, False])
+def test_build_from_osm_respects_oneway(tmp_path, contract):
+    osm_path = tmp_path / "city.osm"
+    osm_path.write_text(OSM, encoding="utf-8")
+    path = str(tmp_path / "city.bin")
+
+    # Footway dropped; 1->2->3 one-way (2 edges), 3->4->1 both ways (4 edges)
+    assert build_road_graph(str(osm_path), path, contract=contract) == (4, 6)
+    graph = RoadGraph(path)
+    forward = graph.route(12.9000, 77.5500, 12.9050, 77.5550)
+    backward = graph.route(12.9050, 77.5550, 12.9000, 77.5500)
+    assert forward is not None and backward is not None
+    # Backward must go round via node 4 on the primary road either way
+    assert forward[0] == pytest.approx(backward[0], abs=0.02)
+    assert graph.route(12.9000, 77.5550, 12.9000, 77.5500)[0] > 1.0
@@ -0,0 +1,103 @@
+# tests/test_singleflight.py
+# Single-flight: in-process collapsing and the bounded cross-worker lock
+
+import os
+import threading
+import time
+
+import pytest
+
+from app.delivery.singleflight import SingleFlight
+
+
+def _run_concurrently(flight, key, fn, callers):
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(flight.do(key, fn))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def test_concurrent_callers_share_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return "route"
+
+    threads, results, errors = _run_concurrently(flight, "k", fetch, 8)
+    while flight.stats()["shared"] < 7:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert results == ["route"] * 8 and not errors
+    assert flight.stats()["leaders"] == 1
+    assert flight.stats()["inFlight"] == 0
+
+
+def test_followers_see_the_leaders_error():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fetch():
+        release.wait(5)
+        raise RuntimeError("quota")
+
+    threads, results, errors = _run_concurrently(flight, "k", fetch, 4)
+    while flight.stats()["shared"] < 3:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert not results
+    assert len(errors) == 4 and all(str(e) == "quota" for e in errors)
+
+
+def test_distinct_keys_run_independently():
+    flight = SingleFlight()
+    assert flight.do("a", lambda: 1) == 1
+    assert flight.do("b", lambda: 2) == 2
+    assert flight.stats()["leaders"] == 2
+
+
+@pytest.mark.skipif(os.name != "posix", reason="flock is POSIX only")
+def test_cross_worker_wait_is_bounded(tmp_path):
+    # Two instances stand in for two workers sharing a lock directory
+    hung = SingleFlight(lock_dir=str(tmp_path), lock_wait_seconds=0.1)
+    other = SingleFlight(lock_dir=str(tmp_path), lock_wait_seconds=0.1)
+    entered, release = threading.Event(), threading.Event()
+
+    def stuck():
+        entered.set()
+        release.wait(5)
+        return "late"
+
+    holder = threading.Thread(target=hung.do, args=("k", stuck))
+    holder.start()
+    entered.wait(5)
+
+    started = time.monotonic()
+    assert other.do("k", lambda: "direct") == "direct"
+    assert time.monotonic() - started < 2
+    assert other.stats()["lockTimeouts"] == 1
+    # Another key is not held up at all
+    assert other.do("k2", lambda: "free") == "free"
+    assert other.stats()["lockTimeouts"] == 1
+
+    release.set()
+    holder.join()
+    assert os.listdir(tmp_path) == []
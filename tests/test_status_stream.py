@@ -0,0 +1,109 @@
+# tests/test_status_stream.py
+# SSE status fan-out: one listener per donation, snapshot then deltas
+
+import json
+
+import pytest
+
+from app.delivery.status_stream import StatusBroadcaster
+
+PATH = "donations/d1"
+
+
+def _payload(donation_id, data):
+    return {"donationId": donation_id, "deliveryStatus": data.get("deliveryStatus")}
+
+
+def _frame(stream):
+    """(event, data) of the next frame, or None on a keep-alive"""
+    frame = next(stream)
+    if frame.startswith(":"):
+        return None
+    event, data = frame.strip().split("\n")
+    return event[len("event: "):], json.loads(data[len("data: "):])
+
+
+@pytest.fixture
+def broadcaster(fake_db):
+    fake_db.put(PATH, {"deliveryStatus": "pending", "notes": ""})
+    return StatusBroadcaster(fake_db, _payload, heartbeat_seconds=0.01)
+
+
+def _connect(broadcaster):
+    stream = broadcaster.stream("d1")
+    assert next(stream) == "retry: 5000\n\n"
+    return stream
+
+
+def test_one_listener_fans_out_to_every_viewer(fake_db, broadcaster):
+    first, second = _connect(broadcaster), _connect(broadcaster)
+    assert broadcaster.stats() == {"listeners": 1, "viewers": 2}
+    assert fake_db.active_watches() == 1
+
+    fake_db.notify(PATH)
+    snapshot = ("snapshot", {"donationId": "d1", "deliveryStatus": "pending"})
+    assert _frame(first) == _frame(second) == snapshot
+
+    # A late viewer gets the cached snapshot without a second listener
+    third = _connect(broadcaster)
+    assert _frame(third) == snapshot
+    assert fake_db.active_watches() == 1
+
+    # Unrelated fields change nothing; a status change is one delta each
+    fake_db.document(PATH).update({"notes": "ring twice"})
+    fake_db.document(PATH).update({"deliveryStatus": "picked_up"})
+    for stream in (first, second, third):
+        assert _frame(stream) == ("delta", {"deliveryStatus": "picked_up"})
+        assert _frame(stream) is None
+
+    for stream in (first, second, third):
+        stream.close()
+    assert broadcaster.stats() == {"listeners": 0, "viewers": 0}
+    assert fake_db.active_watches() == 0
+
+
+def test_deleted_donation_closes_every_viewer(fake_db, broadcaster):
+    first, second = _connect(broadcaster), _connect(broadcaster)
+    fake_db.put(PATH, None)
+    for stream in (first, second):
+        assert _frame(stream) == ("error", {"error": "Donation not found"})
+        assert list(stream) == []
+    assert broadcaster.stats()["listeners"] == 0
+
+
+def test_failed_attach_leaves_no_topic_behind(fake_db, broadcaster):
+    fake_db.watch_error = RuntimeError("listen quota exceeded")
+    with pytest.raises(RuntimeError):
+        _connect(broadcaster)
+    assert broadcaster.stats() == {"listeners": 0, "viewers": 0}
+
+    # The next viewer attaches a fresh listener instead of joining a dead topic
+    fake_db.watch_error = None
+    stream = _connect(broadcaster)
+    assert fake_db.active_watches() == 1
+    fake_db.notify(PATH)
+    assert _frame(stream)[0] == "snapshot"
+    stream.close()
+
+
+def test_viewer_joining_a_failing_attach_is_closed(fake_db, broadcaster, monkeypatch):
+    joined = []
+    on_snapshot = type(fake_db.document(PATH)).on_snapshot
+
+    def attach_then_fail(ref, callback):
+        # A second viewer connects while the first one's listener is attaching
+        joined.append(_connect(broadcaster))
+        raise RuntimeError("listen quota exceeded")
+
+    monkeypatch.setattr(type(fake_db.document(PATH)), "on_snapshot", attach_then_fail)
+    with pytest.raises(RuntimeError):
+        _connect(broadcaster)
+
+    waiting = joined[0]
+    assert _frame(waiting) == ("error", {"error": "Status stream unavailable"})
+    assert list(waiting) == []
+    assert broadcaster.stats() == {"listeners": 0, "viewers": 0}
+
+    monkeypatch.setattr(type(fake_db.document(PATH)), "on_snapshot", on_snapshot)
+    _connect(broadcaster).close()
+    assert fake_db.active_watches() == 0
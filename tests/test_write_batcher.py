@@ -0,0 +1,108 @@
+# tests/test_write_batcher.py
+# Coalesced Firestore writes: grouping, bisection on failure, timeouts
+
+import threading
+import time
+
+import pytest
+
+from app.delivery.write_batcher import WriteCoalescer, apply_ops, delete_op, set_op, update_op
+
+
+def _commit_concurrently(coalescer, requests):
+    errors = {}
+
+    def run(name, ops):
+        try:
+            coalescer.commit(ops)
+        except Exception as e:
+            errors[name] = e
+
+    threads = [threading.Thread(target=run, args=item) for item in requests.items()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+def test_apply_ops_rejects_unknown_kind(fake_db):
+    ref = fake_db.document("orders/1")
+    with pytest.raises(ValueError):
+        apply_ops(fake_db.batch(), [set_op(ref, {}), set_op(ref, {})._replace(kind="upsert")])
+
+
+def test_inline_mode_commits_each_request(fake_db):
+    ref = fake_db.document
+    coalescer = WriteCoalescer(fake_db, window_seconds=0)
+    coalescer.commit([set_op(ref("orders/1"), {"status": "pending"}), set_op(ref("donations/1"), {"x": 1})])
+    coalescer.commit([delete_op(ref("donations/1"))])
+    assert fake_db.docs == {"orders/1": {"status": "pending"}}
+    assert len(fake_db.commits) == 2
+
+
+def test_concurrent_requests_share_a_commit(fake_db):
+    ref = fake_db.document
+    coalescer = WriteCoalescer(fake_db, window_seconds=0.05)
+    errors = _commit_concurrently(coalescer, {
+        f"r{i}": [set_op(ref(f"orders/{i}"), {"n": i}), set_op(ref(f"donations/{i}"), {"n": i})]
+        for i in range(10)
+    })
+    assert not errors
+    assert len(fake_db.docs) == 20
+    assert len(fake_db.commits) < 10
+    assert coalescer.stats()["requests"] == 10
+
+
+def test_failing_request_is_bisected_out(fake_db):
+    ref = fake_db.document
+    for i in range(8):
+        fake_db.put(f"orders/{i}", {})
+    coalescer = WriteCoalescer(fake_db, window_seconds=0.05)
+    requests = {f"r{i}": [update_op(ref(f"orders/{i}"), {"status": "booked"})] for i in range(8)}
+    requests["bad"] = [set_op(ref("donations/x"), {"booked": True}),
+                       update_op(ref("orders/missing"), {"status": "booked"})]
+
+    errors = _commit_concurrently(coalescer, requests)
+
+    assert list(errors) == ["bad"]
+    assert all(fake_db.data(f"orders/{i}") == {"status": "booked"} for i in range(8))
+    # The bad request's writes are atomic: its set did not land either
+    assert fake_db.data("donations/x") is None
+    assert coalescer.stats()["splits"] >= 1
+
+
+def test_oversized_request_is_rejected(fake_db):
+    coalescer = WriteCoalescer(fake_db, window_seconds=0.01, max_writes=2)
+    with pytest.raises(ValueError):
+        coalescer.commit([set_op(fake_db.document(f"orders/{i}"), {}) for i in range(3)])
+
+
+def test_timed_out_writes_are_withdrawn(fake_db):
+    fake_db.commit_delay = 0.5
+    coalescer = WriteCoalescer(fake_db, window_seconds=0.01)
+    first = threading.Thread(target=coalescer.commit, args=([set_op(fake_db.document("orders/1"), {})],))
+    first.start()
+    while coalescer.stats()["queued"] == 0:
+        time.sleep(0.001)
+    while coalescer.stats()["queued"]:
+        time.sleep(0.001)
+
+    # The flusher is busy with the slow commit, so this one is still queued
+    with pytest.raises(TimeoutError):
+        coalescer.commit([set_op(fake_db.document("orders/2"), {})], timeout=0.1)
+    first.join()
+    time.sleep(0.1)
+
+    assert fake_db.data("orders/2") is None
+    assert coalescer.stats()["timeouts"] == 1
+    assert coalescer.stats()["queued"] == 0
+
+
+def test_in_flight_writes_report_their_real_outcome(fake_db):
+    fake_db.commit_delay = 0.3
+    coalescer = WriteCoalescer(fake_db, window_seconds=0.01)
+    # Picked up by the flusher well before the timeout, committed after it
+    coalescer.commit([set_op(fake_db.document("orders/1"), {"n": 1})], timeout=0.1)
+    assert fake_db.docs == {"orders/1": {"n": 1}}
+    assert coalescer.stats()["timeouts"] == 0